@@ -48,6 +48,14 @@ rem ----------------------------------------------------------------------------
     --threads=8 ^
     --gtdb=%DATA_DIR%\ddRADseqTools2.db ^
     --vcf=%DATA_DIR%\variants-nonko.vcf ^
+    --ld-engine=popcount ^
+    --ld-window=NONE ^
+    --ld-window-snps=NONE ^
+    --ld-same-contig=N ^
+    --ld-top-k=NONE ^
+    --ld-min-r2=NONE ^
+    --append=N ^
+    --resume=N ^
     --verbose=Y ^
     --trace=N ^
     --tvi=NONE
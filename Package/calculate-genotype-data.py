@@ -32,17 +32,25 @@ Licence: GNU General Public Licence Version 3.
 
 import argparse
 import gzip
+import heapq
+import multiprocessing
 import os
 import sys
-import threading
 
-from threading import Semaphore
+from multiprocessing import shared_memory
+
+import numpy as np
 
 import genlib
 import sqllib
 
 #-------------------------------------------------------------------------------
 
+# data of a worker process of the popcount LD engine (set by initialize_ld_worker)
+ld_worker_dict = {}
+
+#-------------------------------------------------------------------------------
+
 def main():
     '''
     Main line of the program.
@@ -56,11 +64,18 @@ def main():
     args = parser.parse_args()
     check_args(args)
 
-    # connect to the genotype database
-    conn = sqllib.connect_database(args.genotype_database, check_same_thread=False)
+    # connect to the genotype database with the bulk-build profile
+    conn = sqllib.connect_database(args.genotype_database, check_same_thread=False, profile='bulk-build')
+
+    # check the genotype database is not built by an old version when the variants are appended or the calculation is resumed
+    if (args.append == 'Y' or args.resume == 'Y') and not sqllib.check_vcf_variants(conn):
+        raise genlib.ProgramException('', 'B005', args.genotype_database)
 
     # calculate genotype data
-    calculate_genotype_data(conn, args.threads_num, args.vcf_file, args.tvi_list)
+    calculate_genotype_data(conn, args.threads_num, args.vcf_file, args.ld_engine, args.ld_window_bp, args.ld_window_snps, args.ld_same_contig, args.ld_top_k, args.ld_min_r2, args.append, args.resume, args.tvi_list)
+
+    # close the connection to the genotype database
+    sqllib.close_database(conn)
 
 #-------------------------------------------------------------------------------
 
@@ -79,6 +94,14 @@ def build_parser():
     parser.add_argument('--threads', dest='threads_num', help='Number of threads (mandatory).')
     parser.add_argument('--gtdb', dest='genotype_database', help='Path of the genotype database (mandatory).')
     parser.add_argument('--vcf', dest='vcf_file', help='Path of the input VCF file (mandatory).')
+    parser.add_argument('--ld-engine', dest='ld_engine', help=f'Engine used to calculate the linkage disequilibrium: {genlib.get_ld_engine_code_list_text()}; default: {genlib.Const.DEFAULT_LD_ENGINE}.')
+    parser.add_argument('--ld-window', dest='ld_window_bp', help='Maximum distance in bp between two SNPs of the same contig to calculate their linkage disequilibrium or NONE; default: NONE.')
+    parser.add_argument('--ld-window-snps', dest='ld_window_snps', help='Number of neighbouring SNPs at each side of a SNP to calculate their linkage disequilibrium or NONE; default: NONE.')
+    parser.add_argument('--ld-same-contig', dest='ld_same_contig', help=f'Calculate the linkage disequilibrium only between SNPs of the same contig: {genlib.get_ld_same_contig_code_list_text()}; default: {genlib.Const.DEFAULT_LD_SAME_CONTIG}.')
+    parser.add_argument('--ld-top-k', dest='ld_top_k', help='Number of SNPs without missing data with highest r^2 saved for each SNP with missing data (it has to be greater than or equal to the number of SNPs used in the imputation) or NONE (all SNPs); default: NONE.')
+    parser.add_argument('--ld-min-r2', dest='ld_min_r2', help='Minimum r^2 of the SNPs saved for each SNP with missing data (it has to be less than or equal to the minimum r^2 used in the imputation) or NONE (all SNPs); default: NONE.')
+    parser.add_argument('--append', dest='append', help=f'Append the variants of the VCF file to the genotype database (only new variants are considered): {genlib.get_append_code_list_text()}; default: {genlib.Const.DEFAULT_APPEND}.')
+    parser.add_argument('--resume', dest='resume', help=f'Resume the calculation of the linkage disequilibrium of a previous run (build or append) with the same arguments from its last checkpoint: {genlib.get_resume_code_list_text()}; default: {genlib.Const.DEFAULT_RESUME}.')
     parser.add_argument('--verbose', dest='verbose', help=f'Additional job status info during the run: {genlib.get_verbose_code_list_text()}; default: {genlib.Const.DEFAULT_VERBOSE}.')
     parser.add_argument('--trace', dest='trace', help=f'Additional info useful to the developer team: {genlib.get_trace_code_list_text()}; default: {genlib.Const.DEFAULT_TRACE}.')
     parser.add_argument('--tvi', dest='tvi_list', help='Variant identification list to trace with format seq_id_1-pos_1,seq_id_2-pos_2,...,seq_id_n-pos_n or NONE; default: NONE.')
@@ -119,6 +142,83 @@ def check_args(args):
         genlib.Message.print('error', f'*** The file {args.vcf_file} does not exist.')
         OK = False
 
+    # check "ld_engine"
+    if args.ld_engine is None:
+        args.ld_engine = genlib.Const.DEFAULT_LD_ENGINE
+    elif not genlib.check_code(args.ld_engine, genlib.get_ld_engine_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** The LD engine has to be {genlib.get_ld_engine_code_list_text()}.')
+        OK = False
+    else:
+        args.ld_engine = args.ld_engine.lower()
+
+    # check "ld_window_bp"
+    if args.ld_window_bp is None or args.ld_window_bp.upper() == 'NONE':
+        args.ld_window_bp = None
+    elif not genlib.check_int(args.ld_window_bp, minimum=0):
+        genlib.Message.print('error', 'The LD window in bp has to be an integer number greater than or equal to 0 or NONE.')
+        OK = False
+    else:
+        args.ld_window_bp = int(args.ld_window_bp)
+
+    # check "ld_window_snps"
+    if args.ld_window_snps is None or args.ld_window_snps.upper() == 'NONE':
+        args.ld_window_snps = None
+    elif not genlib.check_int(args.ld_window_snps, minimum=1):
+        genlib.Message.print('error', 'The number of neighbouring SNPs of the LD window has to be an integer number greater than or equal to 1 or NONE.')
+        OK = False
+    else:
+        args.ld_window_snps = int(args.ld_window_snps)
+
+    # check "ld_same_contig"
+    if args.ld_same_contig is None:
+        args.ld_same_contig = genlib.Const.DEFAULT_LD_SAME_CONTIG
+    elif not genlib.check_code(args.ld_same_contig, genlib.get_ld_same_contig_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** ld-same-contig has to be {genlib.get_ld_same_contig_code_list_text()}.')
+        OK = False
+    else:
+        args.ld_same_contig = args.ld_same_contig.upper()
+
+    # check "ld_top_k"
+    if args.ld_top_k is None or args.ld_top_k.upper() == 'NONE':
+        args.ld_top_k = None
+    elif not genlib.check_int(args.ld_top_k, minimum=1):
+        genlib.Message.print('error', 'The number of SNPs with highest r^2 saved for each SNP has to be an integer number greater than or equal to 1 or NONE.')
+        OK = False
+    else:
+        args.ld_top_k = int(args.ld_top_k)
+
+    # check "ld_min_r2"
+    if args.ld_min_r2 is None or args.ld_min_r2.upper() == 'NONE':
+        args.ld_min_r2 = None
+    elif not genlib.check_float(args.ld_min_r2, minimum=0.0):
+        genlib.Message.print('error', 'The minimum r^2 of the SNPs saved for each SNP has to be a float number greater than or equal to 0.0 or NONE.')
+        OK = False
+    else:
+        args.ld_min_r2 = float(args.ld_min_r2)
+
+    # check "append"
+    if args.append is None:
+        args.append = genlib.Const.DEFAULT_APPEND
+    elif not genlib.check_code(args.append, genlib.get_append_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** append has to be {genlib.get_append_code_list_text()}.')
+        OK = False
+    else:
+        args.append = args.append.upper()
+
+    # check "resume"
+    if args.resume is None:
+        args.resume = genlib.Const.DEFAULT_RESUME
+    elif not genlib.check_code(args.resume, genlib.get_resume_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** resume has to be {genlib.get_resume_code_list_text()}.')
+        OK = False
+    else:
+        args.resume = args.resume.upper()
+
+    # check "append" and "resume"
+    if args.append == 'Y' and args.resume == 'Y':
+        genlib.Message.print('error', '*** append and resume can not be Y at the same time (a resumed calculation continues with the mode of the interrupted run).')
+        OK = False
+
     # check "verbose"
     if args.verbose is None:
         args.verbose = genlib.Const.DEFAULT_VERBOSE
@@ -149,7 +249,7 @@ def check_args(args):
 
 #-------------------------------------------------------------------------------
 
-def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
+def calculate_genotype_data(conn, threads_num, vcf_file, ld_engine, ld_window_bp, ld_window_snps, ld_same_contig, ld_top_k, ld_min_r2, append, resume, tvi_list):
     '''
     Calculate the following genotype data:
         * sample genotypes of SNPs
@@ -158,6 +258,16 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
         * sample kinship
           (Goudet, Kay, Weir - 2018 - How to estimate kinship - DOI: 10.1111/mec.14833)
     Multiallelic loci and other types of variants are not considered.
+    The linkage disequilibrium is calculated with the engine popcount (bitsets of genotype classes of each SNP
+    in a shared memory and a pool of processes) or gemm (block matrix products of genotype class indicators using the multithreaded BLAS of NumPy).
+    The candidate pairs of SNPs can be limited to a window (distance in bp, number of neighbouring SNPs and/or same contig),
+    and the pairs saved for each SNP can be limited to the ld_top_k SNPs without missing data (the only ones used in the imputation)
+    with highest r^2 and/or to the SNPs whose r^2 is greater than or equal to ld_min_r2.
+    When append is Y, the variants of the VCF file not yet in the genotype database are added to it: the saved kinship summations
+    are updated and the linkage disequilibrium is only calculated for the pairs of SNPs with a new SNP (except with ld_top_k,
+    where the SNPs already saved with missing data are recalculated with all SNPs to select their top SNPs again).
+    When resume is Y, only the linkage disequilibrium of the SNPs not saved in the last checkpoint of a previous run is calculated
+    (the mode of that run and the highest variant key saved before it are got from the table "vcf_linkage_disequilibrium_run").
     '''
 
     # get the number of CPUs in the system
@@ -174,35 +284,111 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
             max_threads_num = cpus_num
         genlib.Message.print('verbose', f'CPUs in the system: {cpus_num}.  The process will use {max_threads_num} threads.\n')
 
+    # resume the calculation of the linkage disequilibrium (the SNPs and the kinship are already saved)
+    if resume == 'Y':
+        if not sqllib.check_vcf_linkage_disequilibrium_progress(conn) or not sqllib.check_vcf_linkage_disequilibrium_run(conn):
+            raise genlib.ProgramException('', 'B004')
+        run_dict = sqllib.get_vcf_linkage_disequilibrium_run_dict(conn)
+        calculate_linkage_disequilibrium(conn, max_threads_num, ld_engine, ld_window_bp, ld_window_snps, ld_same_contig, ld_top_k, ld_min_r2, run_dict['append'], run_dict['saved_max_variant_key'], resume)
+        return
+
     # initialize the sample lis, sample number and label dict
     sample_list = []
     sample_number = 0
     label_dict = {}
 
-    # initialize the kinship dictionary
-    kinship_dict = genlib.NestedDefaultDict()
+    # initialize the kinship summation dictionary, the chunk of sample genotypes pending to be added to it
+    # and the summation of mij items of the last variant
+    kinship_summation_dict = {}
+    pseudobinary_gt_chunk_list = []
+    summation_summation_mij = 0
 
-    # drop the table "vcf_snps" (if it exists)
-    genlib.Message.print('verbose', 'Droping the table "vcf_snps" ...\n')
-    sqllib.drop_vcf_snps(conn)
-    genlib.Message.print('verbose', 'The table is droped.\n')
+    # initialize the set of variant identifications already processed in the genotype database (their genotypes
+    # are in the kinship summations although they are not SNPs) and the key of the next variant saved in the table "vcf_variants"
+    saved_variant_id_set = set()
+    variant_key = 1
 
-    # create the table "vcf_snps"
-    genlib.Message.print('verbose', 'Creating the table "vcf_snps" ...\n')
-    sqllib.create_vcf_snps(conn)
-    genlib.Message.print('verbose', 'The table is created.\n')
+    # get the saved data when the variants are appended to the genotype database
+    if append == 'Y':
 
-    # drop the table "vcf_linkage_disequilibrium" (if it exists)
-    genlib.Message.print('verbose', 'Droping the table "vcf_linkage_disequilibrium" ...\n')
-    sqllib.drop_vcf_linkage_disequilibrium(conn)
+        # get the saved kinship summations
+        genlib.Message.print('verbose', 'Getting the kinship summations of the genotype database ...\n')
+        if not sqllib.check_vcf_kinship_summation(conn):
+            raise genlib.ProgramException('', 'B003')
+        saved_kinship_summation_dict = sqllib.get_vcf_kinship_summation_dict(conn)
+        genlib.Message.print('verbose', 'The kinship summations are got.\n')
+
+        # get the processed variant identifications and the key of the next variant
+        saved_variant_id_set = set(sqllib.get_vcf_variants_id_list(conn))
+        variant_key = sqllib.get_vcf_variants_max_key(conn) + 1
+
+    # drop and create the tables when the genotype database is rebuilt
+    else:
+
+        # drop the table "vcf_variants" (if it exists)
+        genlib.Message.print('verbose', 'Droping the table "vcf_variants" ...\n')
+        sqllib.drop_vcf_variants(conn)
+        genlib.Message.print('verbose', 'The table is droped.\n')
+
+        # create the table "vcf_variants"
+        genlib.Message.print('verbose', 'Creating the table "vcf_variants" ...\n')
+        sqllib.create_vcf_variants(conn)
+        genlib.Message.print('verbose', 'The table is created.\n')
+
+        # drop the table "vcf_snps" (if it exists)
+        genlib.Message.print('verbose', 'Droping the table "vcf_snps" ...\n')
+        sqllib.drop_vcf_snps(conn)
+        genlib.Message.print('verbose', 'The table is droped.\n')
+
+        # create the table "vcf_snps"
+        genlib.Message.print('verbose', 'Creating the table "vcf_snps" ...\n')
+        sqllib.create_vcf_snps(conn)
+        genlib.Message.print('verbose', 'The table is created.\n')
+
+        # drop the table "vcf_linkage_disequilibrium" (if it exists)
+        genlib.Message.print('verbose', 'Droping the table "vcf_linkage_disequilibrium" ...\n')
+        sqllib.drop_vcf_linkage_disequilibrium(conn)
+        genlib.Message.print('verbose', 'The table is droped.\n')
+
+        # create the table "vcf_linkage_disequilibrium"
+        genlib.Message.print('verbose', 'Creating the table "vcf_linkage_disequilibrium" ...\n')
+        sqllib.create_vcf_linkage_disequilibrium(conn)
+        genlib.Message.print('verbose', 'The table is created.\n')
+
+        # drop the view "vcf_linkage_disequilibrium_view" (if it exists)
+        genlib.Message.print('verbose', 'Droping the view "vcf_linkage_disequilibrium_view" ...\n')
+        sqllib.drop_vcf_linkage_disequilibrium_view(conn)
+        genlib.Message.print('verbose', 'The view is droped.\n')
+
+        # create the view "vcf_linkage_disequilibrium_view"
+        genlib.Message.print('verbose', 'Creating the view "vcf_linkage_disequilibrium_view" ...\n')
+        sqllib.create_vcf_linkage_disequilibrium_view(conn)
+        genlib.Message.print('verbose', 'The view is created.\n')
+
+        # drop the table "vcf_kinship_summation" (if it exists)
+        genlib.Message.print('verbose', 'Droping the table "vcf_kinship_summation" ...\n')
+        sqllib.drop_vcf_kinship_summation(conn)
+        genlib.Message.print('verbose', 'The table is droped.\n')
+
+        # create the table "vcf_kinship_summation"
+        genlib.Message.print('verbose', 'Creating the table "vcf_kinship_summation" ...\n')
+        sqllib.create_vcf_kinship_summation(conn)
+        genlib.Message.print('verbose', 'The table is created.\n')
+
+    # set the highest variant key saved before this run (the keys of the new variants are greater)
+    saved_max_variant_key = variant_key - 1
+
+    # drop the table "vcf_linkage_disequilibrium_progress" (if it exists)
+    genlib.Message.print('verbose', 'Droping the table "vcf_linkage_disequilibrium_progress" ...\n')
+    sqllib.drop_vcf_linkage_disequilibrium_progress(conn)
     genlib.Message.print('verbose', 'The table is droped.\n')
 
-    # create the table "vcf_linkage_disequilibrium"
-    genlib.Message.print('verbose', 'Creating the table "vcf_linkage_disequilibrium" ...\n')
-    sqllib.create_vcf_linkage_disequilibrium(conn)
-    genlib.Message.print('verbose', 'The table is created.\n')
+    # drop the table "vcf_linkage_disequilibrium_run" (if it exists)
+    genlib.Message.print('verbose', 'Droping the table "vcf_linkage_disequilibrium_run" ...\n')
+    sqllib.drop_vcf_linkage_disequilibrium_run(conn)
+    genlib.Message.print('verbose', 'The table is droped.\n')
 
-    # drop the table "vcf_kinship" (if it exists)
+    # drop the table "vcf_kinship" (if it exists; the kinship is always recalculated from the kinship summations)
     genlib.Message.print('verbose', 'Droping the table "vcf_kinship" ...\n')
     sqllib.drop_vcf_kinship(conn)
     genlib.Message.print('verbose', 'The table is droped.\n')
@@ -212,6 +398,11 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
     sqllib.create_vcf_kinship(conn)
     genlib.Message.print('verbose', 'The table is created.\n')
 
+    # get the bulk writer of the table "vcf_snps" and initialize the list of rows of the table "vcf_variants"
+    # (they are saved after the SNPs to not write two tables at the same time)
+    vcf_snps_writer = sqllib.get_vcf_snps_bulk_writer(conn)
+    variant_row_list = []
+
     genlib.Message.print('verbose', f'Processing SNPs of the file {vcf_file} ...\n')
     genlib.Message.print('verbose', 'Reading the VCF file:\n')
 
@@ -267,14 +458,15 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
             sample_number = len(sample_list)
             genlib.Message.print('trace', f'sample_number: {sample_number}')
 
-            # set 0 in the values of the kinship dictionary
-            for i in range(sample_number):
-                for j in range(i + 1, sample_number):
-                    kinship_dict[i][j]['rbeta_summation'] = 0
-                    kinship_dict[i][j]['rw_numerator_summation'] = 0
-                    kinship_dict[i][j]['rw_denominator_summation'] = 0
-                    kinship_dict[i][j]['ru_summation'] = 0
-                    kinship_dict[i][j]['ru_l'] = 0
+            # set the saved kinship summations (the samples have to be the same) or 0 in the values of the kinship summation dictionary
+            if append == 'Y':
+                if sample_list != saved_kinship_summation_dict['sample_list']:
+                    raise genlib.ProgramException('', 'L008', vcf_file)
+                summation_summation_mij = saved_kinship_summation_dict.pop('summation_summation_mij')
+                del saved_kinship_summation_dict['sample_list']
+                kinship_summation_dict = saved_kinship_summation_dict
+            else:
+                kinship_summation_dict = initialize_kinship_summation_dict(sample_number)
 
             # print the counters
             genlib.Message.print('verbose', f'\rRecords ... {input_record_counter:8d} - Variants ... {total_variant_counter:8d}')
@@ -294,6 +486,12 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
             # set the variant identification
             variant_id = f'{data_dict["chrom"]}-{data_dict["pos"]}'
 
+            # skip the variant when it is already processed in the genotype database
+            if variant_id in saved_variant_id_set:
+                genlib.Message.print('trace', f'The variant {variant_id} is already processed in the genotype database.')
+                (record, _, data_dict) = genlib.read_vcf_file(vcf_file_id, sample_number=0, check_sample_number=False)
+                continue
+
             # get the reference allele and alternative alleles (field ALT)
             reference_allele = data_dict['ref']
             alternative_alleles = data_dict['alt']
@@ -354,61 +552,28 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
                     pseudobinary_sample_gt_list.append(7)
                     sample_withmd_list.append(i)
 
-            # update the kinship dictionary adding data of the samples i and j in the summations
-            # used to the calculation of rbeta, rw (weighted estimator) y ru (unweighted average estimator)
-            #
-            #    rbeta:
-            #        (1 + (Xi - 1) * (Xj - 1)) / 2 ---> rbeta_summation
-            #
-            #    rw:
-            #        (Xi - 2 * p) * (Xj - 2 * p) ---> rw_numerator_summation
-            #        2 * p * (1 - p) ---> rw_denominator_summation
-            #
-            #    ru:
-            #        (Xi - 2 * p) * (Xj - 2 * p) / (2 * p * (1 - p)) ---> ru_summation
-            #
-            # where Xi are Xj are the dosage of reference allele for samples i and j respectivily
-            # and p is the frecuence of reference allele in the current variant
-            #
-            # (no update is done when there is missing data in samples i or j, or p value is 0 or 1 when rw and ru)
-            summation_summation_mij = 0
-            p = (gt_00 * 2 + gt_01) / (sample_number * 2)
-            for i in range(sample_number):
-                Xi = 0
-                # 0b00 -> 0
-                if pseudobinary_sample_gt_list[i] == 0:
-                    Xi = 2
-                # 0b01 -> 1
-                elif pseudobinary_sample_gt_list[i] == 1:
-                    Xi = 1
-                for j in range(i + 1, sample_number):
-                    Xj = 0
-                    # 0b00 -> 0
-                    if pseudobinary_sample_gt_list[j] == 0:
-                        Xj = 2
-                    # 0b01 -> 1
-                    elif pseudobinary_sample_gt_list[j] == 1:
-                        Xj = 1
-                    # 0b111 -> 7
-                    if pseudobinary_sample_gt_list[i] != 7 and pseudobinary_sample_gt_list[j] != 7 and p not in [0, 1]:
-                        mij_item = (1 + (Xi - 1) * (Xj - 1)) / 2
-                        kinship_dict[i][j]['rbeta_summation'] += mij_item
-                        summation_summation_mij += mij_item
-                        if p not in [0, 1]:
-                            kinship_dict[i][j]['rw_numerator_summation'] += (Xi - 2 * p) * (Xj - 2 * p)
-                            kinship_dict[i][j]['rw_denominator_summation'] += 2 * p * (1 - p)
-                            kinship_dict[i][j]['ru_summation'] += (Xi - 2 * p) * (Xj - 2 * p) / (2 * p * (1 - p))
-                            kinship_dict[i][j]['ru_l'] += 1
+            # add the sample genotypes to the chunk and update the kinship summation dictionary when the chunk is full
+            pseudobinary_gt_chunk_list.append(pseudobinary_sample_gt_list)
+            if len(pseudobinary_gt_chunk_list) == genlib.Const.KINSHIP_CHUNK_SIZE:
+                summation_summation_mij = update_kinship_summation_dict(kinship_summation_dict, pseudobinary_gt_chunk_list)
+                pseudobinary_gt_chunk_list = []
+
+            # record the variant as processed (its genotypes are already in the kinship summations)
+            variant_row_list.append({'variant_key': variant_key, 'variant_id': variant_id})
 
             # save SNP data into table "vcf_snps" if there are more than one genotype
             if gt_00 != sample_number and gt_01 != sample_number and gt_11 != sample_number:
                 snp_row_dict = {}
-                snp_row_dict['variant_id'] = variant_id
+                snp_row_dict['variant_key'] = variant_key
                 snp_row_dict['ref'] = reference_allele
                 snp_row_dict['alt'] = alternative_allele_list[0]
-                snp_row_dict['sample_gt_list'] = ','.join(str(x) for x in pseudobinary_sample_gt_list)
+                snp_row_dict['sample_number'] = sample_number
+                snp_row_dict['sample_gt_packed'] = sqllib.pack_sample_gt_list(pseudobinary_sample_gt_list)
                 snp_row_dict['sample_withmd_list'] = ','.join(str(x) for x in sample_withmd_list)
-                sqllib.insert_vcf_snps_row(conn, snp_row_dict)
+                vcf_snps_writer.put(snp_row_dict)
+
+            # set the key of the next variant
+            variant_key += 1
 
             # print the counters
             genlib.Message.print('verbose', f'\rRecords ... {input_record_counter:8d} - Variants ... {total_variant_counter:8d}')
@@ -421,11 +586,26 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
     # close input VCF file
     vcf_file_id.close()
 
+    # update the kinship summation dictionary with the last chunk of sample genotypes
+    if pseudobinary_gt_chunk_list != []:
+        summation_summation_mij = update_kinship_summation_dict(kinship_summation_dict, pseudobinary_gt_chunk_list)
+
+    # wait until every SNP row is saved into the table "vcf_snps"
+    vcf_snps_writer.close()
+
     genlib.Message.print('verbose', 'SNPs are processed.\n')
 
-    # create the index "vcf_snps_index" on the table "vcf_snps"
-    genlib.Message.print('verbose', 'Creating the index on the table "vcf_snps" ...\n')
-    sqllib.create_vcf_snps_index(conn)
+    # save the variant keys of the processed variants into the table "vcf_variants"
+    genlib.Message.print('verbose', 'Saving variant keys into the table "vcf_variants" ...\n')
+    vcf_variants_writer = sqllib.get_vcf_variants_bulk_writer(conn)
+    for variant_row_dict in variant_row_list:
+        vcf_variants_writer.put(variant_row_dict)
+    vcf_variants_writer.close()
+    genlib.Message.print('verbose', 'Variant keys are saved.\n')
+
+    # create the index "vcf_variants_index" on the table "vcf_variants"
+    genlib.Message.print('verbose', 'Creating the index on the table "vcf_variants" ...\n')
+    sqllib.create_vcf_variants_index(conn)
     genlib.Message.print('verbose', 'The index is created.\n')
 
     # save changes into genotype database
@@ -433,16 +613,26 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
     conn.commit()
     genlib.Message.print('verbose', 'Changes are saved.\n')
 
+    # save the kinship summations into the table "vcf_kinship_summation" to append variants later
+    genlib.Message.print('verbose', 'Saving kinship summations into the table "vcf_kinship_summation" ...\n')
+    sqllib.save_vcf_kinship_summation_dict(conn, sample_list, kinship_summation_dict, summation_summation_mij)
+    genlib.Message.print('verbose', 'Kinship summations are saved.\n')
+
     # save kinship calculations into the table "vcf_kinship"
     genlib.Message.print('verbose', 'Saving kinship calculations into the table "vcf_kinship" ...\n')
     ms = summation_summation_mij * 2 / (sample_number * (sample_number - 1))
+    rbeta_array = (kinship_summation_dict['rbeta_summation'] - ms) / (1 - ms)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rw_array = kinship_summation_dict['rw_numerator_summation'] / kinship_summation_dict['rw_denominator_summation']
+        ru_array = kinship_summation_dict['ru_summation'] / kinship_summation_dict['ru_l']
+    vcf_kinship_writer = sqllib.get_vcf_kinship_bulk_writer(conn)
     for i in range(sample_number):
         for j in range(i + 1, sample_number):
-            rbeta = (kinship_dict[i][j]['rbeta_summation'] - ms) / (1 - ms)
-            try:
-                rw = kinship_dict[i][j]['rw_numerator_summation'] / kinship_dict[i][j]['rw_denominator_summation']
-                ru = kinship_dict[i][j]['ru_summation'] / kinship_dict[i][j]['ru_l']
-            except ZeroDivisionError as e:
+            rbeta = float(rbeta_array[i, j])
+            if kinship_summation_dict['ru_l'][i, j] > 0:
+                rw = float(rw_array[i, j])
+                ru = float(ru_array[i, j])
+            else:
                 genlib.Message.print('trace', '*** WARNING: ZeroDivisionError calculating kinship data')
                 genlib.Message.print('trace', f'between samples {sample_list[i]} & {sample_list[j]}')
                 genlib.Message.print('trace', 'due to all variants have missing data in at least one of the two samples.')
@@ -454,7 +644,8 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
             kinship_row_dict['rbeta'] = rbeta
             kinship_row_dict['rw'] = rw
             kinship_row_dict['ru'] = ru
-            sqllib.insert_vcf_kinship_row(conn, kinship_row_dict)
+            vcf_kinship_writer.put(kinship_row_dict)
+    vcf_kinship_writer.close()
     genlib.Message.print('verbose', 'Kinship calculations are saved.\n')
 
     # create the index "vcf_kinship_index" on the table "vcf_kinship"
@@ -467,59 +658,132 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
     conn.commit()
     genlib.Message.print('verbose', 'Changes are saved.\n')
 
+    # calculate the linkage disequilibrium
+    calculate_linkage_disequilibrium(conn, max_threads_num, ld_engine, ld_window_bp, ld_window_snps, ld_same_contig, ld_top_k, ld_min_r2, append, saved_max_variant_key, resume)
+
+#-------------------------------------------------------------------------------
+
+def calculate_linkage_disequilibrium(conn, max_threads_num, ld_engine, ld_window_bp, ld_window_snps, ld_same_contig, ld_top_k, ld_min_r2, append, saved_max_variant_key, resume):
+    '''
+    Calculate the linkage disequilibrium between the SNPs with missing data and their candidate SNPs and save it
+    into the table "vcf_linkage_disequilibrium" (a pair of SNPs with missing data is saved once, with the SNP with
+    the lowest variant key first, and the view "vcf_linkage_disequilibrium_view" has both directions of the pair).
+    Every SNP completely saved is recorded in the table
+    "vcf_linkage_disequilibrium_progress" in the same transaction, so the calculation can be resumed
+    from the last checkpoint when resume is Y. The mode of the run (append) and the highest variant key saved
+    before it (saved_max_variant_key) are recorded in the table "vcf_linkage_disequilibrium_run", so a resumed
+    calculation of an append run only calculates the pairs of SNPs pending with the same candidate SNPs.
+    '''
+
     genlib.Message.print('verbose', 'Calculating the linkage disequilibrium ...\n')
 
-    # get the SNPs identification lists from the table  "vcf_snps"
+    # get the SNP data from the table "vcf_snps" (sorted by variant key)
+    snp_matrix_dict = sqllib.get_vcf_snps_matrix_dict(conn)
+
+    # get the SNPs identification lists and the dictionary of the position of every SNP in the SNP data
     snp_id_list_1 = sorted(sqllib.get_snp_ids_wmd_list(conn))
-    snp_id_list_2 = sorted(sqllib.get_snp_ids_list(conn))
+    snp_id_list_2 = snp_matrix_dict['variant_id_list']
+    snp_index_dict = {snp_id: i for i, snp_id in enumerate(snp_id_list_2)}
+
+    # remove the SNPs already saved from the SNPs with missing data when the calculation is resumed
+    # (the progress table has the variant keys)
+    if resume == 'Y':
+        saved_snp_key_1_set = set(sqllib.get_vcf_linkage_disequilibrium_progress_list(conn))
+        snp_id_list_1 = [snp_id_1 for snp_id_1 in snp_id_list_1 if snp_matrix_dict['variant_key_list'][snp_index_dict[snp_id_1]] not in saved_snp_key_1_set]
+        genlib.Message.print('verbose', f'SNPs already saved: {len(saved_snp_key_1_set)} - SNPs pending: {len(snp_id_list_1)}.\n')
+
+    # create the tables "vcf_linkage_disequilibrium_progress" and "vcf_linkage_disequilibrium_run" when the calculation is not resumed
+    # (with ld_top_k, the rows of the SNPs already saved with missing data are deleted in the same transaction
+    # when the variants are appended to the genotype database, because they are recalculated with all SNPs)
+    else:
+        sqllib.drop_vcf_linkage_disequilibrium_progress(conn)
+        sqllib.create_vcf_linkage_disequilibrium_progress(conn)
+        sqllib.drop_vcf_linkage_disequilibrium_run(conn)
+        sqllib.create_vcf_linkage_disequilibrium_run(conn)
+        sqllib.insert_vcf_linkage_disequilibrium_run_row(conn, {'append': append, 'saved_max_variant_key': saved_max_variant_key})
+        if append == 'Y' and ld_top_k is not None:
+            sqllib.delete_vcf_linkage_disequilibrium_rows(conn, [snp_matrix_dict['variant_key_list'][snp_index_dict[snp_id_1]] for snp_id_1 in snp_id_list_1 if snp_matrix_dict['variant_key_list'][snp_index_dict[snp_id_1]] <= saved_max_variant_key])
+        conn.commit()
+
+    # build the array of new SNPs in the SNP data when the variants are appended to the genotype database
+    # (SNPs already saved with missing data only have to be calculated with the new SNPs, except with ld_top_k)
+    new_snp_array = None
+    if append == 'Y' and ld_top_k is None:
+        new_snp_array = np.array(snp_matrix_dict['variant_key_list'], dtype=np.int64) > saved_max_variant_key
+
+    # build the array of SNPs with missing data in the SNP data (a pair of SNPs with missing data is only calculated
+    # with the SNP with the lowest variant key, because the linkage disequilibrium is symmetric)
+    withmd_snp_array = np.array([sample_withmd_list != '' for sample_withmd_list in snp_matrix_dict['sample_withmd_list_list']], dtype=bool)
+
+    # build the LD window dictionary used to select the candidate SNPs of each SNP
+    ld_window_dict = build_ld_window_dict(snp_id_list_2, ld_window_bp, ld_window_snps, ld_same_contig, new_snp_array, withmd_snp_array)
+
+    # get the bulk writer of the table "vcf_linkage_disequilibrium"
+    ld_writer = sqllib.get_vcf_linkage_disequilibrium_bulk_writer(conn)
 
     # initialice the counter and total of SNPs
     snps_counter = 0
     snps_total = len(snp_id_list_1)
 
-    # create the semaphore to control database accesses
-    semaphore = Semaphore(1)
+    # calculate the linkage disequilibrium between each pair of SNPs using the popcount engine
+    if ld_engine == 'popcount':
 
-    # calculate the linkage disequilibrium between each pair of SNPs
-    while snps_counter < snps_total:
+        # build the bitsets of genotype classes of every SNP
+        gt_bitset_array = build_gt_bitset_array(snp_matrix_dict['sample_gt_matrix'])
 
-        # initialize working threads number
-        w_threads_num = 0
+        # copy the bitsets into a shared memory block
+        shm = shared_memory.SharedMemory(create=True, size=max(gt_bitset_array.nbytes, 1))
+        try:
+            shm_gt_bitset_array = np.ndarray(gt_bitset_array.shape, dtype=gt_bitset_array.dtype, buffer=shm.buf)
+            shm_gt_bitset_array[:] = gt_bitset_array
+            del gt_bitset_array
+
+            # build the chunks of positions of SNPs with missing data to be calculated by the processes
+            index_1_list = [snp_index_dict[snp_id_1] for snp_id_1 in snp_id_list_1]
+            chunk_size = genlib.Const.LD_PROCESS_CHUNK_SIZE
+            index_1_chunk_list = [index_1_list[i:i + chunk_size] for i in range(0, len(index_1_list), chunk_size)]
+
+            # calculate the linkage disequilibrium in the worker processes (they do not access the database)
+            # and save the results of every chunk into the table "vcf_linkage_disequilibrium" in this process
+            initargs = (shm.name, shm_gt_bitset_array.shape, shm_gt_bitset_array.dtype.str, snp_matrix_dict['variant_id_list'], ld_window_dict, genlib.Message.trace_status)
+            with multiprocessing.Pool(processes=max_threads_num, initializer=initialize_ld_worker, initargs=initargs) as pool:
+                for ld_result_list in pool.imap_unordered(calculate_chunk_linkage_disequilibrium, index_1_chunk_list):
+                    for (index_1, index_2_array, dhat_array, r2_array) in ld_result_list:
+                        insert_snp_linkage_disequilibrium(ld_writer, index_1, index_2_array, dhat_array, r2_array, snp_matrix_dict, ld_top_k, ld_min_r2)
+                    snps_counter += len(ld_result_list)
+                    genlib.Message.print('verbose', f'\r... SNPs counter: {snps_counter}/{snps_total} ...              ')
+            del shm_gt_bitset_array
 
-        # initialize the list of SNP identifications in the group
-        group_snp_id_list_1 = []
+        # release the shared memory block
+        finally:
+            shm.close()
+            shm.unlink()
 
-        while snps_counter < snps_total and w_threads_num < max_threads_num:
+    # calculate the linkage disequilibrium between each pair of SNPs using the gemm engine
+    elif ld_engine == 'gemm':
 
-            # add 1 to the working threads number
-            w_threads_num += 1
+        # build the indicator matrices of genotype classes of every SNP
+        gt_indicator_array = build_gt_indicator_array(snp_matrix_dict['sample_gt_matrix'])
 
-            # add the SNP identification to the list of SNP identifications in the group
-            group_snp_id_list_1.append(snp_id_list_1[snps_counter])
+        while snps_counter < snps_total:
 
-            # add 1 to the SNPs counter
-            snps_counter += 1
+            # get the list of SNP identifications in the block
+            block_snp_id_list_1 = snp_id_list_1[snps_counter:snps_counter + genlib.Const.LD_GEMM_BLOCK_SIZE]
 
-        # create and start threads
-        threads_list = []
-        for thread_id in range(w_threads_num):
-            threads_list.append(threading.Thread(target=calculate_snp_linkage_disequilibrium, args=[conn, semaphore, sample_number, group_snp_id_list_1[thread_id], snp_id_list_2]))
-            threads_list[thread_id].start()
+            # calculate the linkage disequilibrium of the SNPs of the block
+            calculate_block_linkage_disequilibrium(ld_writer, block_snp_id_list_1, snp_index_dict, snp_matrix_dict, ld_window_dict, gt_indicator_array, ld_top_k, ld_min_r2)
 
-        # wait until all threads terminate
-        for thread_id in range(w_threads_num):
-            threads_list[thread_id].join()
+            # add the SNPs of the block to the SNPs counter
+            snps_counter += len(block_snp_id_list_1)
 
-        genlib.Message.print('verbose', f'\r... SNPs counter: {snps_counter}/{snps_total} ...              ')
+            genlib.Message.print('verbose', f'\r... SNPs counter: {snps_counter}/{snps_total} ...              ')
+
+    # wait until every linkage disequilibrium row is saved into the table "vcf_linkage_disequilibrium"
+    ld_writer.close()
 
     genlib.Message.print('verbose', '\n')
     genlib.Message.print('verbose', 'The linkage disequilibrium is calculated.\n')
 
-    # create the index "vcf_linkage_disequilibrium_index" on the table "vcf_linkage_disequilibrium"
-    genlib.Message.print('verbose', 'Creating the index on the table "vcf_linkage_disequilibrium" ...\n')
-    sqllib.create_vcf_linkage_disequilibrium_index(conn)
-    genlib.Message.print('verbose', 'The index is created.\n')
-
     # save changes into genotype database
     genlib.Message.print('verbose', 'Saving changes into genotype database ...\n')
     conn.commit()
@@ -527,129 +791,505 @@ def calculate_genotype_data(conn, threads_num, vcf_file, tvi_list):
 
 #-------------------------------------------------------------------------------
 
-def calculate_snp_linkage_disequilibrium(conn, semaphore, sample_number, snp_id_1, snp_id_list_2):
+def initialize_kinship_summation_dict(sample_number):
     '''
-    Calculate the linkage disequilibrium of a SNP.
+    Initialize the dictionary with the kinship summations of each pair of samples (sample_number x sample_number matrices).
     '''
 
-    # get data of the first SNP from table "vcf_snps"
-    semaphore.acquire()
-    snp_data_dict_1 = sqllib.get_snp_data_dict(conn, snp_id_1)
-    semaphore.release()
+    # build the dictionary with a matrix of zeros for each summation
+    kinship_summation_dict = {}
+    for summation in ['rbeta_summation', 'rw_numerator_summation', 'rw_denominator_summation', 'ru_summation', 'ru_l']:
+        kinship_summation_dict[summation] = np.zeros((sample_number, sample_number), dtype=np.float64)
 
-    # get the the list of sample genotypes using pseudo binary numbers
-    pseudobinary_sample_gt_list_1 = genlib.split_literal_to_integer_list(snp_data_dict_1['sample_gt_list'])
+    # return the kinship summation dictionary
+    return kinship_summation_dict
 
-    # get the list of the remained SNP identification
-    w_snp_id_list_2 = snp_id_list_2.copy()
-    w_snp_id_list_2.remove(snp_id_1)
+#-------------------------------------------------------------------------------
 
-    # calculate the linkage disequilibrium
-    for snp_id_2 in w_snp_id_list_2:
-
-        # get data of the first SNP from table "vcf_snps"
-        semaphore.acquire()
-        snp_data_dict_2 = sqllib.get_snp_data_dict(conn, snp_id_2)
-        semaphore.release()
-
-        # get the the list of sample genotypes using pseudo binary numbers
-        pseudobinary_sample_gt_list_2 = genlib.split_literal_to_integer_list(snp_data_dict_2['sample_gt_list'])
-
-        # calculate the observed genotype counts and allele frequencies
-        #
-        #  ri: reference allele of SNPi; ai: alternative allele of SNPi; ni: count of observed genotype pair i
-        #         r2-r2 r2-a2 a2-a2
-        #        +-----------------
-        #  r1-r1 |  n1    n2    n3
-        #  r1-a1 |  n4    n5    n6
-        #  a1-a1 |  n7    n8    n9
-        #
-        # rfi: reference allele frequency of SNP i; afi: alternative allele frequency of SNP i
-        #
-        # (samples with missing data '0b111' are not considered!!!)
-        n = n1 = n2 = n3 = n4 = n5 = n6 = n7 = n8 = n9 = 0
-        rf1 = af1 = rf2 = af2 = 0
-        for i in range(sample_number):
-            if pseudobinary_sample_gt_list_1[i] == 0 and pseudobinary_sample_gt_list_2[i] == 0:
-                n += 1
-                n1 += 1
-                rf1 += 2
-                rf2 += 2
-            elif pseudobinary_sample_gt_list_1[i] == 0 and pseudobinary_sample_gt_list_2[i] == 1:
-                n += 1
-                n2 += 1
-                rf1 += 2
-                rf2 += 1
-                af2 += 1
-            elif pseudobinary_sample_gt_list_1[i] == 0 and pseudobinary_sample_gt_list_2[i] == 3:
-                n += 1
-                n3 += 1
-                rf1 += 2
-                af2 += 2
-            elif pseudobinary_sample_gt_list_1[i] == 1 and pseudobinary_sample_gt_list_2[i] == 0:
-                n += 1
-                n4 += 1
-                rf1 += 1
-                af1 += 1
-                rf2 += 2
-            elif pseudobinary_sample_gt_list_1[i] == 1 and pseudobinary_sample_gt_list_2[i] == 1:
-                n += 1
-                n5 += 1
-                rf1 += 1
-                af1 += 1
-                rf2 += 1
-                af2 += 1
-            elif pseudobinary_sample_gt_list_1[i] == 1 and pseudobinary_sample_gt_list_2[i] == 3:
-                n += 1
-                n6 += 1
-                rf1 += 1
-                af1 += 1
-                af2 += 2
-            elif pseudobinary_sample_gt_list_1[i] == 3 and pseudobinary_sample_gt_list_2[i] == 0:
-                n += 1
-                n7 += 1
-                af1 += 2
-                rf2 += 2
-            elif pseudobinary_sample_gt_list_1[i] == 3 and pseudobinary_sample_gt_list_2[i] == 1:
-                n += 1
-                n8 += 1
-                af1 += 2
-                rf2 += 1
-                af2 += 1
-            elif pseudobinary_sample_gt_list_1[i] == 3 and pseudobinary_sample_gt_list_2[i] == 3:
-                n += 1
-                n9 += 1
-                af1 += 2
-                af2 += 2
+def update_kinship_summation_dict(kinship_summation_dict, pseudobinary_gt_chunk_list):
+    '''
+    Update the kinship summation dictionary adding the data of a chunk of variants and
+    return the summation of mij items of the last variant of the chunk.
+    '''
+
+    # update the kinship summation dictionary adding data of the samples i and j in the summations
+    # used to the calculation of rbeta, rw (weighted estimator) y ru (unweighted average estimator)
+    #
+    #    rbeta:
+    #        (1 + (Xi - 1) * (Xj - 1)) / 2 ---> rbeta_summation
+    #
+    #    rw:
+    #        (Xi - 2 * p) * (Xj - 2 * p) ---> rw_numerator_summation
+    #        2 * p * (1 - p) ---> rw_denominator_summation
+    #
+    #    ru:
+    #        (Xi - 2 * p) * (Xj - 2 * p) / (2 * p * (1 - p)) ---> ru_summation
+    #
+    # where Xi are Xj are the dosage of reference allele for samples i and j respectivily
+    # and p is the frecuence of reference allele in the current variant
+    #
+    # (no update is done when there is missing data in samples i or j, or p value is 0 or 1)
+    #
+    # every summation of the chunk is a product of two (variants x samples) matrices, so
+    # all the pairs of samples are updated at the same time:
+    #
+    #    M: 1 if the sample has not missing data and p is not 0 or 1, otherwise 0
+    #    rbeta_summation += (M' * M + ((X - 1) * M)' * ((X - 1) * M)) / 2
+    #    rw_numerator_summation += ((X - 2 * p) * M)' * ((X - 2 * p) * M)
+    #    rw_denominator_summation += M' * (2 * p * (1 - p) * M)
+    #    ru_summation += ((X - 2 * p) * M / sqrt(2 * p * (1 - p)))' * ((X - 2 * p) * M / sqrt(2 * p * (1 - p)))
+    #    ru_l += M' * M
+
+    # build the matrix of sample genotypes using pseudo binary numbers (variants x samples)
+    gt_matrix = np.array(pseudobinary_gt_chunk_list, dtype=np.int8)
+    sample_number = gt_matrix.shape[1]
+
+    # build the matrix of dosages of the reference allele (0b00 -> 2; 0b01 -> 1; 0b11 and 0b111 -> 0)
+    x_matrix = np.zeros(gt_matrix.shape, dtype=np.float64)
+    x_matrix[gt_matrix == 0] = 2
+    x_matrix[gt_matrix == 1] = 1
+
+    # calculate the frecuence of reference allele of each variant
+    p_array = (np.count_nonzero(gt_matrix == 0, axis=1) * 2 + np.count_nonzero(gt_matrix == 1, axis=1)) / (sample_number * 2)
+    p_array = p_array[:, np.newaxis]
+
+    # build the mask of valid data
+    m_matrix = ((gt_matrix != 7) & (p_array != 0) & (p_array != 1)).astype(np.float64)
+
+    # calculate the variance term of each variant (1 when p is 0 or 1 to avoid divisions by zero; its data is masked)
+    variance_array = np.where(m_matrix.any(axis=1, keepdims=True), 2 * p_array * (1 - p_array), 1)
+
+    # update the summations
+    centered_1_matrix = (x_matrix - 1) * m_matrix
+    centered_2p_matrix = (x_matrix - 2 * p_array) * m_matrix
+    ru_l_matrix = m_matrix.T @ m_matrix
+    kinship_summation_dict['rbeta_summation'] += (ru_l_matrix + centered_1_matrix.T @ centered_1_matrix) / 2
+    kinship_summation_dict['rw_numerator_summation'] += centered_2p_matrix.T @ centered_2p_matrix
+    kinship_summation_dict['rw_denominator_summation'] += m_matrix.T @ (m_matrix * variance_array)
+    standardized_matrix = centered_2p_matrix / np.sqrt(variance_array)
+    kinship_summation_dict['ru_summation'] += standardized_matrix.T @ standardized_matrix
+    kinship_summation_dict['ru_l'] += ru_l_matrix
+
+    # calculate the summation of mij items of the last variant for the pairs of samples i < j
+    m_array = m_matrix[-1]
+    u_array = centered_1_matrix[-1]
+    valid_number = m_array.sum()
+    summation_mij = ((valid_number ** 2 - valid_number) / 2 + (u_array.sum() ** 2 - (u_array ** 2).sum()) / 2) / 2
+
+    # return the summation of mij items of the last variant
+    return float(summation_mij)
+
+#-------------------------------------------------------------------------------
+
+def build_ld_window_dict(snp_id_list, ld_window_bp, ld_window_snps, ld_same_contig, new_snp_array=None, withmd_snp_array=None):
+    '''
+    Build the LD window dictionary used to select the candidate SNPs of each SNP.
+    The SNPs are sorted by contig and position, so the candidate SNPs of each SNP are a range of this order.
+    When new_snp_array is not None, the candidate SNPs of a SNP that is not new are limited to the new SNPs.
+    When withmd_snp_array is not None, the SNPs with missing data placed before a SNP are not its candidates.
+    '''
+
+    # get the SNP number
+    snp_number = len(snp_id_list)
+
+    # get the contig and position of every SNP (the variant identification format is contig-position)
+    contig_list = []
+    pos_list = []
+    for snp_id in snp_id_list:
+        (contig, pos) = snp_id.rsplit('-', 1)
+        contig_list.append(contig)
+        pos_list.append(int(pos))
+
+    # get the positions in the SNP data sorted by contig and position and the rank of every SNP in this order
+    order_array = np.array(sorted(range(snp_number), key=lambda i: (contig_list[i], pos_list[i])), dtype=np.int64)
+    rank_array = np.zeros(snp_number, dtype=np.int64)
+    rank_array[order_array] = np.arange(snp_number)
+
+    # get the positions (bp) in this order and the range of every contig
+    sorted_pos_array = np.array(pos_list, dtype=np.int64)[order_array]
+    contig_start_array = np.zeros(snp_number, dtype=np.int64)
+    contig_end_array = np.zeros(snp_number, dtype=np.int64)
+    start = 0
+    for rank in range(1, snp_number + 1):
+        if rank == snp_number or contig_list[order_array[rank]] != contig_list[order_array[start]]:
+            contig_start_array[start:rank] = start
+            contig_end_array[start:rank] = rank
+            start = rank
+
+    # build the LD window dictionary
+    ld_window_dict = {}
+    ld_window_dict['is_window'] = ld_window_bp is not None or ld_window_snps is not None or ld_same_contig == 'Y'
+    ld_window_dict['ld_window_bp'] = ld_window_bp
+    ld_window_dict['ld_window_snps'] = ld_window_snps
+    ld_window_dict['ld_same_contig'] = ld_same_contig == 'Y' or ld_window_bp is not None
+    ld_window_dict['snp_number'] = snp_number
+    ld_window_dict['order_array'] = order_array
+    ld_window_dict['rank_array'] = rank_array
+    ld_window_dict['sorted_pos_array'] = sorted_pos_array
+    ld_window_dict['contig_start_array'] = contig_start_array
+    ld_window_dict['contig_end_array'] = contig_end_array
+    ld_window_dict['new_snp_array'] = new_snp_array
+    ld_window_dict['withmd_snp_array'] = withmd_snp_array
+
+    # return the LD window dictionary
+    return ld_window_dict
+
+#-------------------------------------------------------------------------------
+
+def get_ld_candidate_index_array(ld_window_dict, index_1):
+    '''
+    Get the positions in the SNP data of the candidate SNPs to calculate the linkage disequilibrium with a SNP
+    (the SNP itself is included when it is a candidate).
+    '''
+
+    # get the positions of the SNPs in the window of the SNP
+    index_2_array = get_ld_window_index_array(ld_window_dict, index_1)
+
+    # limit the candidate SNPs to the new SNPs when the SNP is not new
+    new_snp_array = ld_window_dict['new_snp_array']
+    if new_snp_array is not None and not new_snp_array[index_1]:
+        index_2_array = index_2_array[new_snp_array[index_2_array]]
+
+    # remove the SNPs with missing data placed before the SNP (the pair was calculated with the first SNP)
+    withmd_snp_array = ld_window_dict['withmd_snp_array']
+    if withmd_snp_array is not None:
+        index_2_array = index_2_array[~(withmd_snp_array[index_2_array] & (index_2_array < index_1))]
+
+    # return the positions of the candidate SNPs in the SNP data
+    return index_2_array
+
+#-------------------------------------------------------------------------------
+
+def get_ld_window_index_array(ld_window_dict, index_1):
+    '''
+    Get the positions in the SNP data of the SNPs in the window of a SNP (the SNP itself is included).
+    '''
+
+    # when there is not window, every SNP is a candidate
+    if not ld_window_dict['is_window']:
+        return np.arange(ld_window_dict['snp_number'])
+
+    # initialize the range of candidate SNPs in the order by contig and position
+    rank_1 = ld_window_dict['rank_array'][index_1]
+    start = 0
+    end = ld_window_dict['snp_number']
+
+    # limit the range to the contig of the SNP
+    if ld_window_dict['ld_same_contig']:
+        start = ld_window_dict['contig_start_array'][rank_1]
+        end = ld_window_dict['contig_end_array'][rank_1]
+
+    # limit the range to the maximum distance in bp
+    if ld_window_dict['ld_window_bp'] is not None:
+        pos_1 = ld_window_dict['sorted_pos_array'][rank_1]
+        contig_pos_array = ld_window_dict['sorted_pos_array'][start:end]
+        end = start + np.searchsorted(contig_pos_array, pos_1 + ld_window_dict['ld_window_bp'], side='right')
+        start = start + np.searchsorted(contig_pos_array, pos_1 - ld_window_dict['ld_window_bp'], side='left')
+
+    # limit the range to the neighbouring SNPs
+    if ld_window_dict['ld_window_snps'] is not None:
+        start = max(start, rank_1 - ld_window_dict['ld_window_snps'])
+        end = min(end, rank_1 + ld_window_dict['ld_window_snps'] + 1)
+
+    # return the positions of the SNPs of the window in the SNP data
+    return ld_window_dict['order_array'][start:end]
+
+#-------------------------------------------------------------------------------
+
+def initialize_ld_worker(shm_name, gt_bitset_shape, gt_bitset_dtype, variant_id_list, ld_window_dict, trace_status):
+    '''
+    Initialize a worker process of the popcount LD engine attaching the shared memory block with the bitsets
+    of genotype classes (the data are read-only and they are kept in the global LD worker dictionary).
+    '''
+
+    # attach the shared memory block
+    shm = shared_memory.SharedMemory(name=shm_name)
+
+    # set the trace status of the process
+    genlib.Message.set_trace_status(trace_status)
+
+    # save the data of the worker process
+    ld_worker_dict['shm'] = shm
+    ld_worker_dict['gt_bitset_array'] = np.ndarray(gt_bitset_shape, dtype=np.dtype(gt_bitset_dtype), buffer=shm.buf)
+    ld_worker_dict['variant_id_list'] = variant_id_list
+    ld_worker_dict['ld_window_dict'] = ld_window_dict
+
+#-------------------------------------------------------------------------------
+
+def calculate_chunk_linkage_disequilibrium(index_1_list):
+    '''
+    Calculate the linkage disequilibrium of a chunk of SNPs in a worker process of the popcount LD engine.
+    '''
+
+    # initialize the result list
+    ld_result_list = []
+
+    # calculate the linkage disequilibrium of every SNP of the chunk
+    for index_1 in index_1_list:
+        ld_result_list.append(calculate_snp_linkage_disequilibrium(index_1, ld_worker_dict['gt_bitset_array'], ld_worker_dict['variant_id_list'], ld_worker_dict['ld_window_dict']))
+
+    # return the result list
+    return ld_result_list
+
+#-------------------------------------------------------------------------------
+
+def calculate_snp_linkage_disequilibrium(index_1, gt_bitset_array, variant_id_list, ld_window_dict):
+    '''
+    Calculate the linkage disequilibrium of a SNP with its candidate SNPs using the bitsets of genotype classes.
+    '''
+
+    # get the positions of the candidate SNPs
+    index_2_array = get_ld_candidate_index_array(ld_window_dict, index_1)
+
+    # calculate the observed genotype counts of the first SNP with every candidate SNP
+    count_matrix = calculate_ld_counts_popcount(gt_bitset_array, index_1, index_2_array)
+
+    # calculate the linkage disequilibrium measures
+    (dhat_array, r2_array) = calculate_ld_measures(count_matrix, variant_id_list[index_1], [variant_id_list[index_2] for index_2 in index_2_array])
+
+    # return the linkage disequilibrium data
+    return index_1, index_2_array, dhat_array, r2_array
+
+#-------------------------------------------------------------------------------
+
+def calculate_block_linkage_disequilibrium(ld_writer, block_snp_id_list_1, snp_index_dict, snp_matrix_dict, ld_window_dict, gt_indicator_array, ld_top_k, ld_min_r2):
+    '''
+    Calculate the linkage disequilibrium of a block of SNPs.
+    '''
+
+    # get the positions of the SNPs of the block in the SNP data and the positions of their candidate SNPs
+    block_index_list_1 = [snp_index_dict[snp_id_1] for snp_id_1 in block_snp_id_list_1]
+    index_2_array_list = [get_ld_candidate_index_array(ld_window_dict, index_1) for index_1 in block_index_list_1]
+
+    # get the union of the candidate SNPs of the block (without window and new SNPs, it is every SNP)
+    if ld_window_dict['is_window'] or ld_window_dict['new_snp_array'] is not None:
+        block_index_2_array = np.unique(np.concatenate(index_2_array_list))
+    else:
+        block_index_2_array = np.arange(ld_window_dict['snp_number'])
+
+    # calculate the observed genotype counts of the SNPs of the block with every candidate SNP of the block
+    count_array = calculate_ld_counts_gemm(gt_indicator_array, block_index_list_1, block_index_2_array)
+
+    # save the linkage disequilibrium data of each SNP of the block with its candidate SNPs
+    for k, snp_id_1 in enumerate(block_snp_id_list_1):
+        index_2_array = index_2_array_list[k]
+        count_matrix = count_array[:, k, np.searchsorted(block_index_2_array, index_2_array)].astype(np.int64)
+        save_snp_linkage_disequilibrium(ld_writer, snp_id_1, block_index_list_1[k], index_2_array, count_matrix, snp_matrix_dict, ld_top_k, ld_min_r2)
+
+#-------------------------------------------------------------------------------
+
+def save_snp_linkage_disequilibrium(ld_writer, snp_id_1, index_1, index_2_array, count_matrix, snp_matrix_dict, ld_top_k, ld_min_r2):
+    '''
+    Calculate the linkage disequilibrium measures of a SNP from its observed genotype counts with its candidate SNPs
+    (positions index_2_array in the SNP data) and save them into the table "vcf_linkage_disequilibrium" using its bulk writer.
+    '''
+
+    # calculate the linkage disequilibrium measures
+    snp_id_list_2 = [snp_matrix_dict['variant_id_list'][index_2] for index_2 in index_2_array]
+    (dhat_array, r2_array) = calculate_ld_measures(count_matrix, snp_id_1, snp_id_list_2)
+
+    # save the linkage disequilibrium measures
+    insert_snp_linkage_disequilibrium(ld_writer, index_1, index_2_array, dhat_array, r2_array, snp_matrix_dict, ld_top_k, ld_min_r2)
+
+#-------------------------------------------------------------------------------
+
+def insert_snp_linkage_disequilibrium(ld_writer, index_1, index_2_array, dhat_array, r2_array, snp_matrix_dict, ld_top_k, ld_min_r2):
+    '''
+    Save the linkage disequilibrium measures of a SNP with its candidate SNPs into the table "vcf_linkage_disequilibrium"
+    using its bulk writer (the SNPs are identified by their variant keys). When ld_min_r2 is not None, only the candidate SNPs
+    whose r^2 is greater than or equal to ld_min_r2 are saved, and when ld_top_k is not None, only the ld_top_k candidate SNPs
+    without missing data with highest r^2 are saved.
+    '''
+
+    # get the positions in index_2_array of the remained SNP identifications whose r^2 reaches the minimum
+    r2_list = r2_array.tolist()
+    if ld_min_r2 is None:
+        k_list = [k for k, index_2 in enumerate(index_2_array.tolist()) if index_2 != index_1]
+    else:
+        k_list = [k for k, index_2 in enumerate(index_2_array.tolist()) if index_2 != index_1 and r2_list[k] >= ld_min_r2]
+
+    # select the ld_top_k positions of SNPs without missing data with highest r^2 using a bounded heap
+    # (ties are ranked by the variant identification, like in the imputation plan)
+    if ld_top_k is not None:
+        k_list = [k for k in k_list if snp_matrix_dict['sample_withmd_list_list'][index_2_array[k]] == '']
+        if len(k_list) > ld_top_k:
+            k_list = sorted(heapq.nsmallest(ld_top_k, k_list, key=lambda k: (-r2_list[k], snp_matrix_dict['variant_id_list'][index_2_array[k]])))
+
+    # save the linkage disequilibrium data of the selected SNP identifications
+    snp_key_1 = snp_matrix_dict['variant_key_list'][index_1]
+    for k in k_list:
+        index_2 = index_2_array[k]
+        ld_row_dict = {}
+        ld_row_dict['snp_key_1'] = snp_key_1
+        ld_row_dict['snp_key_2'] = snp_matrix_dict['variant_key_list'][index_2]
+        ld_row_dict['dhat'] = float(dhat_array[k])
+        ld_row_dict['r2'] = r2_list[k]
+        ld_writer.put(ld_row_dict)
+
+    # record the SNP as completely saved (the checkpoint row is committed with its linkage disequilibrium data)
+    ld_writer.checkpoint({'snp_key_1': snp_key_1})
+
+#-------------------------------------------------------------------------------
+
+def build_gt_indicator_array(sample_gt_matrix):
+    '''
+    Build the indicator matrices of the genotype classes of every SNP from the matrix of sample genotypes using pseudo binary numbers.
+    The result is an array (3 x SNPs x samples) of 0/1 values where the element (c, s, i) is 1 when the genotype of the
+    sample i in the SNP s is 0b00 (c = 0), 0b01 (c = 1) or 0b11 (c = 2); samples with missing data '0b111' are not in any class.
+    '''
+
+    # build the indicator matrix of every genotype class
+    # (float32 represents exactly the counts up to 2^24 samples and uses the fastest BLAS products)
+    gt_indicator_array = np.zeros((3,) + sample_gt_matrix.shape, dtype=np.float32)
+    for c, pseudobinary_gt in enumerate([0, 1, 3]):
+        gt_indicator_array[c] = sample_gt_matrix == pseudobinary_gt
+
+    # return the indicator matrices
+    return gt_indicator_array
+
+#-------------------------------------------------------------------------------
+
+def calculate_ld_counts_gemm(gt_indicator_array, block_index_list_1, block_index_2_array):
+    '''
+    Calculate the observed genotype counts of a block of SNPs with other SNPs using matrix products of the indicator matrices
+    of the genotype classes. The result is an array (9 x block SNPs x other SNPs) with the counts n1 ... n9 of each pair of SNPs.
+    '''
+
+    # get the indicator matrices of the SNPs of the block and the other SNPs
+    block_indicator_array = gt_indicator_array[:, block_index_list_1, :]
+    if len(block_index_2_array) < gt_indicator_array.shape[1]:
+        gt_indicator_array = gt_indicator_array[:, block_index_2_array, :]
+
+    # calculate the count of each genotype pair as the product of the indicator matrices of both classes
+    # (n1 ... n9 have the same layout as in calculate_ld_counts_popcount)
+    count_array = np.zeros((9, len(block_index_list_1), len(block_index_2_array)), dtype=np.float32)
+    for c1 in range(3):
+        for c2 in range(3):
+            np.matmul(block_indicator_array[c1], gt_indicator_array[c2].T, out=count_array[c1 * 3 + c2])
+
+    # return the count array
+    return count_array
+
+#-------------------------------------------------------------------------------
+
+def build_gt_bitset_array(sample_gt_matrix):
+    '''
+    Build the bitsets of the genotype classes of every SNP from the matrix of sample genotypes using pseudo binary numbers.
+    The result is an array (SNPs x 3 x words) of 64-bit words where the bit i of the class c is 1 when the genotype
+    of the sample i is 0b00 (c = 0), 0b01 (c = 1) or 0b11 (c = 2); samples with missing data '0b111' are not in any class.
+    '''
+
+    # get the SNP number, sample number and 64-bit word number
+    (snp_number, sample_number) = sample_gt_matrix.shape
+    word_number = (sample_number + 63) // 64
+
+    # build the boolean matrix of every genotype class with the sample number padded to the bit number of the words
+    class_matrix = np.zeros((snp_number, 3, word_number * 64), dtype=bool)
+    for c, pseudobinary_gt in enumerate([0, 1, 3]):
+        class_matrix[:, c, :sample_number] = sample_gt_matrix == pseudobinary_gt
+
+    # pack the bits in 64-bit words
+    gt_bitset_array = np.packbits(class_matrix, axis=2, bitorder='little').view(np.uint64)
+
+    # return the bitsets
+    return gt_bitset_array
+
+#-------------------------------------------------------------------------------
+
+def popcount(word_array):
+    '''
+    Count the bits set to 1 in the last axis of an array of 64-bit words.
+    '''
+
+    # use the native bit count when NumPy has it (NumPy >= 2.0)
+    if hasattr(np, 'bitwise_count'):
+        bit_count_array = np.bitwise_count(word_array).sum(axis=-1, dtype=np.int64)
+
+    # otherwise, count the bits of every byte using a lookup table
+    else:
+        byte_bit_count_array = np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis], axis=1).sum(axis=1)
+        byte_array = word_array.view(np.uint8)
+        bit_count_array = byte_bit_count_array[byte_array].sum(axis=-1, dtype=np.int64)
+
+    # return the bit counts
+    return bit_count_array
+
+#-------------------------------------------------------------------------------
+
+def calculate_ld_counts_popcount(gt_bitset_array, index_1, index_2_array):
+    '''
+    Calculate the observed genotype counts of a SNP with other SNPs using the bitsets of the genotype classes.
+    The result is a matrix (9 x other SNPs) with the counts n1 ... n9 of each pair of SNPs.
+    '''
+
+    # get the bitsets of the first SNP
+    gt_bitset_1 = gt_bitset_array[index_1]
+
+    # calculate the count of each genotype pair as the popcount of the AND of the bitsets of both classes
+    #
+    #  ri: reference allele of SNPi; ai: alternative allele of SNPi; ni: count of observed genotype pair i
+    #         r2-r2 r2-a2 a2-a2
+    #        +-----------------
+    #  r1-r1 |  n1    n2    n3
+    #  r1-a1 |  n4    n5    n6
+    #  a1-a1 |  n7    n8    n9
+    #
+    # (samples with missing data '0b111' are not in any bitset, so they are not considered!!!)
+    count_matrix = np.zeros((9, len(index_2_array)), dtype=np.int64)
+    for c2 in range(3):
+        gt_bitset_2_array = gt_bitset_array[index_2_array, c2, :]
+        for c1 in range(3):
+            count_matrix[c1 * 3 + c2] = popcount(gt_bitset_2_array & gt_bitset_1[c1])
+
+    # return the count matrix
+    return count_matrix
+
+#-------------------------------------------------------------------------------
+
+def calculate_ld_measures(count_matrix, snp_id_1, snp_id_list_2):
+    '''
+    Calculate the linkage disequilibrium measures D^ and r^2 of a SNP with other SNPs (snp_id_list_2) from the observed genotype counts
+    (Ragsdale, Gravel - 2020 - Unbiased Estimation of Linkage Disequilibrium from Unphased Data).
+    '''
+
+    # get the observed genotype counts and the sample numbers without missing data
+    (n1, n2, n3, n4, n5, n6, n7, n8, n9) = count_matrix
+    n = count_matrix.sum(axis=0)
+
+    # calculate the allele frequencies
+    #
+    # rfi: reference allele frequency of SNP i; afi: alternative allele frequency of SNP i
+    rf1 = (n1 + n2 + n3) * 2 + n4 + n5 + n6
+    af1 = (n7 + n8 + n9) * 2 + n4 + n5 + n6
+    rf2 = (n1 + n4 + n7) * 2 + n2 + n5 + n8
+    af2 = (n3 + n6 + n9) * 2 + n2 + n5 + n8
+
+    with np.errstate(divide='ignore', invalid='ignore'):
 
         # calculate the unbiased estimator for the covariance of alleles co-occurring on a haplotype
-        # (Ragsdale, Gravel - 2020 - Unbiased Estimation of Linkage Disequilibrium from Unphased Data)
         dhat = ((n1 + n2/2 + n4/2 + n5/4) * (n5/4 + n6/2 + n8/2 + n9) - (n2/2 + n3 + n5/4 + n6/2) * (n4/2 + n5/4 + n7 + n8/2)) / (n * (n - 1))
 
         # calculate the squared correlation
-        try:
-            rf1 = rf1 / (n * 2)
-            af1 = af1 / (n * 2)
-            rf2 = rf2 / (n * 2)
-            af2 = af2 / (n * 2)
-            r2 = (dhat ** 2) / (rf1 * af1 * rf2 * af2)
-        except ZeroDivisionError:
-            r2 = -999
+        rf1 = rf1 / (n * 2)
+        af1 = af1 / (n * 2)
+        rf2 = rf2 / (n * 2)
+        af2 = af2 / (n * 2)
+        r2 = (dhat ** 2) / (rf1 * af1 * rf2 * af2)
+
+    # set D^ to 0 when it can not be calculated and r^2 to -999 when it can not be calculated
+    dhat_md = n * (n - 1) == 0
+    r2_md = dhat_md | (rf1 * af1 * rf2 * af2 == 0)
+    dhat[dhat_md] = 0
+    r2[r2_md] = -999
+    for index_2 in np.flatnonzero(r2_md):
+        if snp_id_list_2[index_2] != snp_id_1:
             genlib.Message.print('trace', '*** WARNING: LD r^2 is not calculated because a ZeroDivisionError exception was raised.')
-            genlib.Message.print('trace', f'snp_id_1: {snp_id_1} - snp_id_2: {snp_id_2}')
-            genlib.Message.print('trace', f'n: {n} - n1: {n1} - n2: {n2} - n3: {n3} - n4: {n4} - n5: {n5} - n6: {n6} - n7: {n7} - n8: {n8} - n9: {n9}')
-            genlib.Message.print('trace', f'rf1: {rf1} - af1: {af1} - rf2: {rf2} - af2: {af2}')
+            genlib.Message.print('trace', f'snp_id_1: {snp_id_1} - snp_id_2: {snp_id_list_2[index_2]}')
+            genlib.Message.print('trace', f'n: {n[index_2]} - n1: {n1[index_2]} - n2: {n2[index_2]} - n3: {n3[index_2]} - n4: {n4[index_2]} - n5: {n5[index_2]} - n6: {n6[index_2]} - n7: {n7[index_2]} - n8: {n8[index_2]} - n9: {n9[index_2]}')
+            genlib.Message.print('trace', f'rf1: {rf1[index_2]} - af1: {af1[index_2]} - rf2: {rf2[index_2]} - af2: {af2[index_2]}')
 
-        # save linkage disequilibrium data into the table "vcf_linkage_disequilibrium"
-        ld_row_dict = {}
-        ld_row_dict['snp_id_1'] = snp_id_1
-        ld_row_dict['snp_id_2'] = snp_id_2
-        ld_row_dict['dhat'] = dhat
-        ld_row_dict['r2'] = r2
-        ld_row_dict['sample_withmd_list_2'] = snp_data_dict_2['sample_withmd_list']
-        semaphore.acquire()
-        sqllib.insert_vcf_linkage_disequilibrium_row(conn, ld_row_dict)
-        semaphore.release()
+    # return D^ and r^2
+    return dhat, r2
 
 #-------------------------------------------------------------------------------
 
@@ -31,6 +31,7 @@ import os
 import re
 import subprocess
 import sys
+import threading
 
 #-------------------------------------------------------------------------------
 
@@ -712,9 +713,12 @@ def run_command(command, log, is_script):
 
 #-------------------------------------------------------------------------------
 
-def read_vcf_file(vcf_file_id, sample_number, check_sample_number=True):
+def read_vcf_file(vcf_file_id, sample_number, check_sample_number=True, parse_filter=None):
     '''
     Read a VCF file record.
+    When parse_filter is not None, it is a function of the variant identification (seq_id-pos) and the record
+    that decides if a variant record is parsed; the data dictionary of a variant record not parsed only has
+    the sequence identification and the position, so the record has to be used as it is.
     '''
 
     # initialize the data dictionary
@@ -746,41 +750,58 @@ def read_vcf_file(vcf_file_id, sample_number, check_sample_number=True):
     # variant record
     elif record != '' and not record.startswith('##') and not record.startswith('#CHROM'):
 
-        # initialize the record data list
-        record_data_list = []
+        # the variant record is not parsed when the parse filter rejects it
+        record_data_list = record.split('\t', 2)
+        if parse_filter is not None and not parse_filter(f'{record_data_list[0].strip()}-{record_data_list[1].strip()}', record):
 
-        # build the record data list
-        start = 0
-        for end in [i for i, chr in enumerate(record) if chr == '\t']:
-            record_data_list.append(record[start:end].strip())
-            start = end + 1
-        record_data_list.append(record[start:].strip('\n').strip())
+            # set data
+            data_chrom = record_data_list[0].strip()
+            data_pos = record_data_list[1].strip()
 
-        # check the length of the record data list
-        if check_sample_number and len(record_data_list) - 9 != sample_number:
-            print(f'sample_number: {sample_number}')
-            print(f'len(record_data_list) - 9: {len(record_data_list) - 9}')
-            raise ProgramException('', 'L001', record_data_list[0], record_data_list[1])
-
-        # set data
-        data_chrom = record_data_list[0]
-        data_pos = record_data_list[1]
-        data_id = record_data_list[2]
-        data_ref = record_data_list[3]
-        data_alt = record_data_list[4]
-        data_qual = record_data_list[5]
-        data_filter = record_data_list[6]
-        data_info = record_data_list[7]
-        data_format = record_data_list[8]
-        data_sample_list = []
-        for i in range(len(record_data_list) - 9):
-            data_sample_list.append(record_data_list[i + 9])
+            # set the key
+            key = f'{data_chrom}-{int(data_pos):09d}'
 
-        # set the key
-        key = f'{data_chrom}-{int(data_pos):09d}'
+            # get the record data dictionary
+            data_dict = {'chrom': data_chrom, 'pos': data_pos, 'is_parsed': False}
+
+        # the variant record is parsed
+        else:
 
-        # get the record data dictionary
-        data_dict = {'chrom': data_chrom, 'pos': data_pos, 'id': data_id, 'ref': data_ref, 'alt': data_alt, 'qual': data_qual, 'filter': data_filter, 'info': data_info, 'format': data_format, 'sample_list': data_sample_list}
+            # initialize the record data list
+            record_data_list = []
+
+            # build the record data list
+            start = 0
+            for end in [i for i, chr in enumerate(record) if chr == '\t']:
+                record_data_list.append(record[start:end].strip())
+                start = end + 1
+            record_data_list.append(record[start:].strip('\n').strip())
+
+            # check the length of the record data list
+            if check_sample_number and len(record_data_list) - 9 != sample_number:
+                print(f'sample_number: {sample_number}')
+                print(f'len(record_data_list) - 9: {len(record_data_list) - 9}')
+                raise ProgramException('', 'L001', record_data_list[0], record_data_list[1])
+
+            # set data
+            data_chrom = record_data_list[0]
+            data_pos = record_data_list[1]
+            data_id = record_data_list[2]
+            data_ref = record_data_list[3]
+            data_alt = record_data_list[4]
+            data_qual = record_data_list[5]
+            data_filter = record_data_list[6]
+            data_info = record_data_list[7]
+            data_format = record_data_list[8]
+            data_sample_list = []
+            for i in range(len(record_data_list) - 9):
+                data_sample_list.append(record_data_list[i + 9])
+
+            # set the key
+            key = f'{data_chrom}-{int(data_pos):09d}'
+
+            # get the record data dictionary
+            data_dict = {'chrom': data_chrom, 'pos': data_pos, 'id': data_id, 'ref': data_ref, 'alt': data_alt, 'qual': data_qual, 'filter': data_filter, 'info': data_info, 'format': data_format, 'sample_list': data_sample_list, 'is_parsed': True}
 
     # there is not any record
     else:
@@ -793,6 +814,25 @@ def read_vcf_file(vcf_file_id, sample_number, check_sample_number=True):
 
 #-------------------------------------------------------------------------------
 
+def check_unparsed_vcf_record(record):
+    '''
+    Check the fields of a variant record not parsed that are validated when it is parsed: the field ALT has
+    only one alternative allele, the subfield GT is the first one of the field FORMAT and the genotype of every sample
+    has a separator. When the record does not pass the check, it has to be parsed to raise the validation error.
+    '''
+
+    # split the record in the fields before the samples and the sample text
+    record_data_list = record.rstrip('\r\n').split('\t', 9)
+
+    # check the number of fields, the field ALT and the first subfield of the field FORMAT
+    if len(record_data_list) < 10 or ',' in record_data_list[4] or record_data_list[8].strip().upper().split(':', 1)[0] != 'GT':
+        return False
+
+    # check that there is not any sample genotype without separator ("/" or "|")
+    return re.search(r'\t[^\t:/|]*[:\t]', f'\t{record_data_list[9]}\t') is None
+
+#-------------------------------------------------------------------------------
+
 def get_miniforge3_code():
     '''
     Get the Miniforge3 code used to identify its processes.
@@ -959,6 +999,24 @@ def get_som_imputation_name():
 
 #-------------------------------------------------------------------------------
 
+def get_knn_imputation_code():
+    '''
+    Get the code of the kNN imputation used to identify its processes.
+    '''
+
+    return 'knn'
+
+#-------------------------------------------------------------------------------
+
+def get_knn_imputation_name():
+    '''
+    Get the name of the kNN imputation used to title its processess.
+    '''
+
+    return 'kNN imputation process'
+
+#-------------------------------------------------------------------------------
+
 def get_submitting_dict():
     '''
     Get the process submitting dictionary.
@@ -972,6 +1030,7 @@ def get_submitting_dict():
     submitting_dict['run_naive_imputation']= {'text': get_naive_imputation_name()}
     submitting_dict['run_gtdb_building']= {'text': get_gtdb_building_name()}
     submitting_dict['run_som_imputation']= {'text': get_som_imputation_name()}
+    submitting_dict['run_knn_imputation']= {'text': get_knn_imputation_name()}
 
     # return the submitting process dictionary
     return submitting_dict
@@ -1012,6 +1071,7 @@ def get_process_dict():
     process_dict[get_naive_imputation_code()]= {'name': get_naive_imputation_name(), 'process_type': get_result_imputation_subdir()}
     process_dict[get_gtdb_building_code()]= {'name': get_gtdb_building_name(), 'process_type': get_result_imputation_subdir()}
     process_dict[get_som_imputation_code()]= {'name': get_som_imputation_name(), 'process_type': get_result_imputation_subdir()}
+    process_dict[get_knn_imputation_code()]= {'name': get_knn_imputation_name(), 'process_type': get_result_imputation_subdir()}
 
     # return the process dictionary
     return process_dict
@@ -1115,6 +1175,159 @@ def get_genotype_imputation_method_text_list():
 
 #-------------------------------------------------------------------------------
 
+def get_executor_code_list():
+    '''
+    Get the code list of "executor".
+    '''
+
+    return ['thread', 'process']
+
+#-------------------------------------------------------------------------------
+
+def get_executor_code_list_text():
+    '''
+    Get the code list of "executor" as text.
+    '''
+
+    return 'thread (worker threads) or process (worker processes)'
+
+#-------------------------------------------------------------------------------
+
+def get_som_engine_code_list():
+    '''
+    Get the code list of "som_engine".
+    '''
+
+    return ['minisom', 'batch']
+
+#-------------------------------------------------------------------------------
+
+def get_som_engine_code_list_text():
+    '''
+    Get the code list of "som_engine" as text.
+    '''
+
+    return 'minisom (a MiniSom instance per variant) or batch (the SOMs of a chunk of variants are trained together)'
+
+#-------------------------------------------------------------------------------
+
+def get_memmap_code_list():
+    '''
+    Get the code list of "memmap".
+    '''
+
+    return ['Y', 'N']
+
+#-------------------------------------------------------------------------------
+
+def get_memmap_code_list_text():
+    '''
+    Get the code list of "memmap" as text.
+    '''
+
+    return 'Y (yes) or N (no)'
+
+#-------------------------------------------------------------------------------
+
+def get_kinship_weighting_code_list():
+    '''
+    Get the code list of "kinship_weighting".
+    '''
+
+    return ['Y', 'N']
+
+#-------------------------------------------------------------------------------
+
+def get_kinship_weighting_code_list_text():
+    '''
+    Get the code list of "kinship_weighting" as text.
+    '''
+
+    return 'Y (yes) or N (no)'
+
+#-------------------------------------------------------------------------------
+
+def get_kinship_weighting_text_list():
+    '''
+    Get the text list of "kinship_weighting".
+    '''
+
+    return ['Yes', 'No']
+
+#-------------------------------------------------------------------------------
+
+def get_ld_engine_code_list():
+    '''
+    Get the code list of "ld_engine".
+    '''
+
+    return ['popcount', 'gemm']
+
+#-------------------------------------------------------------------------------
+
+def get_ld_engine_code_list_text():
+    '''
+    Get the code list of "ld_engine" as text.
+    '''
+
+    return 'popcount (bitsets of genotype classes) or gemm (block matrix products of genotype class indicators)'
+
+#-------------------------------------------------------------------------------
+
+def get_ld_same_contig_code_list():
+    '''
+    Get the code list of "ld_same_contig".
+    '''
+
+    return ['Y', 'N']
+
+#-------------------------------------------------------------------------------
+
+def get_ld_same_contig_code_list_text():
+    '''
+    Get the code list of "ld_same_contig" as text.
+    '''
+
+    return 'Y (yes) or N (no)'
+
+#-------------------------------------------------------------------------------
+
+def get_append_code_list():
+    '''
+    Get the code list of "append".
+    '''
+
+    return ['Y', 'N']
+
+#-------------------------------------------------------------------------------
+
+def get_append_code_list_text():
+    '''
+    Get the code list of "append" as text.
+    '''
+
+    return 'Y (yes) or N (no)'
+
+#-------------------------------------------------------------------------------
+
+def get_resume_code_list():
+    '''
+    Get the code list of "resume".
+    '''
+
+    return ['Y', 'N']
+
+#-------------------------------------------------------------------------------
+
+def get_resume_code_list_text():
+    '''
+    Get the code list of "resume" as text.
+    '''
+
+    return 'Y (yes) or N (no)'
+
+#-------------------------------------------------------------------------------
+
 def get_format_type_code_list():
     '''
     Get the code list of "genotype_imputation_method".
@@ -1187,8 +1400,33 @@ class Const():
 
     DEFAULT_R_ESTIMATOR = 'ru'
     DEFAULT_GENOTYPE_IMPUTATION_METHOD = 'MF'
+    DEFAULT_EXECUTOR = 'thread'
+    DEFAULT_MEMMAP = 'N'
+    DEFAULT_SOM_ENGINE = 'minisom'
+    DEFAULT_KINSHIP_WEIGHTING = 'N'
+    GT_MATRIX_SIDECAR_SUFFIX = '.gt.npy'
+    IMPUTATION_PLAN_SIDECAR_SUFFIX = '.plan.npy'
+    DEFAULT_LD_ENGINE = 'popcount'
+    DEFAULT_LD_SAME_CONTIG = 'N'
+    DEFAULT_APPEND = 'N'
+    DEFAULT_RESUME = 'N'
+    DEFAULT_TRANSACTION_SIZE = 100000
     DEFAULT_TRACE = 'N'
     DEFAULT_VERBOSE = 'N'
+    KINSHIP_CHUNK_SIZE = 1000
+    LD_GEMM_BLOCK_SIZE = 64
+    LD_PROCESS_CHUNK_SIZE = 16
+    SCHEDULER_QUEUE_SIZE_FACTOR = 2
+    SCHEDULER_PROCESS_CHUNK_SIZE = 8
+    SCHEDULER_REORDER_BUFFER_SIZE_FACTOR = 8
+    SOM_BATCH_SIZE = 64
+    SOM_CACHE_SIZE = 1024
+    SOM_CONVERGENCE_CHECK_INTERVAL = 50
+    SQLITE_BULK_CACHE_SIZE_KIB = 524288
+    SQLITE_BULK_PAGE_SIZE = 32768
+    SQLITE_FETCH_SIZE = 100000
+    SQLITE_READ_CACHE_SIZE_KIB = 131072
+    SQLITE_READ_MMAP_SIZE = 1073741824
 
    #---------------
 
@@ -1272,6 +1510,12 @@ class ProgramException(Exception):
         elif code_exception == 'B002':
             Message.print('error', f'*** ERROR {code_exception} in sentence:')
             Message.print('error', f'{param1}')
+        elif code_exception == 'B003':
+            Message.print('error', f'*** ERROR {code_exception}: The genotype database does not have the kinship summations needed to append variants.')
+        elif code_exception == 'B004':
+            Message.print('error', f'*** ERROR {code_exception}: The genotype database does not have a linkage disequilibrium calculation to be resumed.')
+        elif code_exception == 'B005':
+            Message.print('error', f'*** ERROR {code_exception}: The genotype database {param1} does not have the table "vcf_variants" (it is empty or it was built by an old version): rebuild it.')
         elif code_exception == 'F001':
             Message.print('error', f'*** ERROR {code_exception}: The file {param1} can not be opened.')
         elif code_exception == 'F002':
@@ -1298,6 +1542,8 @@ class ProgramException(Exception):
             Message.print('error', f'\n*** ERROR {code_exception}: The variant {param1} has more than one alternative allele.')
         elif code_exception == 'L007':
             Message.print('error', f'\n*** ERROR {code_exception}: The genotype number does not correspond to variant number in the sample {param1}.')
+        elif code_exception == 'L008':
+            Message.print('error', f'*** ERROR {code_exception}: The samples of the VCF file {param1} are not the samples of the genotype database.')
         elif code_exception == 'S001':
             Message.print('error', f'*** ERROR {code_exception}: The {param1} OS is not supported.')
         elif code_exception == 'S002':
@@ -1324,6 +1570,60 @@ class NestedDefaultDict(collections.defaultdict):
 
 #-------------------------------------------------------------------------------
 
+class LRUCache():
+    '''
+    This class is a cache with a maximum number of entries which evicts the least recently used entry
+    when a new entry does not fit (it can be shared by several threads).
+    '''
+
+    #---------------
+
+    def __init__(self, max_size):
+
+        self.max_size = max_size
+        self.entry_dict = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    #---------------
+
+    def __contains__(self, key):
+        '''
+        Check if a key is in the cache (without marking it as used).
+        '''
+
+        with self.lock:
+            return key in self.entry_dict
+    #---------------
+
+    def get(self, key):
+        '''
+        Get the value of a key (None when the key is not in the cache) and mark it as the most recently used.
+        '''
+
+        with self.lock:
+            if key in self.entry_dict:
+                self.entry_dict.move_to_end(key)
+                return self.entry_dict[key]
+            return None
+
+    #---------------
+
+    def put(self, key, value):
+        '''
+        Put the value of a key as the most recently used and evict the least recently used entries
+        while the cache exceeds its maximum size.
+        '''
+
+        with self.lock:
+            self.entry_dict[key] = value
+            self.entry_dict.move_to_end(key)
+            while len(self.entry_dict) > self.max_size:
+                self.entry_dict.popitem(last=False)
+
+   #---------------
+
+#-------------------------------------------------------------------------------
+
 class BreakAllLoops(Exception):
     '''
     This class is used to break out of nested loops.
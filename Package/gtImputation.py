@@ -165,6 +165,16 @@ class MainWindow(QMainWindow):
         action_review_som_imputation.setStatusTip('Review a process of SOM imputation.')
         action_review_som_imputation.triggered.connect(self.action_review_som_imputation_clicked)
 
+        # create and configure "action_run_knn_process"
+        action_run_knn_process = QAction('Run imputation process', self)
+        action_run_knn_process.setStatusTip('Run a process of kNN imputation.')
+        action_run_knn_process.triggered.connect(self.action_run_knn_process_clicked)
+
+        # create and configure "action_review_knn_imputation"
+        action_review_knn_imputation = QAction('Review imputation process', self)
+        action_review_knn_imputation.setStatusTip('Review a process of kNN imputation.')
+        action_review_knn_imputation.triggered.connect(self.action_review_knn_imputation_clicked)
+
         # create and configure "action_browse_submitting_logs"
         action_browse_submitting_logs = QAction('Submitting logs', self)
         action_browse_submitting_logs.setStatusTip('Browse the submitting logs.')
@@ -220,6 +230,12 @@ class MainWindow(QMainWindow):
         submenu_som_imputation.addSeparator()
         submenu_som_imputation.addAction(action_run_som_process)
         submenu_som_imputation.addAction(action_review_som_imputation)
+        menu_imputation.addSeparator()
+        submenu_knn_imputation = menu_imputation.addMenu('kNN imputation')
+        submenu_knn_imputation.addAction(action_run_gtdb_process)
+        submenu_knn_imputation.addSeparator()
+        submenu_knn_imputation.addAction(action_run_knn_process)
+        submenu_knn_imputation.addAction(action_review_knn_imputation)
 
         # create and configure "menu_logs"
         menu_logs = menubar.addMenu('&Logs')
@@ -542,6 +558,66 @@ class MainWindow(QMainWindow):
 
     #---------------
 
+    def action_run_knn_process_clicked(self):
+        '''
+        Run a process of kNN imputation.
+        '''
+
+        # close the existing subwindow
+        if self.current_subwindow is not None:
+            self.current_subwindow.close()
+
+        # if dependencies are OK
+        if self.check_config_file() and self.check_miniforge3() and self.check_gtimputation_env():
+
+            # create a new subwindow to perform the action
+            subwindow = imputations.FormKNNImputation(self)
+
+            # create "widget_central"
+            widget_central = QWidget(self)
+
+            # create and configure "v_box_layout"
+            v_box_layout = QVBoxLayout(widget_central)
+            v_box_layout.addWidget(subwindow, alignment=Qt.AlignCenter)
+
+            # set the central widget in "MainWindow"
+            self.setCentralWidget(widget_central)
+
+            # save the current subwindow
+            self.current_subwindow = subwindow
+
+    #---------------
+
+    def action_review_knn_imputation_clicked(self):
+        '''
+        Review a process of kNN imputation.
+        '''
+
+        # close the existing subwindow
+        if self.current_subwindow is not None:
+            self.current_subwindow.close()
+
+        # if dependencies are OK
+        if self.check_config_file():
+
+            # create a new subwindow to perform the action
+            subwindow = imputations.FormKNNImputationReview(self)
+
+            # create "widget_central"
+            widget_central = QWidget(self)
+
+            # create and configure "v_box_layout"
+            v_box_layout = QVBoxLayout(widget_central)
+            v_box_layout.addWidget(subwindow, alignment=Qt.AlignCenter)
+
+            # set the central widget in "MainWindow"
+            self.setCentralWidget(widget_central)
+
+            # save the current subwindow
+            self.current_subwindow = subwindow
+
+    #---------------
+
     def action_browse_submitting_logs_clicked(self):
         '''
         Browse submitting logs.
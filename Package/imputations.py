@@ -3948,6 +3948,1752 @@ class FormSOMImputationReview(QWidget):
 
 #-------------------------------------------------------------------------------
 
+class FormKNNImputation(QWidget):
+    '''
+    Class used to perform a kNN imputation.
+    '''
+
+    #---------------
+
+    def __init__(self, parent):
+        '''
+        Create a class instance.
+        '''
+
+        # save parameters in instance variables
+        self.parent = parent
+
+        # call the init method of the parent class
+        super().__init__()
+
+        # set the dimensions window
+        self.window_height = self.parent.WINDOW_HEIGHT - 100
+        self.window_width = self.parent.WINDOW_WIDTH - 50
+
+        # set the head and title
+        self.head = genlib.get_knn_imputation_name()
+        self.title = f'{genlib.get_app_short_name()} - {self.head}'
+
+        # get the dictionary of application configuration
+        self.app_config_dict = genlib.get_config_dict(genlib.get_app_config_file())
+
+        # get the the code list and text list of genotype imputation method
+        self.gim_code_list = genlib.get_genotype_imputation_method_code_list()
+        self.gim_text_list = genlib.get_genotype_imputation_method_text_list()
+
+        # get the the code list and text list of kinship weighting
+        self.kw_code_list = genlib.get_kinship_weighting_code_list()
+        self.kw_text_list = genlib.get_kinship_weighting_text_list()
+
+        # build the graphic user interface of the window
+        self.build_gui()
+
+        # load initial data in inputs
+        self.initialize_inputs()
+
+        # check the content of inputs
+        self.check_inputs()
+
+        # show the window
+        self.show()
+
+    #---------------
+
+    def build_gui(self):
+        '''
+        Build the graphic user interface of the window.
+        '''
+
+        # set the width and height of the window
+        self.setFixedSize(self.window_width, self.window_height)
+
+        # move the window at center
+        rectangle = self.frameGeometry()
+        central_point = QGuiApplication.primaryScreen().availableGeometry().center()
+        rectangle.moveCenter(central_point)
+        self.move(rectangle.topLeft())
+
+        # get font metrics information
+        fontmetrics = QFontMetrics(QApplication.font())
+
+        # create and configure "label_head"
+        label_head = QLabel(self.head, alignment=Qt.AlignCenter)
+        label_head.setStyleSheet('font: bold 14px; color: black; background-color: lightGray; max-height: 30px')
+
+        # create and configure "label_threads"
+        label_threads = QLabel()
+        label_threads.setText('Threads')
+        label_threads.setFixedWidth(fontmetrics.width('9'*10))
+
+        # create and configure "lineedit_threads"
+        self.lineedit_threads  = QLineEdit()
+        self.lineedit_threads.setFixedWidth(fontmetrics.width('9'*6))
+        self.lineedit_threads.editingFinished.connect(self.check_inputs)
+        self.lineedit_threads.setDisabled(True)
+
+        # create and configure "label_gtdb"
+        label_gtdb = QLabel()
+        label_gtdb.setText('Genotype database')
+        label_gtdb.setFixedWidth(fontmetrics.width('9'*16))
+
+        # create and configure "combobox_gtdb"
+        self.combobox_gtdb = QComboBox()
+        self.combobox_gtdb.setFixedWidth(fontmetrics.width('9'*20))
+        self.combobox_gtdb.currentIndexChanged.connect(self.check_inputs)
+
+        # create and configure "label_file_format"
+        label_file_format = QLabel()
+        label_file_format.setText('File format')
+        label_file_format.setFixedWidth(fontmetrics.width('9'*10))
+
+        # create and configure "lineedit_file_format"
+        self.lineedit_file_format  = QLineEdit()
+        self.lineedit_file_format.setFixedWidth(fontmetrics.width('9'*10))
+        self.lineedit_file_format.editingFinished.connect(self.check_inputs)
+        self.lineedit_file_format.setDisabled(True)
+
+        # create and configure "label_mdc"
+        label_mdc = QLabel()
+        label_mdc.setText('MD char in tabular format')
+        label_mdc.setFixedWidth(fontmetrics.width('9'*20))
+
+        # create and configure "lineedit_mdc"
+        self.lineedit_mdc  = QLineEdit()
+        self.lineedit_mdc.setFixedWidth(fontmetrics.width('9'*10))
+        self.lineedit_mdc.editingFinished.connect(self.check_inputs)
+        self.lineedit_mdc.setDisabled(True)
+
+        # create and configure "label_file_path"
+        label_file_path = QLabel()
+        label_file_path.setText('File path')
+        label_file_path.setFixedWidth(fontmetrics.width('9'*10))
+
+        # create and configure "lineedit_file_path"
+        self.lineedit_file_path  = QLineEdit()
+        self.lineedit_file_path.editingFinished.connect(self.check_inputs)
+        self.lineedit_file_path.setDisabled(True)
+
+        # create and configure "label_neighbours"
+        label_neighbours = QLabel()
+        label_neighbours.setText('Neighbours #')
+        label_neighbours.setFixedWidth(fontmetrics.width('9'*12))
+
+        # create and configure "lineedit_neighbours"
+        self.lineedit_neighbours  = QLineEdit()
+        self.lineedit_neighbours.setFixedWidth(fontmetrics.width('9'*6))
+        self.lineedit_neighbours.editingFinished.connect(self.check_inputs)
+
+        # create and configure "label_kw"
+        label_kw = QLabel()
+        label_kw.setText('Kinship weighting')
+        label_kw.setFixedWidth(fontmetrics.width('9'*18))
+
+        # create and configure "combobox_kw"
+        self.combobox_kw = QComboBox()
+        self.combobox_kw.currentIndexChanged.connect(self.check_inputs)
+        self.combobox_kw.setFixedWidth(fontmetrics.width('9'*22))
+
+        # create and configure "label_empty"
+        label_empty = QLabel()
+        label_empty.setFixedWidth(fontmetrics.width('9'*3))
+
+        # create and configure "gridlayout_knnparam"
+        gridlayout_knnparam = QGridLayout()
+        gridlayout_knnparam.setColumnStretch(0, 1)
+        gridlayout_knnparam.setColumnStretch(1, 1)
+        gridlayout_knnparam.setColumnStretch(2, 1)
+        gridlayout_knnparam.setColumnStretch(3, 1)
+        gridlayout_knnparam.setColumnStretch(4, 1)
+        gridlayout_knnparam.setColumnStretch(5, 1)
+        gridlayout_knnparam.setColumnStretch(6, 2)
+        gridlayout_knnparam.setColumnStretch(7, 2)
+        gridlayout_knnparam.addWidget(label_neighbours, 0, 0)
+        gridlayout_knnparam.addWidget(self.lineedit_neighbours, 0, 1, alignment=Qt.AlignLeft)
+        gridlayout_knnparam.addWidget(label_empty, 0, 2)
+        gridlayout_knnparam.addWidget(label_empty, 0, 5)
+        gridlayout_knnparam.addWidget(label_kw, 0, 6)
+        gridlayout_knnparam.addWidget(self.combobox_kw, 0, 7, alignment=Qt.AlignLeft)
+
+        # create and configure "groupbox_knnparam"
+        groupbox_knnparam = QGroupBox('kNN parameters')
+        groupbox_knnparam.setLayout(gridlayout_knnparam)
+
+        # create and configure "label_mr2"
+        label_mr2 = QLabel()
+        label_mr2.setText('Minimum r^2')
+        label_mr2.setFixedWidth(fontmetrics.width('9'*12))
+
+        # create and configure "lineedit_mr2"
+        self.lineedit_mr2  = QLineEdit()
+        self.lineedit_mr2.setFixedWidth(fontmetrics.width('9'*6))
+        self.lineedit_mr2.editingFinished.connect(self.check_inputs)
+
+        # create and configure "label_snps"
+        label_snps = QLabel()
+        label_snps.setText('SNPs #')
+        label_snps.setFixedWidth(fontmetrics.width('9'*12))
+
+        # create and configure "lineedit_snps"
+        self.lineedit_snps  = QLineEdit()
+        self.lineedit_snps.setFixedWidth(fontmetrics.width('9'*6))
+        self.lineedit_snps.editingFinished.connect(self.check_inputs)
+
+        # create and configure "label_gim"
+        label_gim = QLabel()
+        label_gim.setText('Imputation method')
+        label_gim.setFixedWidth(fontmetrics.width('9'*18))
+
+        # create and configure "combobox_gim"
+        self.combobox_gim = QComboBox()
+        self.combobox_gim.currentIndexChanged.connect(self.check_inputs)
+        self.combobox_gim.setFixedWidth(fontmetrics.width('9'*22))
+
+        # create and configure "gridlayout_snpsparam"
+        gridlayout_snpsparam = QGridLayout()
+        gridlayout_snpsparam.setColumnStretch(0, 1)
+        gridlayout_snpsparam.setColumnStretch(1, 1)
+        gridlayout_snpsparam.setColumnStretch(2, 1)
+        gridlayout_snpsparam.setColumnStretch(3, 1)
+        gridlayout_snpsparam.setColumnStretch(4, 1)
+        gridlayout_snpsparam.setColumnStretch(5, 1)
+        gridlayout_snpsparam.setColumnStretch(6, 2)
+        gridlayout_snpsparam.setColumnStretch(7, 2)
+        gridlayout_snpsparam.addWidget(label_mr2, 0, 0)
+        gridlayout_snpsparam.addWidget(self.lineedit_mr2, 0, 1, alignment=Qt.AlignLeft)
+        gridlayout_snpsparam.addWidget(label_empty, 0, 2)
+        gridlayout_snpsparam.addWidget(label_snps, 0, 3)
+        gridlayout_snpsparam.addWidget(self.lineedit_snps, 0, 4, alignment=Qt.AlignLeft)
+        gridlayout_snpsparam.addWidget(label_empty, 0, 5)
+        gridlayout_snpsparam.addWidget(label_gim, 0, 6)
+        gridlayout_snpsparam.addWidget(self.combobox_gim, 0, 7, alignment=Qt.AlignLeft)
+
+        # create and configure "groupbox_snpsparam"
+        groupbox_snpsparam = QGroupBox('SNPs selection parameters')
+        groupbox_snpsparam.setLayout(gridlayout_snpsparam)
+
+        # create and configure "gridlayout_data"
+        gridlayout_data = QGridLayout()
+        gridlayout_data.setRowMinimumHeight(0, 30)
+        gridlayout_data.setRowMinimumHeight(1, 30)
+        gridlayout_data.setRowMinimumHeight(2, 30)
+        gridlayout_data.setRowMinimumHeight(3, 60)
+        gridlayout_data.setRowMinimumHeight(4, 60)
+        gridlayout_data.setColumnStretch(0,1)
+        gridlayout_data.setColumnStretch(1,1)
+        gridlayout_data.setColumnStretch(2,1)
+        gridlayout_data.setColumnStretch(3,1)
+        gridlayout_data.setColumnStretch(4,1)
+        gridlayout_data.setColumnStretch(5,15)
+        gridlayout_data.addWidget(label_threads, 0, 0)
+        gridlayout_data.addWidget(self.lineedit_threads, 0, 1, alignment=Qt.AlignLeft)
+        gridlayout_data.addWidget(label_empty, 0, 2)
+        gridlayout_data.addWidget(label_gtdb, 0, 3)
+        gridlayout_data.addWidget(self.combobox_gtdb, 0, 4, alignment=Qt.AlignLeft)
+        gridlayout_data.addWidget(label_file_format, 1, 0)
+        gridlayout_data.addWidget(self.lineedit_file_format, 1, 1)
+        gridlayout_data.addWidget(label_empty, 1, 2)
+        gridlayout_data.addWidget(label_mdc, 1, 3)
+        gridlayout_data.addWidget(self.lineedit_mdc, 1, 4)
+        gridlayout_data.addWidget(label_file_path, 2, 0)
+        gridlayout_data.addWidget(self.lineedit_file_path, 2, 1, 1, 5)
+        gridlayout_data.addWidget(groupbox_knnparam, 3, 0, 1, 6)
+        gridlayout_data.addWidget(groupbox_snpsparam, 4, 0, 1, 6)
+
+        # create and configure "groupbox_data"
+        groupbox_data = QGroupBox()
+        groupbox_data.setObjectName('groupbox_data')
+        groupbox_data.setStyleSheet('QGroupBox#groupbox_data {border: 0px;}')
+        groupbox_data.setLayout(gridlayout_data)
+
+        # create and configure "pushbutton_execute"
+        self.pushbutton_execute = QPushButton('Execute')
+        self.pushbutton_execute.setToolTip('Execute the process of the kNN imputation.')
+        self.pushbutton_execute.setCursor(QCursor(Qt.PointingHandCursor))
+        self.pushbutton_execute.clicked.connect(self.pushbutton_execute_clicked)
+
+        # create and configure "pushbutton_close"
+        pushbutton_close = QPushButton('Close')
+        pushbutton_close.setToolTip('Cancel the process of the kNN imputation and close the window.')
+        pushbutton_close.setCursor(QCursor(Qt.PointingHandCursor))
+        pushbutton_close.clicked.connect(self.pushbutton_close_clicked)
+
+        # create and configure "gridlayout_buttons"
+        gridlayout_buttons = QGridLayout()
+        gridlayout_buttons.setColumnStretch(0, 15)
+        gridlayout_buttons.setColumnStretch(1, 1)
+        gridlayout_buttons.setColumnStretch(2, 1)
+        gridlayout_buttons.setColumnStretch(3, 0)
+        gridlayout_buttons.addWidget(self.pushbutton_execute, 0, 1, alignment=Qt.AlignCenter)
+        gridlayout_buttons.addWidget(pushbutton_close, 0, 2, alignment=Qt.AlignCenter)
+
+        # create and configure "groupbox_buttons"
+        groupbox_buttons = QGroupBox()
+        groupbox_buttons.setObjectName('groupbox_buttons')
+        groupbox_buttons.setStyleSheet('QGroupBox#groupbox_buttons {border: 0px;}')
+        groupbox_buttons.setLayout(gridlayout_buttons)
+
+        # create and configure "gridlayout_central"
+        gridlayout_central = QGridLayout()
+        gridlayout_central.setRowStretch(0, 1)
+        gridlayout_central.setRowStretch(1, 1)
+        gridlayout_central.setRowStretch(2, 1)
+        gridlayout_central.setRowStretch(3, 1)
+        gridlayout_central.setRowStretch(4, 1)
+        gridlayout_central.setColumnStretch(0, 0)
+        gridlayout_central.setColumnStretch(1, 1)
+        gridlayout_central.setColumnStretch(2, 0)
+        gridlayout_central.addWidget(label_head, 0, 1)
+        gridlayout_central.addWidget(QLabel(), 1, 1)
+        gridlayout_central.addWidget(groupbox_data, 2, 1)
+        gridlayout_central.addWidget(QLabel(), 3, 1)
+        gridlayout_central.addWidget(groupbox_buttons, 4, 1)
+
+        # create and configure "groupbox_central"
+        groupbox_central = QGroupBox()
+        groupbox_central.setLayout(gridlayout_central)
+
+        # create and configure "vboxlayout"
+        vboxlayout = QVBoxLayout(self)
+        vboxlayout.addWidget(groupbox_central)
+
+    #---------------
+
+    def initialize_inputs(self):
+        '''
+        Load initial data in inputs.
+        '''
+
+        # set initial value in "lineedit_threads"
+        self.lineedit_threads.setText('1')
+
+        # populate data in "combobox_gtdb"
+        self.combobox_gtdb_populate()
+
+        # set initial value in "lineedit_file_format"
+        self.lineedit_file_format.setText('')
+
+        # set initial value in "lineedit_mdc"
+        self.lineedit_mdc.setText('')
+
+        # set initial value in "lineedit_file_path"
+        self.lineedit_file_path.setText('')
+
+        # set initial value in "lineedit_neighbours"
+        self.lineedit_neighbours.setText('5')
+
+        # populate data in "combobox_kw"
+        self.combobox_kw_populate()
+
+        # set initial value in "lineedit_mr2"
+        self.lineedit_mr2.setText('0.1')
+
+        # set initial value in "lineedit_snps"
+        self.lineedit_snps.setText('5')
+
+        # populate data in "combobox_gim_populate"
+        self.combobox_gim_populate()
+
+    #---------------
+
+    def check_inputs(self):
+        '''
+        Check the content of each input and do the actions linked to its value.
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # check "combobox_gtdb" when the index changed
+        self.combobox_gtdb_currentIndexChanged()
+
+        # check "lineedit_threads" when the editing finished
+        if not self.lineedit_threads_editing_finished():
+            OK = False
+
+        # check "lineedit_file_format" when the editing finished
+        if not self.lineedit_file_format_editing_finished():
+            OK = False
+
+        # check "lineedit_mdc_editing" when the editing finished
+        if not self.lineedit_mdc_editing_finished():
+            OK = False
+
+        # check "lineedit_file_path" when the editing finished
+        if not self.lineedit_file_path_editing_finished():
+            OK = False
+
+        # check "lineedit_neighbours" when the editing finished
+        if not self.lineedit_neighbours_editing_finished():
+            OK = False
+
+        # check "lineedit_mr2" when the editing finished
+        if not self.lineedit_mr2_editing_finished():
+            OK = False
+
+        # check "lineedit_snps" when the editing finished
+        if not self.lineedit_snps_editing_finished():
+            OK = False
+
+        # check all inputs are OK
+        if OK:
+            self.parent.statusBar().showMessage('')
+        else:
+            self.parent.statusBar().showMessage('There are one or more inputs without data or with wrong values.')
+
+        # enable "pushbutton_execute"
+        if OK and self.lineedit_threads.text() != '' and self.combobox_gtdb.currentText() != '' and self.lineedit_file_format.text() != '' and self.lineedit_mdc.text() != '' and self.lineedit_file_path.text() != '' and self.lineedit_neighbours.text() != '' and self.combobox_kw.currentText() and self.lineedit_mr2.text() and self.lineedit_snps.text() and self.combobox_gim.currentText():
+            self.pushbutton_execute.setEnabled(True)
+        else:
+            self.pushbutton_execute.setEnabled(False)
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_threads_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_threads"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # chek if "lineedit_threads" is empty
+        if self.lineedit_threads.text() == '':
+            OK = False
+            self.lineedit_threads.setStyleSheet('background-color: white')
+
+        # chek if "lineedit_threads" is an integer number between 1 and the CPUs number in the computer
+        elif self.lineedit_threads.text() != '' and not genlib.check_int(self.lineedit_threads.text(), minimum=1, maximum=os.cpu_count()):
+            OK = False
+            self.lineedit_threads.setStyleSheet('background-color: red')
+            text = f'The value of threads number has to be an integer number between 1 and {os.cpu_count()} (threads available in the computer).'
+            QMessageBox.critical(self, self.title, text, buttons=QMessageBox.Ok)
+
+        else:
+            self.lineedit_threads.setStyleSheet('background-color: white')
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def combobox_gtdb_populate(self):
+        '''
+        Populate data in "combobox_gtdb".
+        '''
+
+        # get the result directory
+        result_dir = self.app_config_dict['Environment parameters']['result_dir']
+
+        # get the imputation result directory
+        imputation_result_subdir = f'{result_dir}/{genlib.get_result_imputation_subdir()}'
+        if sys.platform.startswith('win32'):
+            imputation_result_subdir = genlib.wsl_path_2_windows_path(imputation_result_subdir)
+
+        # initialize the list of genetype database directories
+        gtdb_dir_list = []
+
+        # load the list of genetype database directories
+        try:
+            for entry in os.listdir(imputation_result_subdir):
+                if os.path.isdir(f'{imputation_result_subdir}{os.sep}{entry}') and entry.startswith(genlib.get_gtdb_building_code()):
+                    status_ok = os.path.isfile(genlib.get_status_ok(f'{imputation_result_subdir}{os.sep}{entry}'))
+                    if status_ok:
+                        gtdb_dir_list.append(entry)
+            gtdb_dir_list.sort()
+        except:    # pylint: disable=bare-except
+            pass
+        self.combobox_gtdb.addItems([''] + gtdb_dir_list)
+
+        # simultate "combobox_gtdb" index has changed
+        self.combobox_gtdb_currentIndexChanged()
+
+    #---------------
+
+    def combobox_gtdb_currentIndexChanged(self):
+        '''
+        Process the event when an item of "combobox_gtdb" has been selected.
+        '''
+
+        # get the result directory
+        result_dir = self.app_config_dict['Environment parameters']['result_dir']
+
+        # when there is an item selected in "combobox_gtdb"
+        if self.combobox_gtdb.currentText() != '':
+
+            # set the genotype database directory
+            gtdb_dir = f'{result_dir}/{genlib.get_result_imputation_subdir()}/{self.combobox_gtdb.currentText()}'
+
+            # set the parameter file
+            params_file = f'{gtdb_dir}/params.txt'
+            if sys.platform.startswith('win32'):
+                params_file = genlib.wsl_path_2_windows_path(params_file)
+
+            # set the parameter dictionary
+            params_dict = genlib.get_config_dict(params_file)
+
+            # set "lineedit_file_format" value with its parameter value
+            self.lineedit_file_format.setText(os.path.basename(params_dict['General parameters']['file_format']))
+
+            # set "lineedit_mdc" value with its parameter value
+            self.lineedit_mdc.setText(os.path.basename(params_dict['General parameters']['mdc']))
+
+            # set "lineedit_file_path" value its with parameter value
+            file_path = params_dict['General parameters']['file_path']
+            if sys.platform.startswith('win32'):
+                file_path = genlib.wsl_path_2_windows_path(file_path)
+            self.lineedit_file_path.setText(file_path)
+
+        # when there is not an item selected in "combobox_gtdb"
+        else:
+
+            # set widget values with null values
+            self.lineedit_file_format.setText('')
+            self.lineedit_mdc.setText('')
+            self.lineedit_file_path.setText('')
+
+    #---------------
+
+    def lineedit_file_format_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_file_format"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_mdc_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_mdc"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_file_path_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_file_path"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_neighbours_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_neighbours"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # chek if "lineedit_neighbours" is empty
+        if self.lineedit_neighbours.text() == '':
+            OK = False
+            self.lineedit_neighbours.setStyleSheet('background-color: white')
+
+        # chek if "lineedit_neighbours" is an integer number greater than or equal to 1
+        elif self.lineedit_neighbours.text() != '' and not genlib.check_int(self.lineedit_neighbours.text(), minimum=1):
+            OK = False
+            self.lineedit_neighbours.setStyleSheet('background-color: red')
+            text = 'The value of neighbours # has to be an integer number geater than 1.'
+            QMessageBox.critical(self, self.title, text, buttons=QMessageBox.Ok)
+
+        else:
+            self.lineedit_neighbours.setStyleSheet('background-color: white')
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_mr2_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_mr2"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # chek if "lineedit_mr2" is empty
+        if self.lineedit_mr2.text() == '':
+            OK = False
+            self.lineedit_mr2.setStyleSheet('background-color: white')
+
+        # chek if "lineedit_mr2" is a float number greater than or equal to 0.001
+        elif self.lineedit_mr2.text() != '' and not genlib.check_float(self.lineedit_mr2.text(), minimum=0.001):
+            OK = False
+            self.lineedit_mr2.setStyleSheet('background-color: red')
+            text = 'The value of minimum r^2 has to be a float number geater than 0.001.'
+            QMessageBox.critical(self, self.title, text, buttons=QMessageBox.Ok)
+
+        else:
+            self.lineedit_mr2.setStyleSheet('background-color: white')
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_snps_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_snps"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # chek if "lineedit_snps" is empty
+        if self.lineedit_snps.text() == '':
+            OK = False
+            self.lineedit_snps.setStyleSheet('background-color: white')
+
+        # chek if "lineedit_snps" is an integer number greater than or equal to 2
+        elif self.lineedit_snps.text() != '' and not genlib.check_int(self.lineedit_snps.text(), minimum=2):
+            OK = False
+            self.lineedit_snps.setStyleSheet('background-color: red')
+            text = 'The value of SNPs # has to be an integer number geater than 2.'
+            QMessageBox.critical(self, self.title, text, buttons=QMessageBox.Ok)
+
+        else:
+            self.lineedit_snps.setStyleSheet('background-color: white')
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def combobox_kw_populate(self):
+        '''
+        Populate data in "combobox_kw".
+        '''
+
+        # populate data in "combobox_kw" and select the default kinship weighting
+        self.combobox_kw.addItems(self.kw_text_list)
+        self.combobox_kw.setCurrentText(self.kw_text_list[self.kw_code_list.index(genlib.Const.DEFAULT_KINSHIP_WEIGHTING)])
+
+        # simultate "combobox_kw" index has changed
+        self.combobox_kw_currentIndexChanged()
+
+    #---------------
+
+    def combobox_kw_currentIndexChanged(self):
+        '''
+        Process the event when an item of "combobox_kw" has been selected.
+        '''
+
+        # check the content of inputs
+        self.check_inputs()
+
+    #---------------
+
+    def combobox_gim_populate(self):
+        '''
+        Populate data in "combobox_gim".
+        '''
+
+
+        # populate data in "combobox_gim"
+        self.combobox_gim.addItems(self.gim_text_list)
+
+        # simultate "combobox_gim" index has changed
+        self.combobox_gim_currentIndexChanged()
+
+    #---------------
+
+    def combobox_gim_currentIndexChanged(self):
+        '''
+        Process the event when an item of "combobox_gim" has been selected.
+        '''
+
+        # check the content of inputs
+        self.check_inputs()
+
+    #---------------
+
+    def pushbutton_search_clicked(self):
+        '''
+        Search and select a VCF file.
+        '''
+
+        # get the VCF file
+        (file, _) = QFileDialog.getOpenFileName(self, f'{self.head} - Selection of the VCF file', os.path.expanduser('~'), 'VCF files (*.vcf);;All files (*)')
+        self.lineedit_file_path.setText(file)
+
+        # check the content of inputs
+        self.check_inputs()
+
+    #---------------
+
+    def pushbutton_execute_clicked(self):
+        '''
+        Execute the process.
+        '''
+
+        # get the result directory
+        result_dir = self.app_config_dict['Environment parameters']['result_dir']
+
+        # check the content of inputs
+        OK = self.check_inputs()
+        if not OK:
+            text = 'Some input values are not OK.'
+            QMessageBox.critical(self, self.title, text, buttons=QMessageBox.Ok)
+
+        # confirm the process is executed
+        if OK:
+            text = 'The kNN imputation process is going to be run.\n\nAre you sure to continue?'
+            botton = QMessageBox.question(self, self.title, text, buttons=QMessageBox.Yes|QMessageBox.No, defaultButton=QMessageBox.No)
+            if botton == QMessageBox.No:
+                OK = False
+
+        # execute the process
+        if OK:
+            threads = self.lineedit_threads.text()
+            gtdb_dir = f'{result_dir}/{genlib.get_result_imputation_subdir()}/{self.combobox_gtdb.currentText()}'
+            file_format = self.lineedit_file_format.text()
+            mdc = self.lineedit_mdc.text()
+            file_path = self.lineedit_file_path.text()
+            neighbours = self.lineedit_neighbours.text()
+            kw = self.kw_code_list[self.kw_text_list.index(self.combobox_kw.currentText())]
+            mr2 = self.lineedit_mr2.text()
+            snps = self.lineedit_snps.text()
+            gim = self.gim_code_list[self.gim_text_list.index(self.combobox_gim.currentText())]
+            process = dialogs.DialogProcess(self, self.head, self.run_knn_imputation, threads, gtdb_dir, file_format, mdc, file_path, neighbours, kw, mr2, snps, gim)
+            process.exec()
+
+        # close the windows
+        if OK:
+            self.pushbutton_close_clicked()
+
+    #---------------
+
+    def pushbutton_close_clicked(self):
+        '''
+        Close the window.
+        '''
+
+        self.parent.current_subwindow = None
+        self.close()
+        self.parent.set_background_image()
+
+   #---------------
+
+    def run_knn_imputation(self, process, threads, gtdb_dir, file_format, mdc, file_path, neighbours, kw, mr2, snps, gim):
+        '''
+        Run a kNN imputation process.
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # warn that the log window does not have to be closed
+        process.write('This process might take several minutes. Do not close this window, please wait!\n')
+
+        # get the result directory
+        result_dir = self.app_config_dict['Environment parameters']['result_dir']
+
+        # determine the temporal directory
+        if OK:
+            process.write(f'{genlib.get_separator()}\n')
+            process.write('Determining the temporal directory ...\n')
+            temp_dir = genlib.get_temp_dir()
+            command = f'mkdir -p {temp_dir}'
+            rc = genlib.run_command(command, process, is_script=False)
+            if rc == 0:
+                process.write(f'The directory path is {temp_dir}.\n')
+            else:
+                process.write(f'*** ERROR: RC {rc} in command -> {command}\n')
+                OK = False
+
+        # determine the run directory
+        if OK:
+            process.write(f'{genlib.get_separator()}\n'); process.show()
+            process.write('Determining the run directory ...\n'); process.show()
+            current_run_dir = genlib.get_current_run_dir(result_dir, genlib.get_result_imputation_subdir(), genlib.get_knn_imputation_code())
+            command = f'mkdir -p {current_run_dir}'
+            rc = genlib.run_command(command, process, is_script=False)
+            if rc == 0:
+                process.write(f'The directory path is {current_run_dir}.\n')
+            else:
+                process.write(f'*** ERROR: RC {rc} in command -> {command}\n')
+                OK = False
+
+        # build the kNN imputation script in the temporal directory
+        if OK:
+            process.write(f'{genlib.get_separator()}\n')
+            script_name = f'{genlib.get_knn_imputation_code()}-process.sh'
+            process.write(f'Building the script {script_name} ...\n')
+            (OK, _) = self.build_knn_imputation_script(temp_dir, script_name, current_run_dir, threads, gtdb_dir, file_format, mdc, file_path, neighbours, kw, mr2, snps, gim)
+            if OK:
+                process.write('The file is built.\n')
+            else:
+                process.write('*** ERROR: The file could not be built.\n')
+
+        # copy the kNN imputation script to the current run directory
+        if OK:
+            process.write(f'{genlib.get_separator()}\n')
+            process.write(f'Copying the script {script_name} to the directory {current_run_dir} ...\n')
+            command = f'cp {temp_dir}/{script_name} {current_run_dir}; [ $? -eq 0 ] &&  exit 0 || exit 1'
+            rc = genlib.run_command(command, process, is_script=False)
+            if rc == 0:
+                process.write('The file is copied.\n')
+            else:
+                process.write(f'*** ERROR: RC {rc} in command -> {command}\n')
+
+        # set run permision to the imputation script
+        if OK and not sys.platform.startswith('win32'):
+            process.write(f'{genlib.get_separator()}\n')
+            process.write(f'Setting on the run permision of {script_name} ...\n')
+            command = f'chmod u+x {current_run_dir}/{script_name}'
+            rc = genlib.run_command(command, process, is_script=False)
+            if rc == 0:
+                process.write('The run permision is set.\n')
+            else:
+                process.write(f'*** ERROR: RC {rc} in command -> {command}\n')
+                OK = False
+
+        # build the starter script in the temporal directory
+        if OK:
+            process.write(f'{genlib.get_separator()}\n')
+            starter_name = f'{genlib.get_knn_imputation_code()}-process-starter.sh'
+            process.write(f'Building the starter script {starter_name} ...\n')
+            (OK, _) = genlib.build_starter(temp_dir, starter_name, script_name, current_run_dir)
+            if OK:
+                process.write('The file is built.\n')
+            if not OK:
+                process.write('***ERROR: The file could not be built.\n')
+
+        # copy the starter script to the current run directory
+        if OK:
+            process.write(f'{genlib.get_separator()}\n')
+            process.write(f'Copying the starter {starter_name} to the directory {current_run_dir} ...\n')
+            command = f'cp {temp_dir}/{starter_name} {current_run_dir}; [ $? -eq 0 ] &&  exit 0 || exit 1'
+            rc = genlib.run_command(command, process, is_script=False)
+            if rc == 0:
+                process.write('The file is copied.\n')
+            else:
+                process.write(f'*** ERROR: RC {rc} in command -> {command}\n')
+
+        # set run permision to the starter script
+        if OK and not sys.platform.startswith('win32'):
+            process.write(f'{genlib.get_separator()}\n')
+            process.write(f'Setting on the run permision of {starter_name} ...\n')
+            command = f'chmod u+x {current_run_dir}/{starter_name}'
+            rc = genlib.run_command(command, process, is_script=False)
+            if rc == 0:
+                process.write('The run permision is set.\n')
+            else:
+                process.write(f'*** ERROR: RC {rc} in command -> {command}\n')
+                OK = False
+
+        # submit the starter
+        if OK:
+            process.write(f'{genlib.get_separator()}\n')
+            process.write(f'Submitting the starter {starter_name} ...\n')
+            command = f'{current_run_dir}/{starter_name} &'
+            rc = genlib.run_command(command, process, is_script=True)
+            if rc == 0:
+                process.write('The script is submitted.\n')
+            else:
+                process.write(f'*** ERROR: RC {rc} in command -> {command}\n')
+                OK = False
+
+        process.write(f'{genlib.get_separator()}\n')
+        process.write('You can close this window now.\n')
+
+        # return the control variable
+        return OK
+
+   #---------------
+
+    def build_knn_imputation_script(self, directory, script_name, current_run_dir, threads, gtdb_dir, file_format, mdc, file_path, neighbours, kw, mr2, snps, gim):
+        '''
+        Build the script to run the kNN imputation process.
+        '''
+
+        # initialize the control variable and error list
+        OK = True
+        error_list = []
+
+        # get the Miniforge3 directory and its bin subdirectory
+        miniforge3_dir = ''
+        if sys.platform.startswith('win32'):
+            miniforge3_dir = genlib.get_miniforge3_dir_in_wsl()
+        elif sys.platform.startswith('linux') or sys.platform.startswith('darwin'):
+            miniforge3_dir = genlib.get_miniforge3_current_dir()
+        miniforge3_bin_dir = f'{miniforge3_dir}/bin'
+
+        # get items from dictionary of application configuration
+        app_dir = self.app_config_dict['Environment parameters']['app_dir']
+
+        # set the parameters file
+        params_file = f'{current_run_dir}/params.txt'
+
+        # set the genotype database file
+        genotype_db = f'{gtdb_dir}/genotype.db'
+
+        # set the VCF with missing data
+        vcf_wmd_file = f'{gtdb_dir}/wmd.vcf'
+
+        # set the imputed files
+        vcf_imputed_file = f'{current_run_dir}/imputed.vcf'
+        tab_imputed_file = f'{current_run_dir}/imputed.tsv'
+
+        # set the file with imputation data
+        imputation_data_file = f'{current_run_dir}/imputation_data.csv'
+
+        # set the script path
+        script_path = f'{directory}/{script_name}'
+
+        # write the script
+        try:
+            with open(script_path, mode='w', encoding='iso-8859-1', newline='\n') as file_id:
+                file_id.write( '#!/bin/bash\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write(f'GTDB_DIR={gtdb_dir}\n')
+                file_id.write(f'FILE_FORMAT={file_format}\n')
+                file_id.write(f'MDC={mdc}\n')
+                file_id.write(f'FILE_PATH="{file_path}"\n')
+                file_id.write(f'VCF_WMD_FILE="{vcf_wmd_file}"\n')
+                file_id.write(f'THREADS={threads}\n')
+                file_id.write(f'NEIGHBOURS={neighbours}\n')
+                file_id.write(f'KW={kw}\n')
+                file_id.write(f'MR2={mr2}\n')
+                file_id.write( 'ESTIMATOR=ru\n')
+                file_id.write(f'SNPS={snps}\n')
+                file_id.write(f'GIM={gim}\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write(f'export PATH={miniforge3_bin_dir}:/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin:/snap/bin\n')
+                file_id.write( 'SEP="#########################################"\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write(f'STATUS_DIR={genlib.get_status_dir(current_run_dir)}\n')
+                file_id.write(f'SCRIPT_STATUS_OK={genlib.get_status_ok(current_run_dir)}\n')
+                file_id.write(f'SCRIPT_STATUS_WRONG={genlib.get_status_wrong(current_run_dir)}\n')
+                file_id.write( 'mkdir -p $STATUS_DIR\n')
+                file_id.write( 'if [ -f $SCRIPT_STATUS_OK ]; then rm $SCRIPT_STATUS_OK; fi\n')
+                file_id.write( 'if [ -f $SCRIPT_STATUS_WRONG ]; then rm $SCRIPT_STATUS_WRONG; fi\n')
+                file_id.write(f'PARAMS_FILE={params_file}\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write( 'function init\n')
+                file_id.write( '{\n')
+                file_id.write( '    INIT_DATETIME=`date +%s`\n')
+                file_id.write( '    FORMATTED_INIT_DATETIME=`date "+%Y-%m-%d %H:%M:%S"`\n')
+                file_id.write( '    echo "$SEP"\n')
+                file_id.write( '    echo "Script started at $FORMATTED_INIT_DATETIME."\n')
+                file_id.write( '    echo "$SEP"\n')
+                file_id.write( '    echo "Parameters:"\n')
+                file_id.write( '    echo "   gtdb_dir: $GTDB_DIR"\n')
+                file_id.write( '    echo "   threads: $THREADS"\n')
+                file_id.write( '    echo "   neighbours: $NEIGHBOURS - kw: $KW"\n')
+                file_id.write( '    echo "   mr2: $MR2 - snps: $SNPS - gim: $GIM"\n')
+                file_id.write( '}\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write( 'function save_params\n')
+                file_id.write( '{\n')
+                file_id.write( '    echo "$SEP"\n')
+                file_id.write( '    echo "Saving parameters ..."\n')
+                file_id.write( '    echo "[General parameters]" > $PARAMS_FILE\n')
+                file_id.write( '    echo "threads = $THREADS" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "gtdb_dir = $GTDB_DIR" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "file_format = $FILE_FORMAT" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "mdc = $MDC" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "file_path = $FILE_PATH" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "vcf_wmd_file = $VCF_WMD_FILE" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "[kNN parameters]" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "neighbours = $NEIGHBOURS" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "kw = $KW" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "[SNPs selection parameters]" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "mr2 = $MR2" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "snps = $SNPS" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "gim = $GIM" >> $PARAMS_FILE\n')
+                file_id.write( '    echo "Parameters are saved."\n')
+                file_id.write( '}\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write( 'function run_knn_imputation_process\n')
+                file_id.write( '{\n')
+                file_id.write( '    echo "$SEP"\n')
+                file_id.write(f'    echo "Processing the kNN imputation of {os.path.basename(vcf_wmd_file)} ..."\n')
+                file_id.write(f'    source {miniforge3_bin_dir}/activate {genlib.get_gtimputation_env_code()}\n')
+                file_id.write( '    /usr/bin/time \\\n')
+                file_id.write(f'        {app_dir}/impute-md-knn.py \\\n')
+                file_id.write( '            --threads=$THREADS \\\n')
+                file_id.write(f'            --gtdb={genotype_db} \\\n')
+                file_id.write(f'            --input_vcf={vcf_wmd_file} \\\n')
+                file_id.write(f'            --output_vcf={vcf_imputed_file} \\\n')
+                file_id.write(f'            --impdata={imputation_data_file} \\\n')
+                file_id.write( '            --neighbours=$NEIGHBOURS \\\n')
+                file_id.write( '            --kinship_weighting=$KW \\\n')
+                file_id.write( '            --mr2=$MR2 \\\n')
+                file_id.write( '            --estimator=$ESTIMATOR \\\n')
+                file_id.write( '            --snps=$SNPS \\\n')
+                file_id.write( '            --gim=$GIM \\\n')
+                file_id.write( '            --verbose=N \\\n')
+                file_id.write( '            --trace=N \\\n')
+                file_id.write( '            --tvi=NONE\n')
+                file_id.write( '    RC=$?\n')
+                file_id.write( '    if [ $RC -ne 0 ]; then manage_error impute-md-knn.py $RC; fi\n')
+                file_id.write( '    conda deactivate\n')
+                file_id.write( '    echo "kNN imputation is ended."\n')
+                file_id.write( '}\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write( 'function convert_vcf_to_tab\n')
+                file_id.write( '{\n')
+                file_id.write( '    echo "$SEP"\n')
+                file_id.write(f'    echo "Converting VCF file {os.path.basename(vcf_imputed_file)} to a file in tabular format ..."\n')
+                file_id.write(f'    source {miniforge3_bin_dir}/activate {genlib.get_gtimputation_env_code()}\n')
+                file_id.write( '    /usr/bin/time \\\n')
+                file_id.write(f'        {app_dir}/vcf2tab.py \\\n')
+                file_id.write(f'            --vcf={vcf_imputed_file} \\\n')
+                file_id.write(f'            --tab={tab_imputed_file} \\\n')
+                file_id.write( '            --mdc=$MDC \\\n')
+                file_id.write( '            --verbose=N \\\n')
+                file_id.write( '            --trace=N \\\n')
+                file_id.write( '            --tvi=NONE\n')
+                file_id.write( '    RC=$?\n')
+                file_id.write( '    if [ $RC -ne 0 ]; then manage_error vcf2tab.py $RC; fi\n')
+                file_id.write( '    conda deactivate\n')
+                file_id.write( '    echo "File is converted."\n')
+                file_id.write( '}\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write( 'function end\n')
+                file_id.write( '{\n')
+                file_id.write( '    END_DATETIME=`date +%s`\n')
+                file_id.write( '    FORMATTED_END_DATETIME=`date "+%Y-%m-%d %H:%M:%S"`\n')
+                file_id.write( '    calculate_duration\n')
+                file_id.write( '    echo "$SEP"\n')
+                file_id.write( '    echo "Script ended OK at $FORMATTED_END_DATETIME with a run duration of $DURATION s ($FORMATTED_DURATION)."\n')
+                file_id.write( '    echo "$SEP"\n')
+                file_id.write( '    touch $SCRIPT_STATUS_OK\n')
+                file_id.write( '    exit 0\n')
+                file_id.write( '}\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write( 'function manage_error\n')
+                file_id.write( '{\n')
+                file_id.write( '    END_DATETIME=`date +%s`\n')
+                file_id.write( '    FORMATTED_END_DATETIME=`date "+%Y-%m-%d %H:%M:%S"`\n')
+                file_id.write( '    calculate_duration\n')
+                file_id.write( '    echo "$SEP"\n')
+                file_id.write( '    echo "ERROR: $1 returned error $2"\n')
+                file_id.write( '    echo "Script ended WRONG at $FORMATTED_END_DATETIME with a run duration of $DURATION s ($FORMATTED_DURATION)."\n')
+                file_id.write( '    echo "$SEP"\n')
+                file_id.write( '    touch $SCRIPT_STATUS_WRONG\n')
+                file_id.write( '    exit 3\n')
+                file_id.write( '}\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write( 'function calculate_duration\n')
+                file_id.write( '{\n')
+                file_id.write( '    DURATION=`expr $END_DATETIME - $INIT_DATETIME`\n')
+                file_id.write( '    HH=`expr $DURATION / 3600`\n')
+                file_id.write( '    MM=`expr $DURATION % 3600 / 60`\n')
+                file_id.write( '    SS=`expr $DURATION % 60`\n')
+                file_id.write( '    FORMATTED_DURATION=`printf "%03d:%02d:%02d\\n" $HH $MM $SS`\n')
+                file_id.write( '}\n')
+                file_id.write( '#-------------------------------------------------------------------------------\n')
+                file_id.write( 'init\n')
+                file_id.write( 'save_params\n')
+                file_id.write( 'run_knn_imputation_process\n')
+                file_id.write( 'convert_vcf_to_tab\n')
+                file_id.write( 'end\n')
+        except Exception as e:
+            error_list.append(f'*** EXCEPTION: "{e}".')
+            error_list.append(f'*** ERROR: The file {script_path} is not created.')
+            OK = False
+
+        # return the control variable and error list
+        return (OK, error_list)
+
+#-------------------------------------------------------------------------------
+
+class FormKNNImputationReview(QWidget):
+    '''
+    Class used to review a kNN imputation.
+    '''
+
+    #---------------
+
+    def __init__(self, parent):
+        '''
+        Create a class instance.
+        '''
+
+        # save parameters in instance variables
+        self.parent = parent
+
+        # call the init method of the parent class
+        super().__init__()
+
+        # set the dimensions window
+        self.window_height = self.parent.WINDOW_HEIGHT - 100
+        self.window_width = self.parent.WINDOW_WIDTH - 50
+
+        # set the head and title
+        self.head = 'kNN imputation review'
+        self.title = f'{genlib.get_app_short_name()} - {self.head}'
+
+        # get the dictionary of application configuration
+        self.app_config_dict = genlib.get_config_dict(genlib.get_app_config_file())
+
+        # get the the code list and text list of genotype imputation method
+        self.gim_code_list = genlib.get_genotype_imputation_method_code_list()
+        self.gim_text_list = genlib.get_genotype_imputation_method_text_list()
+
+        # get the the code list and text list of kinship weighting
+        self.kw_code_list = genlib.get_kinship_weighting_code_list()
+        self.kw_text_list = genlib.get_kinship_weighting_text_list()
+
+        # build the graphic user interface of the window
+        self.build_gui()
+
+        # load initial data in inputs
+        self.initialize_inputs()
+
+        # check the content of inputs
+        self.check_inputs()
+
+        # show the window
+        self.show()
+
+    #---------------
+
+    def build_gui(self):
+        '''
+        Build the graphic user interface of the window.
+        '''
+
+        # set the width and height of the window
+        self.setFixedSize(self.window_width, self.window_height)
+
+        # move the window at center
+        rectangle = self.frameGeometry()
+        central_point = QGuiApplication.primaryScreen().availableGeometry().center()
+        rectangle.moveCenter(central_point)
+        self.move(rectangle.topLeft())
+
+        # get font metrics information
+        fontmetrics = QFontMetrics(QApplication.font())
+
+        # create and configure "label_head"
+        label_head = QLabel(self.head, alignment=Qt.AlignCenter)
+        label_head.setStyleSheet('font: bold 14px; color: black; background-color: lightGray; max-height: 30px')
+
+        # create and configure "label_knn_process"
+        label_knn_process = QLabel()
+        label_knn_process.setText('kNN process')
+        label_knn_process.setFixedWidth(fontmetrics.width('9'*10))
+
+        # create and configure "combobox_knn_process"
+        self.combobox_knn_process = QComboBox()
+        self.combobox_knn_process.setFixedWidth(fontmetrics.width('9'*20))
+        self.combobox_knn_process.setCursor(QCursor(Qt.PointingHandCursor))
+        self.combobox_knn_process.currentIndexChanged.connect(self.check_inputs)
+
+        # create and configure "label_gtdb"
+        label_gtdb = QLabel()
+        label_gtdb.setText('Genotype database')
+        label_gtdb.setFixedWidth(fontmetrics.width('9'*16))
+
+        # create and configure "lineedit_gtdb"
+        self.lineedit_gtdb  = QLineEdit()
+        self.lineedit_gtdb.setFixedWidth(fontmetrics.width('9'*20))
+        self.lineedit_gtdb.editingFinished.connect(self.check_inputs)
+        self.lineedit_gtdb.setDisabled(True)
+
+        # create and configure "label_file_format"
+        label_file_format = QLabel()
+        label_file_format.setText('File format')
+        label_file_format.setFixedWidth(fontmetrics.width('9'*10))
+
+        # create and configure "lineedit_file_format"
+        self.lineedit_file_format  = QLineEdit()
+        self.lineedit_file_format.setFixedWidth(fontmetrics.width('9'*10))
+        self.lineedit_file_format.editingFinished.connect(self.check_inputs)
+        self.lineedit_file_format.setDisabled(True)
+
+        # create and configure "label_mdc"
+        label_mdc = QLabel()
+        label_mdc.setText('MD char in tabular format')
+        label_mdc.setFixedWidth(fontmetrics.width('9'*20))
+
+        # create and configure "lineedit_mdc"
+        self.lineedit_mdc  = QLineEdit()
+        self.lineedit_mdc.setFixedWidth(fontmetrics.width('9'*10))
+        self.lineedit_mdc.editingFinished.connect(self.check_inputs)
+        self.lineedit_mdc.setDisabled(True)
+
+        # create and configure "label_file_path"
+        label_file_path = QLabel()
+        label_file_path.setText('File path')
+        label_file_path.setFixedWidth(fontmetrics.width('9'*10))
+
+        # create and configure "lineedit_file_path"
+        self.lineedit_file_path  = QLineEdit()
+        self.lineedit_file_path.editingFinished.connect(self.check_inputs)
+        self.lineedit_file_path.setDisabled(True)
+
+        # create and configure "label_neighbours"
+        label_neighbours = QLabel()
+        label_neighbours.setText('Neighbours #')
+        label_neighbours.setFixedWidth(fontmetrics.width('9'*12))
+
+        # create and configure "lineedit_neighbours"
+        self.lineedit_neighbours  = QLineEdit()
+        self.lineedit_neighbours.setFixedWidth(fontmetrics.width('9'*6))
+        self.lineedit_neighbours.editingFinished.connect(self.check_inputs)
+        self.lineedit_neighbours.setDisabled(True)
+
+        # create and configure "label_kw"
+        label_kw = QLabel()
+        label_kw.setText('Kinship weighting')
+        label_kw.setFixedWidth(fontmetrics.width('9'*18))
+
+        # create and configure "lineedit_kw"
+        self.lineedit_kw = QLineEdit()
+        self.lineedit_kw.setFixedWidth(fontmetrics.width('9'*22))
+        self.lineedit_kw.editingFinished.connect(self.check_inputs)
+        self.lineedit_kw.setDisabled(True)
+
+        # create and configure "label_empty"
+        label_empty = QLabel()
+        label_empty.setFixedWidth(fontmetrics.width('9'*3))
+
+        # create and configure "gridlayout_knnparam"
+        gridlayout_knnparam = QGridLayout()
+        gridlayout_knnparam.setColumnStretch(0, 1)
+        gridlayout_knnparam.setColumnStretch(1, 1)
+        gridlayout_knnparam.setColumnStretch(2, 1)
+        gridlayout_knnparam.setColumnStretch(3, 1)
+        gridlayout_knnparam.setColumnStretch(4, 1)
+        gridlayout_knnparam.setColumnStretch(5, 1)
+        gridlayout_knnparam.setColumnStretch(6, 2)
+        gridlayout_knnparam.setColumnStretch(7, 2)
+        gridlayout_knnparam.addWidget(label_neighbours, 0, 0)
+        gridlayout_knnparam.addWidget(self.lineedit_neighbours, 0, 1, alignment=Qt.AlignLeft)
+        gridlayout_knnparam.addWidget(label_empty, 0, 2)
+        gridlayout_knnparam.addWidget(label_empty, 0, 5)
+        gridlayout_knnparam.addWidget(label_kw, 0, 6)
+        gridlayout_knnparam.addWidget(self.lineedit_kw, 0, 7, alignment=Qt.AlignLeft)
+
+        # create and configure "groupbox_knnparam"
+        groupbox_knnparam = QGroupBox('kNN parameters')
+        groupbox_knnparam.setLayout(gridlayout_knnparam)
+
+        # create and configure "label_mr2"
+        label_mr2 = QLabel()
+        label_mr2.setText('Minimum r^2')
+        label_mr2.setFixedWidth(fontmetrics.width('9'*12))
+
+        # create and configure "lineedit_mr2"
+        self.lineedit_mr2  = QLineEdit()
+        self.lineedit_mr2.setFixedWidth(fontmetrics.width('9'*6))
+        self.lineedit_mr2.editingFinished.connect(self.check_inputs)
+        self.lineedit_mr2.setDisabled(True)
+
+        # create and configure "label_snps"
+        label_snps = QLabel()
+        label_snps.setText('SNPs #')
+        label_snps.setFixedWidth(fontmetrics.width('9'*12))
+
+        # create and configure "lineedit_snps"
+        self.lineedit_snps  = QLineEdit()
+        self.lineedit_snps.setFixedWidth(fontmetrics.width('9'*6))
+        self.lineedit_snps.editingFinished.connect(self.check_inputs)
+        self.lineedit_snps.setDisabled(True)
+
+        # create and configure "label_gim"
+        label_gim = QLabel()
+        label_gim.setText('Imputation method')
+        label_gim.setFixedWidth(fontmetrics.width('9'*18))
+
+        # create and configure "lineedit_gim"
+        self.lineedit_gim = QLineEdit()
+        self.lineedit_gim.setFixedWidth(fontmetrics.width('9'*22))
+        self.lineedit_gim.editingFinished.connect(self.check_inputs)
+        self.lineedit_gim.setDisabled(True)
+
+        # create and configure "gridlayout_snpsparam"
+        gridlayout_snpsparam = QGridLayout()
+        gridlayout_snpsparam.setColumnStretch(0, 1)
+        gridlayout_snpsparam.setColumnStretch(1, 1)
+        gridlayout_snpsparam.setColumnStretch(2, 1)
+        gridlayout_snpsparam.setColumnStretch(3, 1)
+        gridlayout_snpsparam.setColumnStretch(4, 1)
+        gridlayout_snpsparam.setColumnStretch(5, 1)
+        gridlayout_snpsparam.setColumnStretch(6, 2)
+        gridlayout_snpsparam.setColumnStretch(7, 2)
+        gridlayout_snpsparam.addWidget(label_mr2, 0, 0)
+        gridlayout_snpsparam.addWidget(self.lineedit_mr2, 0, 1, alignment=Qt.AlignLeft)
+        gridlayout_snpsparam.addWidget(label_empty, 0, 2)
+        gridlayout_snpsparam.addWidget(label_snps, 0, 3)
+        gridlayout_snpsparam.addWidget(self.lineedit_snps, 0, 4, alignment=Qt.AlignLeft)
+        gridlayout_snpsparam.addWidget(label_empty, 0, 5)
+        gridlayout_snpsparam.addWidget(label_gim, 0, 6)
+        gridlayout_snpsparam.addWidget(self.lineedit_gim, 0, 7, alignment=Qt.AlignLeft)
+
+        # create and configure "groupbox_snpsparam"
+        groupbox_snpsparam = QGroupBox('SNPs selection parameters')
+        groupbox_snpsparam.setLayout(gridlayout_snpsparam)
+
+        # create and configure "gridlayout_data"
+        gridlayout_data = QGridLayout()
+        gridlayout_data.setRowMinimumHeight(0, 30)
+        gridlayout_data.setRowMinimumHeight(1, 30)
+        gridlayout_data.setRowMinimumHeight(2, 30)
+        gridlayout_data.setRowMinimumHeight(3, 60)
+        gridlayout_data.setRowMinimumHeight(4, 60)
+        gridlayout_data.setColumnStretch(0,1)
+        gridlayout_data.setColumnStretch(1,1)
+        gridlayout_data.setColumnStretch(2,1)
+        gridlayout_data.setColumnStretch(3,1)
+        gridlayout_data.setColumnStretch(4,1)
+        gridlayout_data.setColumnStretch(5,15)
+        gridlayout_data.addWidget(label_knn_process, 0, 0)
+        gridlayout_data.addWidget(self.combobox_knn_process, 0, 1, alignment=Qt.AlignLeft)
+        gridlayout_data.addWidget(label_empty, 0, 2)
+        gridlayout_data.addWidget(label_gtdb, 0, 3)
+        gridlayout_data.addWidget(self.lineedit_gtdb, 0, 4, alignment=Qt.AlignLeft)
+        gridlayout_data.addWidget(label_file_format, 1, 0)
+        gridlayout_data.addWidget(self.lineedit_file_format, 1, 1)
+        gridlayout_data.addWidget(label_empty, 1, 2)
+        gridlayout_data.addWidget(label_mdc, 1, 3)
+        gridlayout_data.addWidget(self.lineedit_mdc, 1, 4)
+        gridlayout_data.addWidget(label_file_path, 2, 0)
+        gridlayout_data.addWidget(self.lineedit_file_path, 2, 1, 1, 5)
+        gridlayout_data.addWidget(groupbox_knnparam, 3, 0, 1, 6)
+        gridlayout_data.addWidget(groupbox_snpsparam, 4, 0, 1, 6)
+
+        # create and configure "groupbox_data"
+        groupbox_data = QGroupBox()
+        groupbox_data.setObjectName('groupbox_data')
+        groupbox_data.setStyleSheet('QGroupBox#groupbox_data {border: 0px;}')
+        groupbox_data.setLayout(gridlayout_data)
+
+        # create and configure "pushbutton_execute"
+        self.pushbutton_execute = QPushButton('Execute')
+        self.pushbutton_execute.setToolTip('Review the process of the kNN imputation.')
+        self.pushbutton_execute.setCursor(QCursor(Qt.PointingHandCursor))
+        self.pushbutton_execute.clicked.connect(self.pushbutton_execute_clicked)
+
+        # create and configure "pushbutton_close"
+        pushbutton_close = QPushButton('Close')
+        pushbutton_close.setToolTip('Close the window.')
+        pushbutton_close.setCursor(QCursor(Qt.PointingHandCursor))
+        pushbutton_close.clicked.connect(self.pushbutton_close_clicked)
+
+        # create and configure "gridlayout_buttons"
+        gridlayout_buttons = QGridLayout()
+        gridlayout_buttons.setColumnStretch(0, 15)
+        gridlayout_buttons.setColumnStretch(1, 1)
+        gridlayout_buttons.setColumnStretch(2, 1)
+        gridlayout_buttons.setColumnStretch(3, 0)
+        gridlayout_buttons.addWidget(self.pushbutton_execute, 0, 1, alignment=Qt.AlignCenter)
+        gridlayout_buttons.addWidget(pushbutton_close, 0, 2, alignment=Qt.AlignCenter)
+
+        # create and configure "groupbox_buttons"
+        groupbox_buttons = QGroupBox()
+        groupbox_buttons.setObjectName('groupbox_buttons')
+        groupbox_buttons.setStyleSheet('QGroupBox#groupbox_buttons {border: 0px;}')
+        groupbox_buttons.setLayout(gridlayout_buttons)
+
+        # create and configure "gridlayout_central"
+        gridlayout_central = QGridLayout()
+        gridlayout_central.setRowStretch(0, 1)
+        gridlayout_central.setRowStretch(1, 1)
+        gridlayout_central.setRowStretch(2, 1)
+        gridlayout_central.setRowStretch(3, 1)
+        gridlayout_central.setRowStretch(4, 1)
+        gridlayout_central.setColumnStretch(0, 0)
+        gridlayout_central.setColumnStretch(1, 1)
+        gridlayout_central.setColumnStretch(2, 0)
+        gridlayout_central.addWidget(label_head, 0, 1)
+        gridlayout_central.addWidget(QLabel(), 1, 1)
+        gridlayout_central.addWidget(groupbox_data, 2, 1)
+        gridlayout_central.addWidget(QLabel(), 3, 1)
+        gridlayout_central.addWidget(groupbox_buttons, 4, 1)
+
+        # create and configure "groupbox_central"
+        groupbox_central = QGroupBox()
+        groupbox_central.setLayout(gridlayout_central)
+
+        # create and configure "vboxlayout"
+        vboxlayout = QVBoxLayout(self)
+        vboxlayout.addWidget(groupbox_central)
+
+    #---------------
+
+    def initialize_inputs(self):
+        '''
+        Load initial data in inputs.
+        '''
+
+        # populate data in "combobox_knn_process"
+        self.combobox_knn_process_populate()
+
+        # set initial value in "lineedit_gtdb"
+        self.lineedit_gtdb.setText('')
+
+        # set initial value in "lineedit_file_format"
+        self.lineedit_file_format.setText('')
+
+        # set initial value in "lineedit_mdc"
+        self.lineedit_mdc.setText('')
+
+        # set initial value in "lineedit_file_path"
+        self.lineedit_file_path.setText('')
+
+        # set initial value in "lineedit_neighbours"
+        self.lineedit_neighbours.setText('')
+
+        # set initial value in "lineedit_kw"
+        self.lineedit_kw.setText('')
+
+        # set initial value in "lineedit_mr2"
+        self.lineedit_mr2.setText('')
+
+        # set initial value in "lineedit_snps"
+        self.lineedit_snps.setText('')
+
+        # set initial value in "lineedit_gim"
+        self.lineedit_gim.setText('')
+
+    #---------------
+
+    def check_inputs(self):
+        '''
+        Check the content of each input and do the actions linked to its value.
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # check "combobox_knn_process" when the index changed
+        self.combobox_knn_process_currentIndexChanged()
+
+        # check "lineedit_gtdb" when the editing finished
+        if not self.lineedit_gtdb_editing_finished():
+            OK = False
+
+        # check "lineedit_file_format" when the editing finished
+        if not self.lineedit_file_format_editing_finished():
+            OK = False
+
+        # check "lineedit_mdc" when the editing finished
+        if not self.lineedit_mdc_editing_finished():
+            OK = False
+
+        # check "lineedit_file_path" when the editing finished
+        if not self.lineedit_file_path_editing_finished():
+            OK = False
+
+        # check "lineedit_neighbours" when the editing finished
+        if not self.lineedit_neighbours_editing_finished():
+            OK = False
+
+        # check "lineedit_kw" when the editing finished
+        if not self.lineedit_kw_editing_finished():
+            OK = False
+
+        # check "lineedit_mr2" when the editing finished
+        if not self.lineedit_mr2_editing_finished():
+            OK = False
+
+        # check "lineedit_snps" when the editing finished
+        if not self.lineedit_snps_editing_finished():
+            OK = False
+
+        # check "lineedit_gim" when the editing finished
+        if not self.lineedit_gim_editing_finished():
+            OK = False
+
+        # check all inputs are OK
+        if OK:
+            self.parent.statusBar().showMessage('')
+        else:
+            self.parent.statusBar().showMessage('There are one or more inputs without data or with wrong values.')
+
+        # enable "pushbutton_execute"
+        if self.combobox_knn_process.currentText() != '':
+            self.pushbutton_execute.setEnabled(True)
+        else:
+            self.pushbutton_execute.setEnabled(False)
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def combobox_knn_process_populate(self):
+        '''
+        Populate data in "combobox_knn_process".
+        '''
+
+        # get the result directory
+        result_dir = self.app_config_dict['Environment parameters']['result_dir']
+
+        # get the imputation result directory
+        imputation_result_subdir = f'{result_dir}/{genlib.get_result_imputation_subdir()}'
+        if sys.platform.startswith('win32'):
+            imputation_result_subdir = genlib.wsl_path_2_windows_path(imputation_result_subdir)
+
+        # initialize the list of kNN process directories
+        knn_process_dir_list = []
+        try:
+            for entry in os.listdir(imputation_result_subdir):
+                if os.path.isdir(f'{imputation_result_subdir}{os.sep}{entry}') and entry.startswith(genlib.get_knn_imputation_code()):
+                    status_ok = os.path.isfile(genlib.get_status_ok(f'{imputation_result_subdir}{os.sep}{entry}'))
+                    if status_ok:
+                        knn_process_dir_list.append(entry)
+            knn_process_dir_list.sort()
+        except:    # pylint: disable=bare-except
+            pass
+        self.combobox_knn_process.addItems([''] + knn_process_dir_list)
+
+        # simultate "combobox_knn_process" index has changed
+        self.combobox_knn_process_currentIndexChanged()
+
+    #---------------
+
+    def combobox_knn_process_currentIndexChanged(self):
+        '''
+        Process the event when an item of "combobox_knn_process" has been selected.
+        '''
+
+        # get the result directory
+        result_dir = self.app_config_dict['Environment parameters']['result_dir']
+
+        # when there is an item selected in "combobox_knn_process"
+        if self.combobox_knn_process.currentText() != '':
+
+            # set the kNN process directory
+            knn_process_dir = f'{result_dir}/{genlib.get_result_imputation_subdir()}/{self.combobox_knn_process.currentText()}'
+
+            # set the parameter file
+            params_file = f'{knn_process_dir}/params.txt'
+            if sys.platform.startswith('win32'):
+                params_file = genlib.wsl_path_2_windows_path(params_file)
+
+            # set the parameter dictionary
+            params_dict = genlib.get_config_dict(params_file)
+
+            # set "lineedit_gtdb" value with its parameter value
+            gtdb_dir = params_dict['General parameters']['gtdb_dir']
+            if sys.platform.startswith('win32'):
+                gtdb_dir = genlib.wsl_path_2_windows_path(gtdb_dir)
+            self.lineedit_gtdb.setText(os.path.basename(gtdb_dir))
+
+            # set "lineedit_file_format" value with its parameter value
+            file_format = params_dict['General parameters']['file_format']
+            self.lineedit_file_format.setText(file_format)
+
+            # set "lineedit_mdc" value with its parameter value
+            mdc = params_dict['General parameters']['mdc']
+            self.lineedit_mdc.setText(mdc)
+
+            # set "lineedit_file_path" value with its parameter value
+            file_path = params_dict['General parameters']['file_path']
+            self.lineedit_file_path.setText(file_path)
+
+            # set "lineedit_neighbours" value with its parameter value
+            neighbours = params_dict['kNN parameters']['neighbours']
+            self.lineedit_neighbours.setText(neighbours)
+
+            # set "lineedit_kw" value with its parameter value
+            kw = self.kw_text_list[self.kw_code_list.index(params_dict['kNN parameters']['kw'])]
+            self.lineedit_kw.setText(kw)
+
+            # set "lineedit_mr2" value with its parameter value
+            mr2 = params_dict['SNPs selection parameters']['mr2']
+            self.lineedit_mr2.setText(mr2)
+
+            # set "lineedit_snps" value with its parameter value
+            snps = params_dict['SNPs selection parameters']['snps']
+            self.lineedit_snps.setText(snps)
+
+            # set "lineedit_gim" value with its parameter value
+            gim = self.gim_text_list[self.gim_code_list.index(params_dict['SNPs selection parameters']['gim'])]
+            self.lineedit_gim.setText(gim)
+
+        # when there is not an item selected in "combobox_knn_process"
+        else:
+
+            # set widget values with null values
+            self.lineedit_gtdb.setText('')
+            self.lineedit_file_path.setText('')
+            self.lineedit_file_format.setText('')
+            self.lineedit_mdc.setText('')
+            self.lineedit_neighbours.setText('')
+            self.lineedit_kw.setText('')
+            self.lineedit_mr2.setText('')
+            self.lineedit_snps.setText('')
+            self.lineedit_gim.setText('')
+
+    #---------------
+
+    def lineedit_gtdb_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_gtdb"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_file_format_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_file_format"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_mdc_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_mdc"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_file_path_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_file_path"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_neighbours_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_neighbours"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_kw_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_kw"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_mr2_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_mr2"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_snps_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_snps"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def lineedit_gim_editing_finished(self):
+        '''
+        Perform necessary actions after finishing editing "lineedit_gim"
+        '''
+
+        # initialize the control variable
+        OK = True
+
+        # return the control variable
+        return OK
+
+    #---------------
+
+    def pushbutton_execute_clicked(self):
+        '''
+        Execute the process.
+        '''
+
+        # get the result directory
+        result_dir = self.app_config_dict['Environment parameters']['result_dir']
+
+        # set the file with imputation data
+        imputation_data_file = f'{result_dir}/{genlib.get_result_imputation_subdir()}/{self.combobox_knn_process.currentText()}/imputation_data.csv'
+        if sys.platform.startswith('win32'):
+            imputation_data_file = genlib.wsl_path_2_windows_path(imputation_data_file)
+
+        # show de dialog with imputation
+        head = f'{self.head}: {self.combobox_knn_process.currentText()}'
+        imputation_plot = DialogImputationPlot(self, head, imputation_data_file)
+        imputation_plot.exec()
+
+    #---------------
+
+    def pushbutton_close_clicked(self):
+        '''
+        Close the window.
+        '''
+
+        self.parent.current_subwindow = None
+        self.close()
+        self.parent.set_background_image()
+
+#-------------------------------------------------------------------------------
+
 class DialogImputationPlot(QDialog):
     '''
     The class of the dialog to plot the result of an imputation process.
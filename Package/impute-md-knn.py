@@ -0,0 +1,759 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=invalid-name
+# pylint: disable=line-too-long
+# pylint: disable=multiple-statements
+# pylint: disable=too-many-lines
+# pylint: disable=wrong-import-position
+
+#-------------------------------------------------------------------------------
+
+'''
+This program imputes genotypes with missing data in a VCF file using the k nearest neighbours.
+
+This software has been developed by:
+
+    GI en Desarrollo de Especies y Comunidades Leñosas (WooSp)
+    Dpto. Sistemas y Recursos Naturales
+    ETSI Montes, Forestal y del Medio Natural
+    Universidad Politecnica de Madrid
+    https://github.com/ggfhf/
+
+Licence: GNU General Public Licence Version 3.
+'''
+
+#-------------------------------------------------------------------------------
+
+import argparse
+import gzip
+import os
+import queue
+import sys
+
+import numpy as np
+
+import genlib
+import imputelib
+import sqllib
+
+#-------------------------------------------------------------------------------
+
+def main():
+    '''
+    Main line of the program.
+    '''
+
+    # check the operating system
+    genlib.check_os()
+
+    # get and check the arguments
+    parser = build_parser()
+    args = parser.parse_args()
+    check_args(args)
+
+    # connect to the genotype database with the read-only profile (a genotype database built by an old version is migrated)
+    conn = imputelib.connect_genotype_database(args.genotype_database)
+
+    # impute genotypes with missing data in a VCF file using the k nearest neighbours
+    impute_md_knn(conn, args.genotype_database, args.threads_num, args.input_vcf_file, args.output_vcf_file, args.imputation_data_file, args.minimum_r2, args.r_estimator, args.snps_num, args.neighbours_num, args.kinship_weighting, args.genotype_imputation_method, args.executor, args.memmap, args.tvi_list)
+
+#-------------------------------------------------------------------------------
+
+def build_parser():
+    '''
+    Build the parser with the available arguments.
+    '''
+
+    # create the parser and add arguments
+    description = 'Description: This program imputes genotypes with missing data in a VCF file using the k nearest neighbours.'
+    text = f'{genlib.get_app_long_name()} v{genlib.get_app_version()} - {os.path.basename(__file__)}\n\n{description}\n'
+    usage = f'\r{text.ljust(len("usage:"))}\nUsage: {os.path.basename(__file__)} arguments'
+    parser = argparse.ArgumentParser(usage=usage)
+    parser._optionals.title = 'Arguments'    # pylint: disable=protected-access
+    parser.add_argument('--threads', dest='threads_num', help='Number of threads (mandatory).')
+    parser.add_argument('--gtdb', dest='genotype_database', help='Path of the genotype database (mandatory).')
+    parser.add_argument('--input_vcf', dest='input_vcf_file', help='Path of the input VCF file (mandatory).')
+    parser.add_argument('--output_vcf', dest='output_vcf_file', help='Path of the output VCF file with missing data imputed (mandatory).')
+    parser.add_argument('--impdata', dest='imputation_data_file', help='Path of the output file with imputation data (mandatory).')
+    parser.add_argument('--neighbours', dest='neighbours_num', help='Number of nearest samples without missing data (k) used to impute a sample (mandatory).')
+    parser.add_argument('--kinship_weighting', dest='kinship_weighting', help=f'Weight the votes of the nearest samples with the kinship values of the estimator in the genotype imputation method MF: {genlib.get_kinship_weighting_code_list_text()}; default: {genlib.Const.DEFAULT_KINSHIP_WEIGHTING}.')
+    parser.add_argument('--mr2', dest='minimum_r2', help='Minimum r^2 to select SNPs (mandatory).')
+    parser.add_argument('--estimator', dest='r_estimator', help=f'Type of estimator: {genlib.get_r_estimator_code_list_text()}; default: {genlib.Const.DEFAULT_R_ESTIMATOR}.')
+    parser.add_argument('--snps', dest='snps_num', help='Number of SNPs considered among those with r^2 >= mr2 (mandatory).')
+    parser.add_argument('--gim', dest='genotype_imputation_method', help=f'Genotype imputation method: {genlib.get_genotype_imputation_method_code_list_text()}; default: {genlib.Const.DEFAULT_GENOTYPE_IMPUTATION_METHOD}.')
+    parser.add_argument('--executor', dest='executor', help=f'Executor of the variant imputations: {genlib.get_executor_code_list_text()}; default: {genlib.Const.DEFAULT_EXECUTOR}.')
+    parser.add_argument('--memmap', dest='memmap', help=f'Memory map the sample genotypes of the SNPs from a sidecar file of the genotype database (it is created when it does not exist or it is older than the database): {genlib.get_memmap_code_list_text()}; default: {genlib.Const.DEFAULT_MEMMAP}.')
+    parser.add_argument('--verbose', dest='verbose', help=f'Additional job status info during the run: {genlib.get_verbose_code_list_text()}; default: {genlib.Const.DEFAULT_VERBOSE}.')
+    parser.add_argument('--trace', dest='trace', help=f'Additional info useful to the developer team: {genlib.get_trace_code_list_text()}; default: {genlib.Const.DEFAULT_TRACE}.')
+    parser.add_argument('--tvi', dest='tvi_list', help='Variant identification list to trace with format seq_id_1-pos_1,seq_id_2-pos_2,...,seq_id_n-pos_n or NONE; default: NONE.')
+
+    # return the paser
+    return parser
+
+#-------------------------------------------------------------------------------
+
+def check_args(args):
+    '''
+    Check the input arguments.
+    '''
+
+    # initialize the control variable
+    OK = True
+
+    # check "threads_num"
+    if args.threads_num is None:
+        genlib.Message.print('error', '*** The number of threads is not indicated in the input arguments.')
+        OK = False
+    elif not genlib.check_int(args.threads_num, minimum=1):
+        genlib.Message.print('error', 'The number of threads has to be an integer number greater than or equal to 1.')
+        OK = False
+    else:
+        args.threads_num = int(args.threads_num)
+
+    # check "genotype_database"
+    if args.genotype_database is None:
+        genlib.Message.print('error', '*** The genotype database is not indicated in the input arguments.')
+        OK = False
+
+    # check "input_vcf_file"
+    if args.input_vcf_file is None:
+        genlib.Message.print('error', '*** The input VCF file is not indicated in the input arguments.')
+        OK = False
+    elif not os.path.isfile(args.input_vcf_file):
+        genlib.Message.print('error', f'*** The file {args.input_vcf_file} does not exist.')
+        OK = False
+
+    # check "output_vcf_file"
+    if args.output_vcf_file is None:
+        genlib.Message.print('error', '*** The output VCF file with missing data imputed is not indicated in the input arguments.')
+        OK = False
+
+    # check "imputation_data_file"
+    if args.imputation_data_file is None:
+        genlib.Message.print('error', '*** The output file with imputation data is not indicated in the input arguments.')
+        OK = False
+
+    # check "neighbours_num"
+    if args.neighbours_num is None:
+        genlib.Message.print('error', '*** The number of nearest samples is not indicated in the input arguments.')
+        OK = False
+    elif not genlib.check_int(args.neighbours_num, minimum=1):
+        genlib.Message.print('error', 'The number of nearest samples has to be an integer number greater than or equal to 1.')
+        OK = False
+    else:
+        args.neighbours_num = int(args.neighbours_num)
+
+    # check "kinship_weighting"
+    if args.kinship_weighting is None:
+        args.kinship_weighting = genlib.Const.DEFAULT_KINSHIP_WEIGHTING
+    elif not genlib.check_code(args.kinship_weighting, genlib.get_kinship_weighting_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** kinship_weighting has to be {genlib.get_kinship_weighting_code_list_text()}.')
+        OK = False
+    else:
+        args.kinship_weighting = args.kinship_weighting.upper()
+
+    # check "minimum_r2"
+    if args.minimum_r2 is None:
+        genlib.Message.print('error', '*** The minimum r^2 value to select SNPs is not indicated in the input arguments.')
+        OK = False
+    elif not genlib.check_float(args.minimum_r2, minimum=0.000001):
+        genlib.Message.print('error', 'The minimum r^2 value to select SNPs has to be an float number greater than 0.')
+        OK = False
+    else:
+        args.minimum_r2 = float(args.minimum_r2)
+
+    # check "r_estimator"
+    if args.r_estimator is None:
+        args.r_estimator = genlib.Const.DEFAULT_R_ESTIMATOR
+    else:
+        if not genlib.check_code(args.r_estimator, genlib.get_r_estimator_code_list(), case_sensitive=False):
+            genlib.Message.print('error', f'*** Type of estimator has to be {genlib.get_r_estimator_code_list_text()}.')
+            OK = False
+        else:
+            args.r_estimator = args.r_estimator.lower()
+
+    # check "snps_num"
+    if args.snps_num is None:
+        genlib.Message.print('error', '*** The number of SNPs considered among those with r^2 is not indicated in the input arguments.')
+        OK = False
+    elif not genlib.check_int(args.snps_num, minimum=2):
+        genlib.Message.print('error', 'The number of SNPs considered among those with r^2 >= mr2 has to be an integer number greater than or equal to 2.')
+        OK = False
+    else:
+        args.snps_num = int(args.snps_num)
+
+    # check "genotype_imputation_method"
+    if args.genotype_imputation_method is None:
+        args.genotype_imputation_method = genlib.Const.DEFAULT_GENOTYPE_IMPUTATION_METHOD
+    elif not genlib.check_code(args.genotype_imputation_method, genlib.get_genotype_imputation_method_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** The genotype imputation method has to be {genlib.get_genotype_imputation_method_code_list_text()}.')
+        OK = False
+    else:
+        args.genotype_imputation_method = args.genotype_imputation_method.upper()
+
+    # check "executor"
+    if args.executor is None:
+        args.executor = genlib.Const.DEFAULT_EXECUTOR
+    elif not genlib.check_code(args.executor, genlib.get_executor_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** The executor has to be {genlib.get_executor_code_list_text()}.')
+        OK = False
+    else:
+        args.executor = args.executor.lower()
+
+    # check "memmap"
+    if args.memmap is None:
+        args.memmap = genlib.Const.DEFAULT_MEMMAP
+    elif not genlib.check_code(args.memmap, genlib.get_memmap_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** memmap has to be {genlib.get_memmap_code_list_text()}.')
+        OK = False
+    else:
+        args.memmap = args.memmap.upper()
+
+    # check "verbose"
+    if args.verbose is None:
+        args.verbose = genlib.Const.DEFAULT_VERBOSE
+    elif not genlib.check_code(args.verbose, genlib.get_verbose_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** verbose has to be {genlib.get_verbose_code_list_text()}.')
+        OK = False
+    if args.verbose.upper() == 'Y':
+        genlib.Message.set_verbose_status(True)
+
+    # check "trace"
+    if args.trace is None:
+        args.trace = genlib.Const.DEFAULT_TRACE
+    elif not genlib.check_code(args.trace, genlib.get_trace_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** trace has to be {genlib.get_trace_code_list_text()}.')
+        OK = False
+    if args.trace.upper() == 'Y':
+        genlib.Message.set_trace_status(True)
+
+    # check "tvi_list"
+    if args.tvi_list is None or args.tvi_list == 'NONE':
+        args.tvi_list = []
+    else:
+        args.tvi_list = genlib.split_literal_to_text_list(args.tvi_list)
+
+    # if there are errors, exit with exception
+    if not OK:
+        raise genlib.ProgramException('', 'P001')
+
+#-------------------------------------------------------------------------------
+
+def impute_md_knn(conn, genotype_database, threads_num, input_vcf_file, output_vcf_file, imputation_data_file, minimum_r2, r_estimator, snps_num, neighbours_num, kinship_weighting, genotype_imputation_method, executor, memmap, tvi_list):
+    '''
+    Impute genotypes with missing data in a VCF file using the k nearest neighbours.
+    The SNP data and the linkage disequilibrium data are preloaded, so the genotype database is not queried
+    while the variants are processed by a pool of worker threads (executor thread) or by a pool of worker
+    processes initialized with the preloaded data (executor process), which receive the variants in chunks.
+    '''
+
+    genlib.Message.print('verbose', 'Processing the imputation in the VCF file ...\n')
+    genlib.Message.print('verbose', f'input_vcf_file: {input_vcf_file}')
+    genlib.Message.print('verbose', f'minimum_r2: {minimum_r2} - snps_num: {snps_num}')
+    genlib.Message.print('verbose', f'neighbours_num: {neighbours_num} - kinship_weighting: {kinship_weighting}')
+
+    # get the number of CPUs in the system
+    cpus_num = os.cpu_count()
+
+    # set the mximum number of threads to be used
+    if cpus_num is None:
+        max_threads_num = threads_num
+        genlib.Message.print('info', f'CPUs number in the system is undetermed. The process will use {threads_num} threads.\n')
+    else:
+        if cpus_num >=  threads_num:
+            max_threads_num = threads_num
+        else:
+            max_threads_num = cpus_num
+        genlib.Message.print('verbose', f'CPUs in the system: {cpus_num}.  The process will use {max_threads_num} threads.\n')
+
+    # initialize the sample number
+    sample_number = 0
+
+    # get the kinship matrix of the estimator
+    kinship_matrix = sqllib.get_vcf_kinship_matrix(conn, r_estimator)
+
+    # get the set of snp identification with  missing data
+    # (from the table "vcf_snps" because the table "vcf_linkage_disequilibrium" may only have the top SNPs of each one)
+    snp_id_1_set = set(sqllib.get_snp_ids_wmd_list(conn))
+
+    # set the parse filter of the variant records: only the variants with missing data, the traced variants
+    # and the variants whose fields are not valid are parsed (the other variant records are copied to the output VCF file as they are)
+    parsed_variant_id_set = snp_id_1_set | set(tvi_list)
+    def parse_filter(variant_id, record):
+        return variant_id in parsed_variant_id_set or not genlib.check_unparsed_vcf_record(record)
+
+    # preload the genotype data of the variants
+    genlib.Message.print('verbose', 'Preloading the genotype data ...\n')
+    genotype_data_dict = imputelib.load_genotype_data_dict(conn, genotype_database, memmap, minimum_r2, snps_num)
+    genlib.Message.print('verbose', 'The genotype data are preloaded.\n')
+
+    # open the input VCF file
+    if input_vcf_file.endswith('.gz'):
+        try:
+            input_vcf_file_id = gzip.open(input_vcf_file, mode='rt', encoding='iso-8859-1')
+        except Exception as e:
+            raise genlib.ProgramException(e, 'F002', input_vcf_file)
+    else:
+        try:
+            input_vcf_file_id = open(input_vcf_file, mode='r', encoding='iso-8859-1')
+        except Exception as e:
+            raise genlib.ProgramException(e, 'F001', input_vcf_file)
+
+    # open the output VCF file with missing data imputed
+    if output_vcf_file.endswith('.gz'):
+        try:
+            output_vcf_file_id = gzip.open(output_vcf_file, mode='wt', encoding='iso-8859-1', newline='\n')
+        except Exception as e:
+            raise genlib.ProgramException(e, 'F004', output_vcf_file)
+    else:
+        try:
+            output_vcf_file_id = open(output_vcf_file, mode='w', encoding='iso-8859-1', newline='\n')
+        except Exception as e:
+            raise genlib.ProgramException(e, 'F003', output_vcf_file)
+
+    # open the output file with imputation data
+    if imputation_data_file.endswith('.gz'):
+        try:
+            imputation_data_file_id = gzip.open(imputation_data_file, mode='wt', encoding='iso-8859-1', newline='\n')
+        except Exception as e:
+            raise genlib.ProgramException(e, 'F004', imputation_data_file)
+    else:
+        try:
+            imputation_data_file_id = open(imputation_data_file, mode='w', encoding='iso-8859-1', newline='\n')
+        except Exception as e:
+            raise genlib.ProgramException(e, 'F003', imputation_data_file)
+
+    # initialize counters
+    input_record_counter = 0
+    total_variant_counter = 0
+    imputed_variant_counter = 0
+
+    # initialize the scheduler: a pool of worker threads gets the chunks of variants from a bounded input queue
+    # (or a pool of worker processes receives them) and puts the results in the result queue; the results are written
+    # following the variant order using a reorder buffer whose size limits the variants sent and not yet written
+    worker_thread_list = []
+    pool = None
+    if executor == 'thread':
+        chunk_size = 1
+    else:
+        chunk_size = genlib.Const.SCHEDULER_PROCESS_CHUNK_SIZE
+    chunk_list = []
+    input_queue = queue.Queue(maxsize=max_threads_num * genlib.Const.SCHEDULER_QUEUE_SIZE_FACTOR)
+    result_queue = queue.Queue()
+    reorder_buffer_dict = {}
+    reorder_buffer_size = max_threads_num * chunk_size * genlib.Const.SCHEDULER_REORDER_BUFFER_SIZE_FACTOR
+    sequence_number = 0
+    next_sequence_number = 0
+
+    # read the first record of input VCF file
+    (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
+
+    # while there are records in the VCF file to check
+    while record != '':
+
+        # process metadata records
+        while record != '' and record.startswith('##'):
+
+            # add 1 to the input record counter
+            input_record_counter += 1
+
+            # write the metadata record
+            output_vcf_file_id.write(record)
+
+            # read the next record of the input VCF file
+            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
+
+            # print the counters
+            genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
+
+        # process the column description record
+        if record.startswith('#CHROM'):
+
+            # add 1 to the input record counter
+            input_record_counter += 1
+
+            # set the samples number
+            sample_number = len(data_dict['record_data_list']) - 9
+            genlib.Message.print('trace', f'sample_number: {sample_number}')
+
+            # write the column description record
+            output_vcf_file_id.write(record)
+
+            # read the next record of the input VCF file
+            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
+
+            # print the counters
+            genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
+
+        # process variant records
+        while record != '' and not record.startswith('##') and not record.startswith('#CHROM'):
+
+            # start the worker threads or processes when the first variant record is found
+            if worker_thread_list == [] and pool is None:
+                process_variant_arg_list = [genotype_data_dict, neighbours_num, kinship_weighting, genotype_imputation_method, tvi_list, kinship_matrix, snp_id_1_set, sample_number]
+                (worker_thread_list, pool) = imputelib.start_imputation_workers(executor, max_threads_num, input_queue, result_queue, impute_variant_chunk, process_variant_arg_list)
+
+            # add 1 to the input record counter
+            input_record_counter += 1
+
+            # add 1 to the total variant counter
+            total_variant_counter += 1
+
+            # write the results in order while the reorder buffer is full (the chunk in preparation is sent before waiting)
+            while sequence_number - next_sequence_number >= reorder_buffer_size:
+                chunk_list = imputelib.send_variant_chunk(chunk_list, input_queue, pool, result_queue)
+                (next_sequence_number, imputed_variant_counter) = imputelib.write_variant_results(result_queue, reorder_buffer_dict, next_sequence_number, imputed_variant_counter, output_vcf_file_id, imputation_data_file_id, wait=True)
+                genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
+
+            # when the variant record has not been parsed (it has not missing data), put it in the reorder buffer
+            # to be copied as it is to the output VCF file without sending it to the worker threads or processes
+            if not data_dict['is_parsed']:
+                reorder_buffer_dict[sequence_number] = {'output_vcf_record': record if record.endswith('\n') else f'{record}\n', 'imputation_data_record': '', 'is_variant_imputed': False}
+                sequence_number += 1
+
+            # add the variant to the chunk and send the chunk to the worker threads or processes when it is full
+            # (the input queue of the worker threads is bounded, so it waits while the queue is full)
+            else:
+                chunk_list.append((sequence_number, data_dict))
+                sequence_number += 1
+                if len(chunk_list) >= chunk_size:
+                    chunk_list = imputelib.send_variant_chunk(chunk_list, input_queue, pool, result_queue)
+
+            # write the results already processed in order
+            (next_sequence_number, imputed_variant_counter) = imputelib.write_variant_results(result_queue, reorder_buffer_dict, next_sequence_number, imputed_variant_counter, output_vcf_file_id, imputation_data_file_id, wait=False)
+            genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
+
+            # read the next record of the input VCF file
+            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
+
+    # send the last chunk and write the pending results in order
+    chunk_list = imputelib.send_variant_chunk(chunk_list, input_queue, pool, result_queue)
+    while next_sequence_number < sequence_number:
+        (next_sequence_number, imputed_variant_counter) = imputelib.write_variant_results(result_queue, reorder_buffer_dict, next_sequence_number, imputed_variant_counter, output_vcf_file_id, imputation_data_file_id, wait=True)
+        genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
+
+    # stop the worker threads or processes
+    imputelib.stop_imputation_workers(worker_thread_list, pool, input_queue)
+
+    genlib.Message.print('verbose', '\n')
+
+    genlib.Message.print('info', f'Processed records: {input_record_counter:8d}')
+    genlib.Message.print('info', f'Total variants   : {total_variant_counter:8d}')
+    genlib.Message.print('info', f'Imputed variants : {imputed_variant_counter:8d}')
+
+    # close files
+    input_vcf_file_id.close()
+    output_vcf_file_id.close()
+    imputation_data_file_id.close()
+
+#-------------------------------------------------------------------------------
+
+def impute_variant_chunk(worker_id, chunk_list, *process_variant_arg_list):
+    '''
+    Impute a chunk of variants in a worker thread or process and return the list of their results
+    (an exception is returned as result to be raised in the main thread).
+    '''
+
+    # initialize the result list
+    result_list = []
+
+    # process the variants
+    for (sequence_number, data_dict) in chunk_list:
+        try:
+            result_dict = process_variant(worker_id, *process_variant_arg_list, data_dict)
+        except BaseException as e:
+            result_dict = e
+        result_list.append((sequence_number, result_dict))
+
+    # return the result list
+    return result_list
+
+#-------------------------------------------------------------------------------
+
+def process_variant(thread_id, genotype_data_dict, neighbours_num, kinship_weighting, genotype_imputation_method, tvi_list, kinship_matrix, snp_id_1_set, sample_number, data_dict):
+    '''
+    Process a variant and impute its genotypes with missing data using the k nearest neighbours if necessary
+    and return the result dictionary.
+    '''
+
+    # initialize the impute variant indicator
+    is_variant_imputed = False
+
+    # initialize the dictionary of symbols
+    alleles2symbol_dict = imputelib.get_alleles2symbol_dict()
+
+    # get the sequence identification, position and variant identification
+    seq_id = data_dict['chrom']
+    pos = data_dict['pos']
+    variant_id = f'{seq_id}-{pos}'
+
+    # get the reference allele and alternative alleles (field ALT)
+    reference_allele = data_dict['ref']
+    alternative_alleles = data_dict['alt']
+
+    # build the alternative alleles list from field ALT
+    alternative_allele_list = alternative_alleles.split(',')
+
+    # check if the variant has more than one alternative allele
+    if len(alternative_allele_list) > 1:
+        raise genlib.ProgramException('L021', variant_id) from None
+
+    # get the position of the genotype (subfield GT) in the field FORMAT
+    format_subfield_list = data_dict['format'].upper().split(':')
+    try:
+        gt_position = format_subfield_list.index('GT')
+    except Exception as e:
+        raise genlib.ProgramException(e, 'L002', 'GT', data_dict['chrom'], data_dict['pos'])
+
+    # build the list of sample genotypes of a variant
+    sample_data_list = []
+    sample_gt_list = []
+    for i in range(sample_number):
+        sample_data_list.append(data_dict['sample_list'][i].split(':'))
+        sample_gt_list.append(sample_data_list[i][gt_position])
+
+    # build the lists of the left and right side of sample genotypes of a variant
+    sample_gt_left_list = []
+    sample_sep_list = []
+    sample_gt_right_list = []
+    for i in range(sample_number):
+        sep = '/'
+        sep_pos = sample_gt_list[i].find(sep)
+        if sep_pos == -1:
+            sep = '|'
+            sep_pos = sample_gt_list[i].find(sep)
+        if sep_pos == -1:
+            raise genlib.ProgramException('', 'L003', 'GT', data_dict['chrom'], data_dict['pos'])
+        sample_sep_list.append(sep)
+        sample_gt_left_list.append(sample_gt_list[i][:sep_pos])
+        sample_gt_right_list.append(sample_gt_list[i][sep_pos+1:])
+
+    # if there is missing data, impute it
+    if variant_id in snp_id_1_set:
+
+        if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - There is missing data')
+
+        # build the genotype text before imputation
+        genotype_text_before_imputation = ''
+        for i in range(sample_number):
+            genotype_text_before_imputation += f'{str(sample_gt_left_list[i])}{sample_sep_list[i]}{str(sample_gt_right_list[i])} '
+
+        # get the kNN input data of the variant
+        knn_input_dict = get_variant_knn_input_dict(genotype_data_dict, variant_id)
+        sample_withmd_list = knn_input_dict['sample_withmd_list']
+        if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - sample_withmd_list: {sample_withmd_list}')
+        selected_snp_id_2_list = knn_input_dict['selected_snp_id_2_list']
+        if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - selected_snp_id_2_list: {selected_snp_id_2_list}')
+        selected_sample_gt_matrix = knn_input_dict['selected_sample_gt_matrix']
+
+        # get the pseudobinary genotypes of the variant
+        pseudobinary_sample_gt_array_1 = selected_sample_gt_matrix[:, 0]
+
+        # calculate the most frequent genotype in the current variant
+        # (0b00 -> 0: 0/0; 0b01 -> 1: 0/1; 0b11 -> 3: 1/1; the first one when there are several)
+        gt_code_array = np.array([0, 1, 3])
+        gt_counter_array = np.count_nonzero(pseudobinary_sample_gt_array_1[:, np.newaxis] == gt_code_array, axis=0)
+        sample_gt_left_mf = -1
+        sample_gt_right_mf = -1
+        if gt_counter_array.sum() > 0:
+            (sample_gt_left_mf, sample_gt_right_mf) = get_pseudobinary_gt_alleles(gt_code_array[np.argmax(gt_counter_array)])
+        if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - Most frequent genotype: sample_gt_left_mf: {sample_gt_left_mf} - sample_gt_right_mf: {sample_gt_right_mf}')
+
+        # when there are not selected SNPs or samples without missing data
+        if selected_sample_gt_matrix.shape[1] == 1 or len(sample_withmd_list) == sample_number:
+
+            # set the most frequent genotype as genotype of individuals with missing data
+            for sample_withmd in sample_withmd_list:
+                sample_gt_left_list[sample_withmd] = sample_gt_left_mf
+                sample_gt_right_list[sample_withmd] = sample_gt_right_mf
+
+        # when there are selected SNPs
+        else:
+
+            # get the k nearest samples without missing data of every sample with missing data and their distances
+            (neighbour_matrix, distance_matrix) = get_nearest_neighbour_matrix(selected_sample_gt_matrix, sample_withmd_list, neighbours_num)
+            if variant_id in tvi_list:
+                for i, sample_withmd in enumerate(sample_withmd_list):
+                    genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - sample_withmd_list[{i}]: {sample_withmd} - gt: {selected_sample_gt_matrix[sample_withmd].tolist()} - neighbours: {neighbour_matrix[i].tolist()} - distances: {distance_matrix[i].tolist()}')
+
+            # method MF: the most frequent genotype in the nearest samples
+            if genotype_imputation_method == 'MF':
+                imputed_gt_array = get_knn_most_frequent_gt_array(pseudobinary_sample_gt_array_1, sample_withmd_list, neighbour_matrix, kinship_matrix, kinship_weighting)
+                for i, sample_withmd in enumerate(sample_withmd_list):
+                    (sample_gt_left_list[sample_withmd], sample_gt_right_list[sample_withmd]) = get_pseudobinary_gt_alleles(imputed_gt_array[i])
+
+            # method CK: the genotype of the closest kinship individual in the nearest samples
+            elif genotype_imputation_method == 'CK':
+                most_related_sample_id_array = get_knn_most_related_sample_id_array(sample_withmd_list, neighbour_matrix, kinship_matrix)
+                for i, sample_withmd in enumerate(sample_withmd_list):
+                    most_related_sample_id = most_related_sample_id_array[i]
+                    sample_gt_left_list[sample_withmd] = sample_gt_left_list[most_related_sample_id]
+                    sample_gt_right_list[sample_withmd] = sample_gt_right_list[most_related_sample_id]
+                    if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - sample_withmd_list[{i}]: {sample_withmd} - most_related_sample_id: {most_related_sample_id}')
+
+            if variant_id in tvi_list:
+                for i, sample_withmd in enumerate(sample_withmd_list):
+                    genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} -     sample_gt_left_list[{sample_withmd}]: {sample_gt_left_list[sample_withmd]} - sample_gt_right_list[{sample_withmd}]: {sample_gt_right_list[sample_withmd]}')
+
+            # set the impute variant indicator
+            is_variant_imputed = True
+
+        # build the genotype text after imputation
+        genotype_text_after_imputation = ''
+        for i in range(sample_number):
+            genotype_text_after_imputation += f'{str(sample_gt_left_list[i])}{sample_sep_list[i]}{str(sample_gt_right_list[i])} '
+        if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - genotype list before imputation: {genotype_text_before_imputation}')
+        if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - genotype list  after imputation: {genotype_text_after_imputation}')
+
+    # if there are no mising data
+    else:
+
+        if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - There is no missing data')
+
+    # rebuild the list of the field GT for every sample
+    for i in range(sample_number):
+        sample_gt_list[i] = f'{sample_gt_left_list[i]}{sample_sep_list[i]}{sample_gt_right_list[i]}'
+
+    # rebuild the sample genotype data list and their corresponding record data
+    sample_list = []
+    for i in range(sample_number):
+        sample_data_list[i][gt_position] = sample_gt_list[i]
+        sample_list.append(':'.join(sample_data_list[i]))
+
+    # rebuild the variant record
+    sample_list_text = '\t'.join(sample_list)
+    output_vcf_record = f'{data_dict["chrom"]}\t{data_dict["pos"]}\t{data_dict["id"]}\t{data_dict["ref"]}\t{data_dict["alt"]}\t{data_dict["qual"]}\t{data_dict["filter"]}\t{data_dict["info"]}\t{data_dict["format"]}\t{sample_list_text}\n'
+
+    # save imputation data
+    # record format: seq_id;pos;reference_allele;alternative_alleles;sample_withmd_list_text;symbolic_sample_gt_list_text
+    if is_variant_imputed:
+        sample_withmd_list_text = '_'.join([str(x) for x in sample_withmd_list])
+        symbolic_sample_gt_list = []
+        for i in range(sample_number):
+            symbolic_sample_gt_left = reference_allele if sample_gt_left_list[i] == '0' else alternative_allele_list[0]
+            symbolic_sample_gt_right = reference_allele if sample_gt_right_list[i] == '0' else alternative_allele_list[0]
+            symbolic_sample_gt = ''.join(sorted([symbolic_sample_gt_left, symbolic_sample_gt_right]))
+            symbolic_sample_gt_list.append(alleles2symbol_dict[symbolic_sample_gt])
+        symbolic_sample_gt_list_text = ''.join(symbolic_sample_gt_list)
+        imputation_data_record = f'{seq_id};{pos};{reference_allele};{alternative_alleles};{sample_withmd_list_text};{symbolic_sample_gt_list_text}\n'
+    else:
+        imputation_data_record = ''
+
+    # return the result dictionary
+    return {'output_vcf_record': output_vcf_record, 'imputation_data_record': imputation_data_record, 'is_variant_imputed': is_variant_imputed}
+
+#-------------------------------------------------------------------------------
+
+def get_pseudobinary_gt_alleles(pseudobinary_gt):
+    '''
+    Get the left and right alleles of a pseudobinary genotype (0b00 -> 0: 0/0; 0b01 -> 1: 0/1; 0b11 -> 3: 1/1).
+    '''
+
+    return {0: ('0', '0'), 1: ('0', '1'), 3: ('1', '1')}[int(pseudobinary_gt)]
+
+#-------------------------------------------------------------------------------
+
+def get_variant_knn_input_dict(genotype_data_dict, variant_id):
+    '''
+    Get the kNN input data of a variant with missing data: the samples with missing data, the selected SNPs
+    (the variant is the first) and the pseudobinary genotypes of samples (rows) in the selected SNPs (columns).
+    '''
+
+    # get the samples with missing data of the variant from table "vcf_snps"
+    snp_data_dict = imputelib.get_variant_snp_data_dict(genotype_data_dict, variant_id)
+    sample_withmd_list = np.flatnonzero(snp_data_dict['sample_gt_array'] == 7).tolist()
+
+    # get the list with SNPs with the highest r^2 values calculated with respect to the current variant identification
+    selected_snp_id_2_list = imputelib.get_variant_selected_snp_id_2_list(genotype_data_dict, variant_id)
+
+    # get the complete list of SNPs considered (the current variant id is the first)
+    selected_snp_id_list = [variant_id] + selected_snp_id_2_list
+
+    # get the pseudobinary genotypes of samples (rows) in the selected SNPs (columns)
+    selected_snp_index_list = [genotype_data_dict['snp_index_dict'][selected_snp_id] for selected_snp_id in selected_snp_id_list]
+    selected_sample_gt_matrix = np.asarray(genotype_data_dict['snp_matrix_dict']['sample_gt_matrix'][selected_snp_index_list]).T
+
+    # return the kNN input data dictionary
+    return {'sample_withmd_list': sample_withmd_list, 'selected_snp_id_2_list': selected_snp_id_2_list, 'selected_snp_id_list': selected_snp_id_list, 'selected_sample_gt_matrix': selected_sample_gt_matrix}
+
+#-------------------------------------------------------------------------------
+
+def get_nearest_neighbour_matrix(selected_sample_gt_matrix, sample_withmd_list, neighbours_num):
+    '''
+    Get the matrix of the k nearest samples without missing data (columns, from the nearest one; the ties are
+    ordered by sample identification) of every sample with missing data (rows) and the matrix of their distances.
+    The distance is the Hamming distance of the genotypes in the selected SNPs (the first one, the variant, is not considered)
+    and the distances of all samples with missing data are calculated together a SNP each time.
+    '''
+
+    # get the samples without missing data
+    sample_withoutmd_array = np.delete(np.arange(selected_sample_gt_matrix.shape[0]), sample_withmd_list)
+
+    # get the genotypes of the samples with and without missing data in the selected SNPs
+    withmd_gt_matrix = selected_sample_gt_matrix[sample_withmd_list, 1:]
+    withoutmd_gt_matrix = selected_sample_gt_matrix[sample_withoutmd_array, 1:]
+
+    # calculate the Hamming distances between the samples with missing data (rows) and the samples without missing data (columns)
+    distance_matrix = np.zeros((withmd_gt_matrix.shape[0], withoutmd_gt_matrix.shape[0]), dtype=np.int32)
+    for j in range(withmd_gt_matrix.shape[1]):
+        distance_matrix += withmd_gt_matrix[:, j, np.newaxis] != withoutmd_gt_matrix[np.newaxis, :, j]
+
+    # get the positions of the k nearest samples without missing data
+    k = min(neighbours_num, len(sample_withoutmd_array))
+    nearest_index_matrix = np.argsort(distance_matrix, axis=1, kind='stable')[:, :k]
+
+    # return the k nearest samples and their distances
+    return sample_withoutmd_array[nearest_index_matrix], np.take_along_axis(distance_matrix, nearest_index_matrix, axis=1)
+
+#-------------------------------------------------------------------------------
+
+def get_knn_most_frequent_gt_array(pseudobinary_sample_gt_array, sample_withmd_list, neighbour_matrix, kinship_matrix, kinship_weighting):
+    '''
+    Get the array of the most frequent pseudobinary genotypes in the nearest samples of every sample with missing data
+    (the first one when there are several). When kinship_weighting is Y, the vote of every nearest sample
+    is weighted with 1 plus its kinship value with the sample with missing data (negative and NaN values are 0).
+    '''
+
+    # get the genotypes of the nearest samples
+    neighbour_gt_matrix = pseudobinary_sample_gt_array[neighbour_matrix]
+
+    # get the weights of the votes of the nearest samples
+    if kinship_weighting == 'Y':
+        kinship_value_matrix = kinship_matrix[np.array(sample_withmd_list)[:, np.newaxis], neighbour_matrix]
+        weight_matrix = 1.0 + np.where(np.isnan(kinship_value_matrix), 0.0, np.maximum(kinship_value_matrix, 0.0))
+    else:
+        weight_matrix = np.ones(neighbour_matrix.shape)
+
+    # count the weighted votes of every genotype (0b00 -> 0: 0/0; 0b01 -> 1: 0/1; 0b11 -> 3: 1/1)
+    gt_code_array = np.array([0, 1, 3])
+    vote_matrix = ((neighbour_gt_matrix[:, :, np.newaxis] == gt_code_array) * weight_matrix[:, :, np.newaxis]).sum(axis=1)
+
+    # return the genotypes with the most votes
+    return gt_code_array[np.argmax(vote_matrix, axis=1)]
+
+#-------------------------------------------------------------------------------
+
+def get_knn_most_related_sample_id_array(sample_withmd_list, neighbour_matrix, kinship_matrix):
+    '''
+    Get the array of the most related sample identification in the nearest samples of every sample with missing data
+    using the kinship matrix of the estimator (the nearest sample when there are not kinship values).
+    '''
+
+    # get the kinship values of the nearest samples (NaN values are not considered)
+    kinship_value_matrix = kinship_matrix[np.array(sample_withmd_list)[:, np.newaxis], neighbour_matrix]
+    kinship_value_matrix = np.where(np.isnan(kinship_value_matrix), -np.inf, kinship_value_matrix)
+
+    # get the positions of the nearest samples with the highest kinship value (the first one when there are several
+    # or when there are not kinship values)
+    most_related_index_array = np.argmax(kinship_value_matrix, axis=1)
+
+    # return the most related sample identifications
+    return neighbour_matrix[np.arange(neighbour_matrix.shape[0]), most_related_index_array]
+
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    main()
+    sys.exit(0)
+
+#-------------------------------------------------------------------------------
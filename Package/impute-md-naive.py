@@ -212,8 +212,18 @@ def impute_md_naive(threads_num, input_vcf_file, output_vcf_file, imputation_dat
     total_variant_counter = 0
     imputed_variant_counter = 0
 
+    # set the parse filter of the variant records: only the variant records with missing data in the field GT of any sample
+    # ("." next to a separator), the traced variants and the variants whose fields are not valid are parsed
+    # (the other ones are copied to the output VCF file as they are)
+    tvi_set = set(tvi_list)
+    def parse_filter(variant_id, record):
+        if variant_id in tvi_set or not genlib.check_unparsed_vcf_record(record):
+            return True
+        sample_text = record.split('\t', 9)[-1]
+        return './' in sample_text or '/.' in sample_text or '.|' in sample_text or '|.' in sample_text
+
     # read the first record of input VCF file
-    (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False)
+    (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
 
     # while there are records in the VCF file to check
     while record != '':
@@ -228,7 +238,7 @@ def impute_md_naive(threads_num, input_vcf_file, output_vcf_file, imputation_dat
             output_vcf_file_id.write(record)
 
             # read the next record of the input VCF file
-            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False)
+            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
 
             # print the counters
             genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
@@ -256,7 +266,7 @@ def impute_md_naive(threads_num, input_vcf_file, output_vcf_file, imputation_dat
             output_vcf_file_id.write(record)
 
             # read the next record of the input VCF file
-            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False)
+            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
 
             # print the counters
             genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
@@ -267,8 +277,9 @@ def impute_md_naive(threads_num, input_vcf_file, output_vcf_file, imputation_dat
             # initialize working threads number
             w_threads_num = 0
 
-            # initialize variant data dictionaries list
+            # initialize variant data dictionaries list and variant records list
             data_dict_list = []
+            record_list = []
 
             # create a group of max_threads_num variant records
             while record != '' and not record.startswith('##') and not record.startswith('#CHROM') and w_threads_num < max_threads_num:
@@ -282,23 +293,28 @@ def impute_md_naive(threads_num, input_vcf_file, output_vcf_file, imputation_dat
                 # add 1 to the working threads number
                 w_threads_num += 1
 
-                # add variant data dictionary to variant data dictionaries list
+                # add variant data dictionary and variant record to their lists
                 data_dict_list.append(data_dict)
+                record_list.append(record)
 
                 # read the next record of the input VCF file
-                (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False)
+                (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
 
-            # create and start threads
+            # create and start threads (the result of a variant record not parsed is the record as it is, without a thread)
             threads_list = []
             result_list = []
             for thread_id in range(w_threads_num):
                 result_list.append({})
+                if not data_dict_list[thread_id]['is_parsed']:
+                    variant_record = record_list[thread_id]
+                    result_list[thread_id] = {'output_vcf_record': variant_record if variant_record.endswith('\n') else f'{variant_record}\n', 'imputation_data_record': '', 'is_variant_imputed': False}
+                    continue
                 threads_list.append(threading.Thread(target=process_variant, args=[thread_id, tvi_list, sample_number, data_dict_list[thread_id], result_list]))
-                threads_list[thread_id].start()
+                threads_list[-1].start()
 
             # wait until all threads terminate
-            for thread_id in range(w_threads_num):
-                threads_list[thread_id].join()
+            for thread in threads_list:
+                thread.join()
 
             # process results of threads
             for thread_id in range(w_threads_num):
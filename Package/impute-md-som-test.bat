@@ -57,10 +57,14 @@ rem Run the program impute-md-som.py
     --sigma=0.5 ^
     --ilrate=0.5 ^
     --iter=1000 ^
+    --qetol=NONE ^
     --mr2=0.001 ^
     --estimator=ru ^
     --snps=5 ^
     --gim=CK ^
+    --executor=thread ^
+    --som_engine=minisom ^
+    --memmap=N ^
     --verbose=Y ^
     --trace=N ^
     --tvi=NONE
@@ -48,10 +48,14 @@ cd $APP_DIR
         --sigma=1.0 \
         --ilrate=0.5 \
         --iter=1000 \
+        --qetol=NONE \
         --mr2=0.001 \
         --estimator=ru \
         --snps=5 \
         --gim=MF \
+        --executor=thread \
+        --som_engine=minisom \
+        --memmap=N \
         --verbose=Y \
         --trace=N \
         --tvi=NONE
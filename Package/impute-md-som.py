@@ -26,19 +26,25 @@ Licence: GNU General Public Licence Version 3.
 
 import argparse
 import gzip
+import hashlib
 import os
+import queue
 import sys
-import threading
-
-from threading import Semaphore
 
 import minisom
+import numpy as np
 
 import genlib
+import imputelib
 import sqllib
 
 #-------------------------------------------------------------------------------
 
+# cache of trained SOMs shared by the worker threads (every worker process has its own one)
+som_cache = genlib.LRUCache(genlib.Const.SOM_CACHE_SIZE)
+
+#-------------------------------------------------------------------------------
+
 def main():
     '''
     Main line of the program.
@@ -52,11 +58,11 @@ def main():
     args = parser.parse_args()
     check_args(args)
 
-    # connect to the genotype database
-    conn = sqllib.connect_database(args.genotype_database, check_same_thread=False)
+    # connect to the genotype database with the read-only profile (a genotype database built by an old version is migrated)
+    conn = imputelib.connect_genotype_database(args.genotype_database)
 
     # impute genotypes with missing data in a VCF file using Self-Organizing Maps
-    impute_md_som(conn, args.threads_num, args.input_vcf_file, args.output_vcf_file, args.imputation_data_file, args.minimum_r2, args.r_estimator, args.snps_num, args.xdim, args.ydim, args.sigma, args.learning_rate, args.num_iteration, args.genotype_imputation_method, args.tvi_list)
+    impute_md_som(conn, args.genotype_database, args.threads_num, args.input_vcf_file, args.output_vcf_file, args.imputation_data_file, args.minimum_r2, args.r_estimator, args.snps_num, args.xdim, args.ydim, args.sigma, args.learning_rate, args.num_iteration, args.qe_tolerance, args.genotype_imputation_method, args.executor, args.som_engine, args.memmap, args.tvi_list)
 
 #-------------------------------------------------------------------------------
 
@@ -81,10 +87,14 @@ def build_parser():
     parser.add_argument('--sigma', dest='sigma', help='Spread of the neighborhood function (mandatory).')
     parser.add_argument('--ilrate', dest='learning_rate', help='Initial learning rate (mandatory).')
     parser.add_argument('--iter', dest='num_iteration', help='Maximum number of iterations (mandatory).')
+    parser.add_argument('--qetol', dest='qe_tolerance', help=f'Tolerance of the quantization error improvement, checked every {genlib.Const.SOM_CONVERGENCE_CHECK_INTERVAL} iterations, to stop the SOM training before the maximum number of iterations or NONE; default: NONE.')
     parser.add_argument('--mr2', dest='minimum_r2', help='Minimum r^2 to select SNPs (mandatory).')
     parser.add_argument('--estimator', dest='r_estimator', help=f'Type of estimator: {genlib.get_r_estimator_code_list_text()}; default: {genlib.Const.DEFAULT_R_ESTIMATOR}.')
     parser.add_argument('--snps', dest='snps_num', help='Number of SNPs considered among those with r^2 >= mr2 (mandatory).')
     parser.add_argument('--gim', dest='genotype_imputation_method', help=f'Genotype imputation method: {genlib.get_genotype_imputation_method_code_list_text()}; default: {genlib.Const.DEFAULT_GENOTYPE_IMPUTATION_METHOD}.')
+    parser.add_argument('--executor', dest='executor', help=f'Executor of the variant imputations: {genlib.get_executor_code_list_text()}; default: {genlib.Const.DEFAULT_EXECUTOR}.')
+    parser.add_argument('--som_engine', dest='som_engine', help=f'Engine of the SOM training: {genlib.get_som_engine_code_list_text()}; default: {genlib.Const.DEFAULT_SOM_ENGINE}.')
+    parser.add_argument('--memmap', dest='memmap', help=f'Memory map the sample genotypes of the SNPs from a sidecar file of the genotype database (it is created when it does not exist or it is older than the database): {genlib.get_memmap_code_list_text()}; default: {genlib.Const.DEFAULT_MEMMAP}.')
     parser.add_argument('--verbose', dest='verbose', help=f'Additional job status info during the run: {genlib.get_verbose_code_list_text()}; default: {genlib.Const.DEFAULT_VERBOSE}.')
     parser.add_argument('--trace', dest='trace', help=f'Additional info useful to the developer team: {genlib.get_trace_code_list_text()}; default: {genlib.Const.DEFAULT_TRACE}.')
     parser.add_argument('--tvi', dest='tvi_list', help='Variant identification list to trace with format seq_id_1-pos_1,seq_id_2-pos_2,...,seq_id_n-pos_n or NONE; default: NONE.')
@@ -185,6 +195,15 @@ def check_args(args):
     else:
         args.num_iteration = int(args.num_iteration)
 
+    # check "qe_tolerance"
+    if args.qe_tolerance is None or args.qe_tolerance.upper() == 'NONE':
+        args.qe_tolerance = None
+    elif not genlib.check_float(args.qe_tolerance, minimum=0.0):
+        genlib.Message.print('error', 'The tolerance of the quantization error has to be a float number greater than or equal to 0.0 or NONE.')
+        OK = False
+    else:
+        args.qe_tolerance = float(args.qe_tolerance)
+
     # check "minimum_r2"
     if args.minimum_r2 is None:
         genlib.Message.print('error', '*** The minimum r^2 value to select SNPs is not indicated in the input arguments.')
@@ -221,6 +240,33 @@ def check_args(args):
         genlib.Message.print('error', f'*** The genotype imputation method has to be {genlib.get_genotype_imputation_method_code_list_text()}.')
         OK = False
 
+    # check "executor"
+    if args.executor is None:
+        args.executor = genlib.Const.DEFAULT_EXECUTOR
+    elif not genlib.check_code(args.executor, genlib.get_executor_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** The executor has to be {genlib.get_executor_code_list_text()}.')
+        OK = False
+    else:
+        args.executor = args.executor.lower()
+
+    # check "som_engine"
+    if args.som_engine is None:
+        args.som_engine = genlib.Const.DEFAULT_SOM_ENGINE
+    elif not genlib.check_code(args.som_engine, genlib.get_som_engine_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** The SOM engine has to be {genlib.get_som_engine_code_list_text()}.')
+        OK = False
+    else:
+        args.som_engine = args.som_engine.lower()
+
+    # check "memmap"
+    if args.memmap is None:
+        args.memmap = genlib.Const.DEFAULT_MEMMAP
+    elif not genlib.check_code(args.memmap, genlib.get_memmap_code_list(), case_sensitive=False):
+        genlib.Message.print('error', f'*** memmap has to be {genlib.get_memmap_code_list_text()}.')
+        OK = False
+    else:
+        args.memmap = args.memmap.upper()
+
     # check "verbose"
     if args.verbose is None:
         args.verbose = genlib.Const.DEFAULT_VERBOSE
@@ -251,15 +297,20 @@ def check_args(args):
 
 #-------------------------------------------------------------------------------
 
-def impute_md_som(conn, threads_num, input_vcf_file, output_vcf_file, imputation_data_file, minimum_r2, r_estimator, snps_num, xdim, ydim, sigma, learning_rate, num_iteration, genotype_imputation_method, tvi_list):
+def impute_md_som(conn, genotype_database, threads_num, input_vcf_file, output_vcf_file, imputation_data_file, minimum_r2, r_estimator, snps_num, xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance, genotype_imputation_method, executor, som_engine, memmap, tvi_list):
     '''
     Impute genotypes with missing data in a VCF file using Self-Organizing Maps.
+    The SNP data and the linkage disequilibrium data are preloaded, so the genotype database is not queried
+    while the variants are processed by a pool of worker threads (executor thread) or by a pool of worker
+    processes initialized with the preloaded data (executor process), which receive the variants in chunks.
+    When the SOM engine is batch, the SOMs of the variants of every chunk are trained together.
     '''
 
     genlib.Message.print('verbose', 'Processing the imputation in the VCF file ...\n')
     genlib.Message.print('verbose', f'input_vcf_file: {input_vcf_file}')
     genlib.Message.print('verbose', f'minimum_r2: {minimum_r2} - snps_num: {snps_num}')
-    genlib.Message.print('verbose', f'xdim: {xdim} - ydim: {ydim} - sigma: {sigma} - learning_rate: {learning_rate} - num_iteration: {num_iteration}')
+    genlib.Message.print('verbose', f'xdim: {xdim} - ydim: {ydim} - sigma: {sigma} - learning_rate: {learning_rate} - num_iteration: {num_iteration} - qe_tolerance: {qe_tolerance}')
+    genlib.Message.print('verbose', f'som_engine: {som_engine}')
 
     # get the number of CPUs in the system
     cpus_num = os.cpu_count()
@@ -275,20 +326,29 @@ def impute_md_som(conn, threads_num, input_vcf_file, output_vcf_file, imputation
             max_threads_num = cpus_num
         genlib.Message.print('verbose', f'CPUs in the system: {cpus_num}.  The process will use {max_threads_num} threads.\n')
 
-    # create the semaphore to control databases accesses
-    semaphore = Semaphore(1)
-
     # initialize the sample lists, sample number and label dict
     sample_id_list = []
     sample_label_list = []
     sample_number = 0
     label_dict = {}
 
-    # get the kinship dictionary
-    kinship_dict = sqllib.get_vcf_kinship_dict(conn)
+    # get the kinship matrix of the estimator
+    kinship_matrix = sqllib.get_vcf_kinship_matrix(conn, r_estimator)
+
+    # get the set of snp identification with  missing data
+    # (from the table "vcf_snps" because the table "vcf_linkage_disequilibrium" may only have the top SNPs of each one)
+    snp_id_1_set = set(sqllib.get_snp_ids_wmd_list(conn))
 
-    # get the list of snp identification with  missing data
-    snp_id_1_list = sorted(sqllib.get_vcf_linkage_disequilibrium_snp_id_1_list(conn))
+    # set the parse filter of the variant records: only the variants with missing data, the traced variants
+    # and the variants whose fields are not valid are parsed (the other variant records are copied to the output VCF file as they are)
+    parsed_variant_id_set = snp_id_1_set | set(tvi_list)
+    def parse_filter(variant_id, record):
+        return variant_id in parsed_variant_id_set or not genlib.check_unparsed_vcf_record(record)
+
+    # preload the genotype data of the variants
+    genlib.Message.print('verbose', 'Preloading the genotype data ...\n')
+    genotype_data_dict = imputelib.load_genotype_data_dict(conn, genotype_database, memmap, minimum_r2, snps_num)
+    genlib.Message.print('verbose', 'The genotype data are preloaded.\n')
 
     # open the input VCF file
     if input_vcf_file.endswith('.gz'):
@@ -326,13 +386,35 @@ def impute_md_som(conn, threads_num, input_vcf_file, output_vcf_file, imputation
         except Exception as e:
             raise genlib.ProgramException(e, 'F003', imputation_data_file)
 
-    # initialize counters
+    # initialize counters (the SOM counters are the trained SOMs, their training iterations, the SOMs stopped early
+    # and the SOMs got from the SOM cache of the worker threads or processes)
     input_record_counter = 0
     total_variant_counter = 0
     imputed_variant_counter = 0
+    som_counter_dict = {'trained_soms': 0, 'som_iterations': 0, 'early_stopped_soms': 0, 'som_cache_hits': 0}
+
+    # initialize the scheduler: a pool of worker threads gets the chunks of variants from a bounded input queue
+    # (or a pool of worker processes receives them) and puts the results in the result queue; the results are written
+    # following the variant order using a reorder buffer whose size limits the variants sent and not yet written
+    # (when the SOM engine is batch, a chunk has the variants whose SOMs are trained together)
+    worker_thread_list = []
+    pool = None
+    if som_engine == 'batch':
+        chunk_size = genlib.Const.SOM_BATCH_SIZE
+    elif executor == 'thread':
+        chunk_size = 1
+    else:
+        chunk_size = genlib.Const.SCHEDULER_PROCESS_CHUNK_SIZE
+    chunk_list = []
+    input_queue = queue.Queue(maxsize=max_threads_num * genlib.Const.SCHEDULER_QUEUE_SIZE_FACTOR)
+    result_queue = queue.Queue()
+    reorder_buffer_dict = {}
+    reorder_buffer_size = max_threads_num * chunk_size * genlib.Const.SCHEDULER_REORDER_BUFFER_SIZE_FACTOR
+    sequence_number = 0
+    next_sequence_number = 0
 
     # read the first record of input VCF file
-    (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False)
+    (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
 
     # while there are records in the VCF file to check
     while record != '':
@@ -347,7 +429,7 @@ def impute_md_som(conn, threads_num, input_vcf_file, output_vcf_file, imputation
             output_vcf_file_id.write(record)
 
             # read the next record of the input VCF file
-            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False)
+            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
 
             # print the counters
             genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
@@ -375,7 +457,7 @@ def impute_md_som(conn, threads_num, input_vcf_file, output_vcf_file, imputation
             output_vcf_file_id.write(record)
 
             # read the next record of the input VCF file
-            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False)
+            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
 
             # print the counters
             genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
@@ -383,65 +465,62 @@ def impute_md_som(conn, threads_num, input_vcf_file, output_vcf_file, imputation
         # process variant records
         while record != '' and not record.startswith('##') and not record.startswith('#CHROM'):
 
-            # initialize working threads number
-            w_threads_num = 0
+            # start the worker threads or processes when the first variant record is found
+            if worker_thread_list == [] and pool is None:
+                process_variant_arg_list = [genotype_data_dict, r_estimator, xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance, genotype_imputation_method, tvi_list, kinship_matrix, snp_id_1_set, sample_label_list, label_dict, sample_number]
+                (worker_thread_list, pool) = imputelib.start_imputation_workers(executor, max_threads_num, input_queue, result_queue, impute_variant_chunk, [som_engine] + process_variant_arg_list)
 
-            # initialize variant data dictionaries list
-            data_dict_list = []
-
-            # create a group of max_threads_num variant records
-            while record != '' and not record.startswith('##') and not record.startswith('#CHROM') and w_threads_num < max_threads_num:
-
-                # add 1 to the input record counter
-                input_record_counter += 1
-
-                # add 1 to the total variant counter
-                total_variant_counter += 1
-
-                # add 1 to the working threads number
-                w_threads_num += 1
-
-                # add variant data dictionary to variant data dictionaries list
-                data_dict_list.append(data_dict)
-
-                # read the next record of the input VCF file
-                (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False)
-
-            # create and start threads
-            threads_list = []
-            result_list = []
-            for thread_id in range(w_threads_num):
-                result_list.append({})
-                threads_list.append(threading.Thread(target=process_variant, args=[thread_id, conn, semaphore, minimum_r2, r_estimator, snps_num, xdim, ydim, sigma, learning_rate, num_iteration, genotype_imputation_method, tvi_list, kinship_dict, snp_id_1_list, sample_label_list, label_dict, sample_number, data_dict_list[thread_id], result_list]))
-                threads_list[thread_id].start()
-
-            # wait until all threads terminate
-            for thread_id in range(w_threads_num):
-                threads_list[thread_id].join()
+            # add 1 to the input record counter
+            input_record_counter += 1
 
-            # process results of threads
-            for thread_id in range(w_threads_num):
+            # add 1 to the total variant counter
+            total_variant_counter += 1
 
-                # write the variant record
-                output_vcf_file_id.write(result_list[thread_id]['output_vcf_record'])
+            # write the results in order while the reorder buffer is full (the chunk in preparation is sent before waiting)
+            while sequence_number - next_sequence_number >= reorder_buffer_size:
+                chunk_list = imputelib.send_variant_chunk(chunk_list, input_queue, pool, result_queue)
+                (next_sequence_number, imputed_variant_counter) = imputelib.write_variant_results(result_queue, reorder_buffer_dict, next_sequence_number, imputed_variant_counter, output_vcf_file_id, imputation_data_file_id, wait=True, counter_dict=som_counter_dict)
+                genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
 
-                # if the variant is imputed
-                if result_list[thread_id]['is_variant_imputed']:
+            # when the variant record has not been parsed (it has not missing data), put it in the reorder buffer
+            # to be copied as it is to the output VCF file without sending it to the worker threads or processes
+            if not data_dict['is_parsed']:
+                reorder_buffer_dict[sequence_number] = {'output_vcf_record': record if record.endswith('\n') else f'{record}\n', 'imputation_data_record': '', 'is_variant_imputed': False}
+                sequence_number += 1
+
+            # add the variant to the chunk and send the chunk to the worker threads or processes when it is full
+            # (the input queue of the worker threads is bounded, so it waits while the queue is full)
+            else:
+                chunk_list.append((sequence_number, data_dict))
+                sequence_number += 1
+                if len(chunk_list) >= chunk_size:
+                    chunk_list = imputelib.send_variant_chunk(chunk_list, input_queue, pool, result_queue)
+
+            # write the results already processed in order
+            (next_sequence_number, imputed_variant_counter) = imputelib.write_variant_results(result_queue, reorder_buffer_dict, next_sequence_number, imputed_variant_counter, output_vcf_file_id, imputation_data_file_id, wait=False, counter_dict=som_counter_dict)
+            genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
 
-                    # write the record in the output file with imputation data
-                    imputation_data_file_id.write(result_list[thread_id]['imputation_data_record'])
+            # read the next record of the input VCF file
+            (record, _, data_dict) = genlib.read_vcf_file(input_vcf_file_id, sample_number=0, check_sample_number=False, parse_filter=parse_filter)
 
-                    # add 1 to imputed variant counter if the variant is imputed
-                    imputed_variant_counter += 1
+    # send the last chunk and write the pending results in order
+    chunk_list = imputelib.send_variant_chunk(chunk_list, input_queue, pool, result_queue)
+    while next_sequence_number < sequence_number:
+        (next_sequence_number, imputed_variant_counter) = imputelib.write_variant_results(result_queue, reorder_buffer_dict, next_sequence_number, imputed_variant_counter, output_vcf_file_id, imputation_data_file_id, wait=True, counter_dict=som_counter_dict)
+        genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
 
-                # print the counters
-                genlib.Message.print('verbose', f'\rProcessed records ... {input_record_counter:8d} - Total variants ... {total_variant_counter:8d} - Imputed variants ... {imputed_variant_counter:8d}')
+    # stop the worker threads or processes
+    imputelib.stop_imputation_workers(worker_thread_list, pool, input_queue)
 
     genlib.Message.print('verbose', '\n')
 
     genlib.Message.print('info', f'Processed records: {input_record_counter:8d}')
     genlib.Message.print('info', f'Total variants   : {total_variant_counter:8d}')
     genlib.Message.print('info', f'Imputed variants : {imputed_variant_counter:8d}')
+    genlib.Message.print('info', f'SOM cache hits   : {som_counter_dict["som_cache_hits"]:8d}')
+    genlib.Message.print('info', f'Trained SOMs     : {som_counter_dict["trained_soms"]:8d}')
+    genlib.Message.print('info', f'SOM iterations   : {som_counter_dict["som_iterations"]:8d} (mean: {som_counter_dict["som_iterations"] / max(som_counter_dict["trained_soms"], 1):.1f} of {num_iteration})')
+    genlib.Message.print('info', f'Early stops      : {som_counter_dict["early_stopped_soms"]:8d}')
 
     # close files
     input_vcf_file_id.close()
@@ -450,39 +529,50 @@ def impute_md_som(conn, threads_num, input_vcf_file, output_vcf_file, imputation
 
 #-------------------------------------------------------------------------------
 
-def process_variant(thread_id, conn, semaphore, minimum_r2, r_estimator, snps_num, xdim, ydim, sigma, learning_rate, num_iteration, genotype_imputation_method, tvi_list, kinship_dict, snp_id_1_list, sample_label_list, label_dict, sample_number, data_dict, result_list):
+def impute_variant_chunk(worker_id, chunk_list, som_engine, *process_variant_arg_list):
     '''
-    Process a variant and impute its genotypes with missing data using a Self-Organizing Map if necessary.
+    Impute a chunk of variants in a worker thread or process and return the list of their results
+    (an exception is returned as result to be raised in the main thread). When the SOM engine is batch,
+    the SOMs of the variants of the chunk are trained together.
     '''
 
-    # initialize the impute variant indicator
+    # train the SOMs of the chunk together when the SOM engine is batch
+    try:
+        trained_som_dict = train_chunk_soms(som_engine, chunk_list, *process_variant_arg_list)
+    except BaseException as e:
+        return [(sequence_number, e) for (sequence_number, _) in chunk_list]
+
+    # initialize the result list
+    result_list = []
+
+    # process the variants
+    for (sequence_number, data_dict) in chunk_list:
+        try:
+            result_dict = process_variant(worker_id, *process_variant_arg_list, data_dict, trained_som_dict.get(sequence_number))
+        except BaseException as e:
+            result_dict = e
+        result_list.append((sequence_number, result_dict))
+
+    # return the result list
+    return result_list
+
+#-------------------------------------------------------------------------------
+
+def process_variant(thread_id, genotype_data_dict, r_estimator, xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance, genotype_imputation_method, tvi_list, kinship_matrix, snp_id_1_set, sample_label_list, label_dict, sample_number, data_dict, trained_som=None):
+    '''
+    Process a variant and impute its genotypes with missing data using a Self-Organizing Map if necessary
+    and return the result dictionary (when the SOM engine is batch, trained_som has the SOM input data of the variant
+    and the weights and the training iterations of the SOM when it has been trained by the batch engine;
+    otherwise, a MiniSom instance is trained unless the SOM is in the SOM cache).
+    '''
+
+    # initialize the impute variant indicator and the counters of the variant
     is_variant_imputed = False
+    counter_dict = {}
 
     # initialize the dictionaries
-    alleles2symbol_dict = {
-        'AA': 'A',
-        'CC': 'C',
-        'GG': 'G',
-        'TT': 'T',
-        'AC': 'M',
-        'AG': 'R',
-        'AT': 'W',
-        'CG': 'S',
-        'CT': 'Y',
-        'GT': 'K',
-        'NN': 'N'}
-    symbol2alleles_dict = {
-        'A': 'AA',
-        'C': 'CC',
-        'G': 'GG',
-        'T': 'TT',
-        'M': 'AC',
-        'R': 'AG',
-        'W': 'AT',
-        'S': 'CG',
-        'Y': 'CT',
-        'K': 'GT',
-        'N': 'NN'}
+    alleles2symbol_dict = imputelib.get_alleles2symbol_dict()
+    symbol2alleles_dict = imputelib.get_symbol2alleles_dict()
 
     # set the symbol list
     symbol_list = sorted(symbol2alleles_dict.keys())
@@ -534,94 +624,42 @@ def process_variant(thread_id, conn, semaphore, minimum_r2, r_estimator, snps_nu
         sample_gt_right_list.append(sample_gt_list[i][sep_pos+1:])
 
     # if there is missing data, impute it
-    if variant_id in snp_id_1_list:
+    if variant_id in snp_id_1_set:
 
         if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - There is missing data')
 
-        # get the linkage disequilibrium list
-        semaphore.acquire()
-        ld_list = sqllib.get_vcf_linkage_disequilibrium_list(conn, variant_id)
-        semaphore.release()
-
         # build the genotype text before imputation
         genotype_text_before_imputation = ''
         for i in range(sample_number):
             genotype_text_before_imputation += f'{str(sample_gt_left_list[i])}{sample_sep_list[i]}{str(sample_gt_right_list[i])} '
 
         # get data of the variant from table "vcf_snps"
-        semaphore.acquire()
-        snp_data_dict_1 = sqllib.get_snp_data_dict(conn, variant_id)
-        semaphore.release()
-        pseudobinary_sample_gt_list_1 = genlib.split_literal_to_integer_list(snp_data_dict_1['sample_gt_list'])
-        sample_withmd_list = genlib.split_literal_to_integer_list(snp_data_dict_1['sample_withmd_list'])
-        if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - sample_withmd_list: {sample_withmd_list}')
+        snp_data_dict_1 = imputelib.get_variant_snp_data_dict(genotype_data_dict, variant_id)
+        pseudobinary_sample_gt_list_1 = snp_data_dict_1['sample_gt_array'].tolist()
 
-        # get the list with SNPs with the highest r^2 values calculated with respect to the current variant identification
-        selected_snp_id_2_list = get_selected_snp_id_2_list(ld_list, minimum_r2, snps_num, inds_wmd=False)
+        # get the SOM input data of the variant (it is already got when the SOM engine is batch)
+        if trained_som is None:
+            som_input_dict = get_variant_som_input_dict(genotype_data_dict, variant_id, symbol_list, alleles2symbol_dict)
+        else:
+            som_input_dict = trained_som['som_input_dict']
+        sample_withmd_list = som_input_dict['sample_withmd_list']
+        if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - sample_withmd_list: {sample_withmd_list}')
+        selected_snp_id_2_list = som_input_dict['selected_snp_id_2_list']
         if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - selected_snp_id_2_list: {selected_snp_id_2_list}')
+        selected_snp_id_list = som_input_dict['selected_snp_id_list']
+        symbol_index_matrix = som_input_dict['symbol_index_matrix']
 
-        # get the complete list of SNPs considered (the current variant id is the first)
-        selected_snp_id_list = [variant_id] + selected_snp_id_2_list
-
-        # initialize the list of symbolic genotype of samples
+        # build the list of symbolic genotype of samples when the variant is traced
         symbolic_genotype_list = []
-        for i in range(sample_number):
-            symbolic_genotype_list.append('')
-
-        # build secuences of samples
-        for selected_snp_id in selected_snp_id_list:
-
-            # get data of the selected SNP from table "vcf_snps"
-            semaphore.acquire()
-            snp_data_dict_2 = sqllib.get_snp_data_dict(conn, selected_snp_id)
-            semaphore.release()
-            ref_2 = snp_data_dict_2['ref']
-            alt_2 = snp_data_dict_2['alt']
-            pseudobinary_sample_gt_list_2 = genlib.split_literal_to_integer_list(snp_data_dict_2['sample_gt_list'])
-
-            for i in range(sample_number):
-                allele_list = []
-                # 0b00 -> 0
-                if pseudobinary_sample_gt_list_2[i] == 0:
-                    allele_list = [ref_2, ref_2]
-                # 0b01 -> 1
-                elif pseudobinary_sample_gt_list_2[i] == 1:
-                    allele_list = [ref_2, alt_2]
-                # 0b11 -> 3
-                elif pseudobinary_sample_gt_list_2[i] == 3:
-                    allele_list = [alt_2, alt_2]
-                # 0b111 -> 7
-                elif pseudobinary_sample_gt_list_2[i] == 7:
-                    allele_list = ['N','N']
-                allele_list.sort()
-                allele_list_text = ''.join(allele_list)
-                if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - i: {i} - ref_2: {ref_2} - alt_2: {alt_2}')
-                if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - allele_list: {allele_list}')
-                if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - allele_list_text: {allele_list_text}')
-                symbolic_genotype_list[i] = f'{symbolic_genotype_list[i]}{alleles2symbol_dict[allele_list_text]}'
-
         if variant_id in tvi_list:
+            symbol_array = np.array(symbol_list)
             for i in range(sample_number):
+                symbolic_genotype_list.append(''.join(symbol_array[symbol_index_matrix[i]]))
                 if i in sample_withmd_list:
                     mark = '<---'
                 else:
                     mark = ''
-                if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - symbolic_genotype_list[{i:03d}]: {symbolic_genotype_list[i]} {mark}')
-
-        # build the list with numeric haplotypes of each sample
-        numeric_haplotype_3dlist = []
-        for i in range(sample_number):
-            numeric_haplotype_2dlist = []
-            # the first nucleotide is not present to SOM !!!
-            for j in range(1, len(symbolic_genotype_list[i])):
-                numeric_haplotype_1dlist = []
-                for symbol in symbol_list:
-                    if symbol == symbolic_genotype_list[i][j]:
-                        numeric_haplotype_1dlist.append(1)
-                    else:
-                        numeric_haplotype_1dlist.append(0)
-                numeric_haplotype_2dlist.append(numeric_haplotype_1dlist)
-            numeric_haplotype_3dlist.append(numeric_haplotype_2dlist)
+                genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - symbolic_genotype_list[{i:03d}]: {symbolic_genotype_list[i]} {mark}')
 
         # calculate the most frequent genotype in the current variant
         counter_0_0 = 0
@@ -651,63 +689,88 @@ def process_variant(thread_id, conn, semaphore, minimum_r2, r_estimator, snps_nu
                 sample_gt_right_mf = 1
         if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - Most frequent genotype: sample_gt_left_mf: {sample_gt_left_mf} - sample_gt_right_mf: {sample_gt_right_mf}')
 
-        # when the length of symbolic genotypes is equal to 1
-        if len(symbolic_genotype_list[0]) == 1:
+        # when there are not selected SNPs
+        if len(selected_snp_id_list) == 1:
 
             # set the most frequent genotype as genotype of individuals with missing data
             for sample_withmd in sample_withmd_list:
                 sample_gt_left_list[sample_withmd] = sample_gt_left_mf
                 sample_gt_right_list[sample_withmd] = sample_gt_right_mf
 
-        # when the length of symbolic genotypes is grater than 1
-        elif len(symbolic_genotype_list[0]) > 1:
-
-            # build the input data to the SOM algorith
-            input_data_list = []
-            for i in range(sample_number):
-                numeric_haplotype_list = []
-                for j in range(len(numeric_haplotype_3dlist[i])):
-                    numeric_haplotype_list += numeric_haplotype_3dlist[i][j]
-                input_data_list.append(numeric_haplotype_list)
+        # when there are selected SNPs
+        else:
 
-            # build the training data corresponding to samples without missing data from the input data
-            training_data_list = input_data_list.copy()
+            # get the input data to the SOM algorith (numeric haplotypes of each sample)
+            # and the training data corresponding to samples without missing data
+            input_data_matrix = som_input_dict['input_data_matrix']
+            training_data_matrix = som_input_dict['training_data_matrix']
             training_label_list = sample_label_list.copy()
             for sample_withmd in sorted(sample_withmd_list, reverse=True):
-                training_data_list.pop(sample_withmd)
                 training_label_list.pop(sample_withmd)
 
-            # build the test data corresponding to samples with missing data from the input data
-            test_data_list = []
-            test_label_list = []
-            for sample_withmd in sample_withmd_list:
-                test_data_list.append(input_data_list[sample_withmd])
-                test_label_list.append(sample_label_list[sample_withmd])
-
-            # create a new SOM x * y instance and train the SOM algorith
-            som_shape_tup = (xdim, ydim)
-            som = minisom.MiniSom(x=som_shape_tup[0], y=som_shape_tup[1], input_len=len(input_data_list[0]),
-                                sigma=sigma, learning_rate=learning_rate, decay_function=minisom.asymptotic_decay,
-                                neighborhood_function='gaussian', topology='rectangular', activation_distance='euclidean', random_seed=None)
-            # -- som = minisom.MiniSom(x=som_shape_tup[0], y=som_shape_tup[1], input_len=len(input_data_list[0]),
-            # --                     sigma=sigma, learning_rate=learning_rate, decay_function='asymptotic_decay',
-            # --                     neighborhood_function='gaussian', topology='rectangular', activation_distance='euclidean', random_seed=None)
-
-            # initialize the weights to span the first two principal components
-            som.pca_weights_init(data=training_data_list)
-
-            # train the SOM
-            som.train(data=training_data_list, num_iteration=num_iteration, random_order=False, verbose=False)
-
-            # get a dictionary with the number of samples from a given label in each position
-            labels_map_dict = som.labels_map(data=training_data_list, labels=training_label_list)
-            # -- if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - labels_map_dict:\n{labels_map_dict}')
-
-            # get a dictionary with samples in each coordinates
-            samples_in_coordinates_dict = {}
-            for coordinates_tup in sorted(labels_map_dict.keys()):
-                label_list = list(labels_map_dict[coordinates_tup].keys())
-                samples_in_coordinates_dict[coordinates_tup] = label_list
+            # get the weights and the dictionary with samples in each coordinates of a SOM trained
+            # with the same training data and hyperparameters from the SOM cache
+            som_cache_key = get_som_cache_key(training_data_matrix, sample_withmd_list, xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance)
+            som_cache_value = som_cache.get(som_cache_key)
+            if som_cache_value is not None:
+                (som_weights, samples_in_coordinates_dict, iteration_num) = som_cache_value
+                counter_dict = {'som_cache_hits': 1}
+                if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - The SOM is got from the SOM cache')
+
+            # when the SOM has not been trained by the batch engine
+            elif trained_som is None or 'som_weights' not in trained_som:
+
+                # create a new SOM x * y instance and train the SOM algorith
+                som_shape_tup = (xdim, ydim)
+                som = minisom.MiniSom(x=som_shape_tup[0], y=som_shape_tup[1], input_len=input_data_matrix.shape[1],
+                                    sigma=sigma, learning_rate=learning_rate, decay_function=minisom.asymptotic_decay,
+                                    neighborhood_function='gaussian', topology='rectangular', activation_distance='euclidean', random_seed=None)
+                # -- som = minisom.MiniSom(x=som_shape_tup[0], y=som_shape_tup[1], input_len=len(input_data_list[0]),
+                # --                     sigma=sigma, learning_rate=learning_rate, decay_function='asymptotic_decay',
+                # --                     neighborhood_function='gaussian', topology='rectangular', activation_distance='euclidean', random_seed=None)
+
+                # initialize the weights to span the first two principal components
+                som.pca_weights_init(data=training_data_matrix)
+
+                # train the SOM (with early stopping when there is a tolerance of the quantization error)
+                if qe_tolerance is None:
+                    som.train(data=training_data_matrix, num_iteration=num_iteration, random_order=False, verbose=False)
+                    iteration_num = num_iteration
+                else:
+                    iteration_num = train_minisom_until_convergence(som, training_data_matrix, num_iteration, qe_tolerance)
+                counter_dict = {'trained_soms': 1, 'som_iterations': iteration_num, 'early_stopped_soms': int(iteration_num < num_iteration)}
+
+                # get a dictionary with the number of samples from a given label in each position
+                labels_map_dict = som.labels_map(data=training_data_matrix, labels=training_label_list)
+                # -- if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - labels_map_dict:\n{labels_map_dict}')
+
+                # get a dictionary with samples in each coordinates
+                samples_in_coordinates_dict = {}
+                for coordinates_tup in sorted(labels_map_dict.keys()):
+                    label_list = list(labels_map_dict[coordinates_tup].keys())
+                    samples_in_coordinates_dict[coordinates_tup] = label_list
+
+                # get the weights of the SOM and save them in the SOM cache
+                som_weights = som.get_weights()
+                som_cache.put(som_cache_key, (som_weights, samples_in_coordinates_dict, iteration_num))
+
+            # when the SOM has been trained by the batch engine
+            else:
+
+                # get the weights and the training iterations of the SOM
+                som_weights = trained_som['som_weights']
+                iteration_num = trained_som['iteration_num']
+                counter_dict = {'trained_soms': 1, 'som_iterations': iteration_num, 'early_stopped_soms': int(iteration_num < num_iteration)}
+
+                # get a dictionary with samples in each coordinates from the winning neurons of the training data
+                samples_in_coordinates_dict = {}
+                for coordinates_tup, label_id in zip(get_som_winner_list(som_weights, training_data_matrix), training_label_list):
+                    samples_in_coordinates_dict.setdefault(coordinates_tup, []).append(label_id)
+
+                # save the SOM in the SOM cache
+                som_cache.put(som_cache_key, (som_weights, samples_in_coordinates_dict, iteration_num))
+
+            if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - SOM training iterations: {iteration_num} of {num_iteration}')
 
             # get the dictionary with related labels in the same coordinates
             related_label_dict = {}
@@ -718,20 +781,19 @@ def process_variant(thread_id, conn, semaphore, minimum_r2, r_estimator, snps_nu
                 for label_id in label_list:
                     if label_dict[label_id] in sample_withmd_list:
                         related_label_dict[label_dict[label_id]] = label_list
-                    seq = symbolic_genotype_list[label_dict[label_id]]
-                    if int(label_id) in sample_withmd_list:
-                        mark = '<---'
-                    else:
-                        mark = ''
-                    if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - label_id: {label_id} - seq: {seq} {mark}')
+                    if variant_id in tvi_list:
+                        seq = symbolic_genotype_list[label_dict[label_id]]
+                        if int(label_id) in sample_withmd_list:
+                            mark = '<---'
+                        else:
+                            mark = ''
+                        genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - label_id: {label_id} - seq: {seq} {mark}')
 
             # get the coordinates of the winning neuron for the sample with missing data
-            winning_neuron_coordinates_list = []
-            for sample_withmd in sample_withmd_list:
-                winning_neuron_coordinates_tup = som.winner(input_data_list[sample_withmd])
-                winning_neuron_coordinates_list.append(winning_neuron_coordinates_tup)
-                seq = symbolic_genotype_list[sample_withmd]
-                if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - label_id: {sample_label_list[sample_withmd]} - seq: {seq} - winning_neuron_coordinates_tup:{winning_neuron_coordinates_tup}')
+            winning_neuron_coordinates_list = get_som_winner_list(som_weights, input_data_matrix[sample_withmd_list])
+            for i, sample_withmd in enumerate(sample_withmd_list):
+                winning_neuron_coordinates_tup = winning_neuron_coordinates_list[i]
+                if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - label_id: {sample_label_list[sample_withmd]} - seq: {symbolic_genotype_list[sample_withmd]} - winning_neuron_coordinates_tup:{winning_neuron_coordinates_tup}')
 
             # update the genotypes with missing data in the data of sequence records
             for i in range(len(sample_withmd_list)):    # pylint: disable=consider-using-enumerate
@@ -772,7 +834,7 @@ def process_variant(thread_id, conn, semaphore, minimum_r2, r_estimator, snps_nu
                     # method CK: the genotype of the closest kinship individual
                     elif genotype_imputation_method == 'CK':
                         related_sample_id_list = [int(x) for x in related_label_list]
-                        most_related_sample_id = get_most_related_sample_id(kinship_dict, r_estimator, sample_withmd_list[i], related_sample_id_list)
+                        most_related_sample_id = get_most_related_sample_id(kinship_matrix, sample_withmd_list[i], related_sample_id_list)
                         sample_gt_left_list[sample_withmd_list[i]] = sample_gt_left_list[most_related_sample_id]
                         sample_gt_right_list[sample_withmd_list[i]] = sample_gt_right_list[most_related_sample_id]
                         if variant_id in tvi_list: genlib.Message.print('trace', f'thread_id: {thread_id} - variant_id: {variant_id} - sample_withmd_list[{i}]: {sample_withmd_list[i]} - most_related_sample_id: {most_related_sample_id}')
@@ -822,8 +884,322 @@ def process_variant(thread_id, conn, semaphore, minimum_r2, r_estimator, snps_nu
     else:
         imputation_data_record = ''
 
-    # update the result list
-    result_list[thread_id] = {'output_vcf_record': output_vcf_record, 'imputation_data_record': imputation_data_record, 'is_variant_imputed': is_variant_imputed}
+    # return the result dictionary
+    return {'output_vcf_record': output_vcf_record, 'imputation_data_record': imputation_data_record, 'is_variant_imputed': is_variant_imputed, 'counter_dict': counter_dict}
+
+#-------------------------------------------------------------------------------
+
+def get_variant_som_input_dict(genotype_data_dict, variant_id, symbol_list, alleles2symbol_dict):
+    '''
+    Get the SOM input data of a variant with missing data: the samples with missing data, the selected SNPs
+    (the variant is the first), the symbol positions of their genotypes and the numeric haplotypes of every sample
+    (input data) and of the samples without missing data (training data).
+    '''
+
+    # get the samples with missing data of the variant from table "vcf_snps"
+    snp_data_dict = imputelib.get_variant_snp_data_dict(genotype_data_dict, variant_id)
+    sample_withmd_list = np.flatnonzero(snp_data_dict['sample_gt_array'] == 7).tolist()
+
+    # get the list with SNPs with the highest r^2 values calculated with respect to the current variant identification
+    selected_snp_id_2_list = imputelib.get_variant_selected_snp_id_2_list(genotype_data_dict, variant_id)
+
+    # get the complete list of SNPs considered (the current variant id is the first)
+    selected_snp_id_list = [variant_id] + selected_snp_id_2_list
+
+    # get the pseudobinary genotypes of samples (rows) in the selected SNPs (columns) and their reference and alternative alleles
+    snp_matrix_dict = genotype_data_dict['snp_matrix_dict']
+    selected_snp_index_list = [genotype_data_dict['snp_index_dict'][selected_snp_id] for selected_snp_id in selected_snp_id_list]
+    selected_sample_gt_matrix = np.asarray(snp_matrix_dict['sample_gt_matrix'][selected_snp_index_list]).T
+    selected_ref_list = [snp_matrix_dict['ref_list'][i] for i in selected_snp_index_list]
+    selected_alt_list = [snp_matrix_dict['alt_list'][i] for i in selected_snp_index_list]
+
+    # encode the genotypes into the symbol positions and the numeric haplotypes of each sample
+    symbol_index_matrix, numeric_haplotype_matrix = encode_genotype_matrix(selected_sample_gt_matrix, selected_ref_list, selected_alt_list, symbol_list, alleles2symbol_dict)
+
+    # build the training data corresponding to samples without missing data from the input data
+    training_data_matrix = np.delete(numeric_haplotype_matrix, sample_withmd_list, axis=0)
+
+    # return the SOM input data dictionary
+    return {'sample_withmd_list': sample_withmd_list, 'selected_snp_id_2_list': selected_snp_id_2_list, 'selected_snp_id_list': selected_snp_id_list, 'symbol_index_matrix': symbol_index_matrix, 'input_data_matrix': numeric_haplotype_matrix, 'training_data_matrix': training_data_matrix}
+
+#-------------------------------------------------------------------------------
+
+def train_chunk_soms(som_engine, chunk_list, genotype_data_dict, r_estimator, xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance, genotype_imputation_method, tvi_list, kinship_matrix, snp_id_1_set, sample_label_list, label_dict, sample_number):    # pylint: disable=unused-argument
+    '''
+    Train together the SOMs of the variants of a chunk which need a SOM when the SOM engine is batch (the arguments
+    after the chunk are the ones of process_variant) and return the dictionary of the trained SOMs by sequence number
+    (it is empty when the SOM engine is not batch). Every variant with missing data has the SOM input data,
+    so process_variant does not get it again, and the variants whose SOM is trained also have its weights and training iterations.
+    '''
+
+    # initialize the trained SOM dictionary
+    trained_som_dict = {}
+
+    # when the SOM engine is batch
+    if som_engine == 'batch':
+
+        # get the dictionary of symbols and the symbol list
+        alleles2symbol_dict = imputelib.get_alleles2symbol_dict()
+        symbol_list = sorted(imputelib.get_symbol2alleles_dict().keys())
+
+        # get the SOM input data of the variants with missing data, the training data of the ones with selected SNPs
+        # whose SOMs are not in the SOM cache and the sequence numbers of the variants of every SOM (the variants with the same SOM share it)
+        sequence_number_list_dict = {}
+        training_data_matrix_list = []
+        for (sequence_number, data_dict) in chunk_list:
+            variant_id = f'{data_dict["chrom"]}-{data_dict["pos"]}'
+            if variant_id in snp_id_1_set:
+                som_input_dict = get_variant_som_input_dict(genotype_data_dict, variant_id, symbol_list, alleles2symbol_dict)
+                trained_som_dict[sequence_number] = {'som_input_dict': som_input_dict}
+                if len(som_input_dict['selected_snp_id_list']) > 1:
+                    som_cache_key = get_som_cache_key(som_input_dict['training_data_matrix'], som_input_dict['sample_withmd_list'], xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance)
+                    if som_cache_key in sequence_number_list_dict:
+                        sequence_number_list_dict[som_cache_key].append(sequence_number)
+                    elif som_cache_key not in som_cache:
+                        sequence_number_list_dict[som_cache_key] = [sequence_number]
+                        training_data_matrix_list.append(som_input_dict['training_data_matrix'])
+
+        # train the SOMs
+        (som_weights_list, iteration_num_list) = train_som_batch(training_data_matrix_list, xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance)
+        for sequence_number_list, som_weights, iteration_num in zip(sequence_number_list_dict.values(), som_weights_list, iteration_num_list):
+            for sequence_number in sequence_number_list:
+                trained_som_dict[sequence_number]['som_weights'] = som_weights
+                trained_som_dict[sequence_number]['iteration_num'] = iteration_num
+
+    # return the trained SOM dictionary
+    return trained_som_dict
+
+#-------------------------------------------------------------------------------
+
+def get_som_cache_key(training_data_matrix, sample_withmd_list, xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance):
+    '''
+    Get the key of a SOM in the SOM cache: the hash of the training data, the samples with missing data
+    (they are excluded from the training data) and the SOM hyperparameters.
+    '''
+
+    key_hash = hashlib.blake2b(digest_size=16)
+    key_hash.update(np.ascontiguousarray(training_data_matrix).tobytes())
+    key_hash.update(repr((training_data_matrix.shape, str(training_data_matrix.dtype), sample_withmd_list, xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance)).encode())
+
+    return key_hash.hexdigest()
+
+#-------------------------------------------------------------------------------
+
+def train_som_batch(training_data_matrix_list, xdim, ydim, sigma, learning_rate, num_iteration, qe_tolerance=None):
+    '''
+    Train together the x * y SOMs of a list of training data matrices (a SOM per matrix) and return the lists
+    of their weights and their training iterations.
+    It reproduces MiniSom with a gaussian neighborhood function, rectangular topology, euclidean activation distance,
+    asymptotic decay, weights initialized to span the first two principal components and samples picked sequentially:
+    the SOMs of the matrices with the same number of features are stacked in a tensor (SOMs x x x y x features)
+    and every iteration updates all of them at once using the training sample of each SOM in the iteration.
+    When there is a tolerance of the quantization error, the SOMs whose improvement is lower than the tolerance
+    are stopped like in train_minisom_until_convergence and removed from the stack.
+    '''
+
+    # initialize the SOM weights list and the training iteration list
+    som_weights_list = [None] * len(training_data_matrix_list)
+    iteration_num_list = [num_iteration] * len(training_data_matrix_list)
+
+    # get the coordinates of the neurons
+    neuron_x_array = np.arange(xdim).astype(float)
+    neuron_y_array = np.arange(ydim).astype(float)
+
+    # group the training data matrices by number of features
+    group_dict = {}
+    for i, training_data_matrix in enumerate(training_data_matrix_list):
+        group_dict.setdefault(training_data_matrix.shape[1], []).append(i)
+
+    # train the SOMs of every group
+    for features_num, index_list in group_dict.items():
+
+        # stack the training data matrices (the samples of each one are padded up to the largest one)
+        soms_num = len(index_list)
+        samples_num_array = np.array([training_data_matrix_list[i].shape[0] for i in index_list])
+        training_data_tensor = np.zeros((soms_num, samples_num_array.max(), features_num), dtype=training_data_matrix_list[index_list[0]].dtype)
+        for j, i in enumerate(index_list):
+            training_data_tensor[j, :samples_num_array[j]] = training_data_matrix_list[i]
+
+        # initialize the weights to span the first two principal components of each training data matrix
+        weights_tensor = np.zeros((soms_num, xdim, ydim, features_num))
+        for j, i in enumerate(index_list):
+            pc_length, pc = np.linalg.eig(np.cov(np.transpose(training_data_matrix_list[i])))
+            pc_order = np.argsort(-pc_length)
+            for x, c1 in enumerate(np.linspace(-1, 1, xdim)):
+                for y, c2 in enumerate(np.linspace(-1, 1, ydim)):
+                    weights_tensor[j, x, y] = c1*pc[:, pc_order[0]] + c2*pc[:, pc_order[1]]
+
+        # get the quantization errors of the initial weights when there is a tolerance
+        active_index_array = np.array(index_list)
+        if qe_tolerance is not None:
+            previous_qe_array = np.array([get_som_quantization_error(weights_tensor[j], training_data_matrix_list[i]) for j, i in enumerate(index_list)])
+
+        # train the SOMs
+        som_index_array = np.arange(soms_num)
+        for t in range(num_iteration):
+
+            # get the training sample of each SOM in this iteration
+            sample_matrix = training_data_tensor[som_index_array, t % samples_num_array]
+
+            # get the winning neurons
+            (winner_x_array, winner_y_array) = get_som_winner_arrays(weights_tensor, sample_matrix)
+
+            # calculate the learning rate and sigma with the asymptotic decay
+            eta = learning_rate / (1+t/(num_iteration/2))
+            sig = sigma / (1+t/(num_iteration/2))
+
+            # calculate the gaussian neighborhood centered in the winning neurons
+            d = 2*sig*sig
+            ax = np.exp(-np.power(neuron_x_array[np.newaxis, :] - winner_x_array[:, np.newaxis], 2)/d)
+            ay = np.exp(-np.power(neuron_y_array[np.newaxis, :] - winner_y_array[:, np.newaxis], 2)/d)
+            g = ax[:, :, np.newaxis] * ay[:, np.newaxis, :] * eta
+
+            # update the weights
+            weights_tensor += g[:, :, :, np.newaxis] * (sample_matrix[:, np.newaxis, np.newaxis, :] - weights_tensor)
+
+            # when there is a tolerance and it is a checking iteration, stop the SOMs whose quantization error improvement
+            # is lower than the tolerance saving their weights and removing them from the stack
+            if qe_tolerance is not None and (t + 1) % genlib.Const.SOM_CONVERGENCE_CHECK_INTERVAL == 0 and t + 1 < num_iteration:
+                qe_array = np.array([get_som_quantization_error(weights_tensor[j], training_data_matrix_list[i]) for j, i in enumerate(active_index_array)])
+                stopped_array = previous_qe_array - qe_array < qe_tolerance
+                for j in np.flatnonzero(stopped_array):
+                    som_weights_list[active_index_array[j]] = weights_tensor[j].copy()
+                    iteration_num_list[active_index_array[j]] = t + 1
+                if stopped_array.any():
+                    kept_array = ~stopped_array
+                    active_index_array = active_index_array[kept_array]
+                    weights_tensor = weights_tensor[kept_array]
+                    training_data_tensor = training_data_tensor[kept_array]
+                    samples_num_array = samples_num_array[kept_array]
+                    som_index_array = np.arange(len(active_index_array))
+                    if len(active_index_array) == 0:
+                        break
+                previous_qe_array = qe_array[~stopped_array]
+
+        # save the weights of the SOMs trained up to the maximum number of iterations
+        for j, i in enumerate(active_index_array):
+            som_weights_list[i] = weights_tensor[j]
+
+    # return the SOM weights list and the training iteration list
+    return som_weights_list, iteration_num_list
+
+#-------------------------------------------------------------------------------
+
+def train_minisom_until_convergence(som, training_data_matrix, num_iteration, qe_tolerance):
+    '''
+    Train a MiniSom instance like its train method (samples picked sequentially) checking the quantization error
+    of the training data every SOM_CONVERGENCE_CHECK_INTERVAL iterations: the training stops when its improvement
+    is lower than the tolerance (the decay of learning rate and sigma keeps num_iteration as maximum).
+    Return the number of training iterations.
+    '''
+
+    # get the quantization error of the initial weights
+    previous_qe = get_som_quantization_error(som.get_weights(), training_data_matrix)
+
+    # train the SOM
+    for t in range(num_iteration):
+
+        # update the weights with the training sample of this iteration
+        sample = training_data_matrix[t % len(training_data_matrix)]
+        som.update(sample, som.winner(sample), t, num_iteration)
+
+        # when it is a checking iteration, stop if the quantization error improvement is lower than the tolerance
+        if (t + 1) % genlib.Const.SOM_CONVERGENCE_CHECK_INTERVAL == 0 and t + 1 < num_iteration:
+            qe = get_som_quantization_error(som.get_weights(), training_data_matrix)
+            if previous_qe - qe < qe_tolerance:
+                return t + 1
+            previous_qe = qe
+
+    # return the number of training iterations
+    return num_iteration
+
+#-------------------------------------------------------------------------------
+
+def get_som_quantization_error(som_weights, data_matrix):
+    '''
+    Get the quantization error of a SOM (average distance of the samples to their winning neuron)
+    calculated like MiniSom.
+    '''
+
+    # calculate the distances of the samples to the neurons
+    weights_flat = som_weights.reshape(-1, som_weights.shape[2])
+    data_sq = np.power(data_matrix, 2).sum(axis=1, keepdims=True)
+    weights_flat_sq = np.power(weights_flat, 2).sum(axis=1, keepdims=True)
+    cross_term = np.dot(data_matrix, weights_flat.T)
+    distance_matrix = np.sqrt(-2 * cross_term + data_sq + weights_flat_sq.T)
+
+    # get the weights of the winning neurons
+    winner_weights_matrix = som_weights[np.unravel_index(np.argmin(distance_matrix, axis=1), som_weights.shape[:2])]
+
+    # return the average distance
+    return np.linalg.norm(data_matrix - winner_weights_matrix, axis=1).mean()
+
+#-------------------------------------------------------------------------------
+
+def get_som_winner_arrays(weights_tensor, sample_matrix):
+    '''
+    Get the arrays of x and y coordinates of the winning neurons of the samples (rows of the sample matrix)
+    in a stack of SOMs (a SOM per sample, or a SOM for all of them when the stack has only one).
+    '''
+
+    # calculate the euclidean distances of every sample to the neurons
+    distance_matrix = np.linalg.norm(np.subtract(sample_matrix[:, np.newaxis, np.newaxis, :], weights_tensor), axis=-1).reshape(sample_matrix.shape[0], -1)
+
+    # return the coordinates of the neurons with the minimum distance
+    return np.unravel_index(distance_matrix.argmin(axis=1), weights_tensor.shape[1:3])
+
+#-------------------------------------------------------------------------------
+
+def get_som_winner_list(som_weights, sample_matrix):
+    '''
+    Get the list of coordinates of the winning neurons of the samples (rows of the sample matrix) in a SOM.
+    '''
+
+    (winner_x_array, winner_y_array) = get_som_winner_arrays(som_weights[np.newaxis], sample_matrix)
+
+    return list(zip(winner_x_array, winner_y_array))
+
+#-------------------------------------------------------------------------------
+
+def encode_genotype_matrix(sample_gt_matrix, ref_list, alt_list, symbol_list, alleles2symbol_dict):
+    '''
+    Encode the pseudobinary genotypes of samples (rows) in the selected SNPs (columns) using lookup tables
+    and return the matrix of symbol positions in the symbol list and the float32 one-hot matrix of numeric haplotypes
+    (a row per sample; the first SNP is not present).
+    '''
+
+    # set the nucleotide list (N is the nucleotide of missing data)
+    nucleotide_list = ['A', 'C', 'G', 'T', 'N']
+    nucleotide_index_dict = {nucleotide: i for i, nucleotide in enumerate(nucleotide_list)}
+
+    # build the lookup table of the symbol position of every pair of nucleotides
+    pair_symbol_index_table = np.zeros((len(nucleotide_list), len(nucleotide_list)), dtype=np.int64)
+    for i, nucleotide_1 in enumerate(nucleotide_list):
+        for j, nucleotide_2 in enumerate(nucleotide_list):
+            alleles = ''.join(sorted([nucleotide_1, nucleotide_2]))
+            if alleles in alleles2symbol_dict:
+                pair_symbol_index_table[i, j] = symbol_list.index(alleles2symbol_dict[alleles])
+
+    # get the nucleotide positions of the reference and alternative alleles of every SNP
+    ref_index_array = np.array([nucleotide_index_dict[ref] for ref in ref_list], dtype=np.int64)
+    alt_index_array = np.array([nucleotide_index_dict[alt] for alt in alt_list], dtype=np.int64)
+
+    # get the nucleotide positions of the left and right alleles of every genotype
+    # (0b00 -> 0: ref/ref; 0b01 -> 1: ref/alt; 0b11 -> 3: alt/alt; 0b111 -> 7: N/N)
+    left_index_matrix = np.where(sample_gt_matrix == 3, alt_index_array, ref_index_array)
+    right_index_matrix = np.where(sample_gt_matrix == 0, ref_index_array, alt_index_array)
+    left_index_matrix[sample_gt_matrix == 7] = nucleotide_index_dict['N']
+    right_index_matrix[sample_gt_matrix == 7] = nucleotide_index_dict['N']
+
+    # get the symbol positions of the genotypes
+    symbol_index_matrix = pair_symbol_index_table[left_index_matrix, right_index_matrix]
+
+    # build the one-hot matrix of numeric haplotypes
+    one_hot_table = np.eye(len(symbol_list), dtype=np.float32)
+    numeric_haplotype_matrix = one_hot_table[symbol_index_matrix[:, 1:]].reshape(symbol_index_matrix.shape[0], -1)
+
+    # return the symbol positions and the numeric haplotypes
+    return symbol_index_matrix, numeric_haplotype_matrix
 
 #-------------------------------------------------------------------------------
 
@@ -907,67 +1283,22 @@ def get_snp_dict_dict(snps_file):
 
 #-------------------------------------------------------------------------------
 
-def get_selected_snp_id_2_list(ld_list, minimum_r2, snps_num, inds_wmd):
+def get_most_related_sample_id(kinship_matrix, sample_wmd_id, related_sample_id_list):
     '''
-    Get a list of snps_num identification of snp_id_2 with highest r^2 values
-    whose value is greater than or iqual to minimum_r2.
+    Get the most related sample identification of the sample_wmd_id using the kinship matrix of the estimator.
     '''
 
-    # sort the list by r^2 in descending order
-    ordered_ld_list = sorted(ld_list, key=lambda x:x[2], reverse=True)
+    # get the kinship values of the related samples (NaN values are not considered)
+    related_sample_id_array = np.array(related_sample_id_list, dtype=np.int64)
+    r_array = kinship_matrix[sample_wmd_id, related_sample_id_array]
+    r_array = np.where(np.isnan(r_array), -np.inf, r_array)
 
-    # build the list of snp_id_2 with the highest r^2
-    selected_snp_id_2_list = []
-    i = 0
-    counter = 0
-    while i < len(ordered_ld_list) and counter < snps_num:
-        if ordered_ld_list[i][2] >= minimum_r2:
-            if inds_wmd or ordered_ld_list[i][3] == '':
-                selected_snp_id_2_list.append(ordered_ld_list[i][0])
-                counter += 1
-            i += 1
-        else:
-            break
+    # when there are not kinship values, the most related sample identification is undetermined
+    if len(r_array) == 0 or np.all(r_array == -np.inf):
+        return -999
 
-    # return the list of snp_id_2 with the highest r^2
-    return selected_snp_id_2_list
-
-#-------------------------------------------------------------------------------
-
-def get_most_related_sample_id(kinship_dict, r_estimator, sample_wmd_id, related_sample_id_list):
-    '''
-    Get the most related sample identification of the sample_wmd_id using the kinship dictionary.
-    '''
-
-    # initialize the most related sample identification
-    most_related_sample_id = -999
-
-    # initialize the maximum kinship value
-    max_r = -999
-
-    # get the sample identication with the highest kinship value
-    for related_sample_id in related_sample_id_list:
-        r = -999
-        if sample_wmd_id < related_sample_id:
-            if r_estimator == 'rbeta':
-                r = kinship_dict[sample_wmd_id][related_sample_id]['rbeta']
-            elif r_estimator == 'rw':
-                r = kinship_dict[sample_wmd_id][related_sample_id]['rw']
-            elif r_estimator == 'ru':
-                r = kinship_dict[sample_wmd_id][related_sample_id]['ru']
-        else:
-            if r_estimator == 'rbeta':
-                r = kinship_dict[related_sample_id][sample_wmd_id]['rbeta']
-            elif r_estimator == 'rw':
-                r = kinship_dict[related_sample_id][sample_wmd_id]['rw']
-            elif r_estimator == 'ru':
-                r = kinship_dict[related_sample_id][sample_wmd_id]['ru']
-        if r > max_r:
-            max_r = r
-            most_related_sample_id = related_sample_id
-
-    # return the most related sample identification
-    return most_related_sample_id
+    # return the sample identication with the highest kinship value (the first one when there are several)
+    return int(related_sample_id_array[np.argmax(r_array)])
 
 #-------------------------------------------------------------------------------
 
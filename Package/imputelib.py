@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=broad-except
+# pylint: disable=invalid-name
+# pylint: disable=line-too-long
+# pylint: disable=multiple-statements
+# pylint: disable=too-many-lines
+
+#-------------------------------------------------------------------------------
+
+'''
+This source contains the functions shared by the imputation programs: the connection to the genotype database,
+the scheduler of the worker threads or processes, the preload of the genotype data and the imputation plan
+and the writer of the results.
+
+This software has been developed by:
+
+    GI en Desarrollo de Especies y Comunidades Leñosas (WooSp)
+    Dpto. Sistemas y Recursos Naturales
+    ETSI Montes, Forestal y del Medio Natural
+    Universidad Politecnica de Madrid
+    https://github.com/ggfhf/
+
+Licence: GNU General Public Licence Version 3.
+'''
+
+#-------------------------------------------------------------------------------
+
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+
+import numpy as np
+
+import genlib
+import sqllib
+
+#-------------------------------------------------------------------------------
+
+# data of a worker process of the executor process (set by initialize_imputation_worker)
+imputation_worker_dict = {}
+
+#-------------------------------------------------------------------------------
+
+def start_imputation_workers(executor, max_threads_num, input_queue, result_queue, process_chunk_function, process_chunk_arg_list):
+    '''
+    Start the worker threads (executor thread), which get the chunks of variants from the input queue,
+    or the pool of worker processes (executor process) and return the list of worker threads and the pool.
+    The chunks are processed by process_chunk_function(worker_id, chunk_list, *process_chunk_arg_list),
+    which returns the list of results of the variants [(sequence_number, result_dict or exception), ...].
+    '''
+
+    # initialize the list of worker threads and the pool of worker processes
+    worker_thread_list = []
+    pool = None
+
+    # start the worker threads
+    if executor == 'thread':
+        for thread_id in range(max_threads_num):
+            worker_thread_list.append(threading.Thread(target=process_variant_queue, args=[thread_id, input_queue, result_queue, process_chunk_function, process_chunk_arg_list], daemon=True))
+            worker_thread_list[thread_id].start()
+
+    # start the pool of worker processes
+    elif executor == 'process':
+        pool = multiprocessing.Pool(processes=max_threads_num, initializer=initialize_imputation_worker, initargs=(process_chunk_function, process_chunk_arg_list, genlib.Message.trace_status))
+
+    # return the list of worker threads and the pool
+    return worker_thread_list, pool
+
+#-------------------------------------------------------------------------------
+
+def stop_imputation_workers(worker_thread_list, pool, input_queue):
+    '''
+    Stop the worker threads sending them the end mark (None) and wait for them, or close the pool of worker processes.
+    '''
+
+    # stop the worker threads
+    for _ in worker_thread_list:
+        input_queue.put(None)
+    for worker_thread in worker_thread_list:
+        worker_thread.join()
+
+    # stop the worker processes
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+#-------------------------------------------------------------------------------
+
+def send_variant_chunk(chunk_list, input_queue, pool, result_queue):
+    '''
+    Send a chunk of variants to the worker threads (input queue) or to the worker processes (pool)
+    and return a new empty chunk.
+    '''
+
+    # send the chunk when it has variants
+    if chunk_list != []:
+
+        # send the chunk to the worker threads
+        if pool is None:
+            input_queue.put(chunk_list)
+
+        # send the chunk to the worker processes (their results are put in the result queue)
+        else:
+            def put_result_list(result_list):
+                for result in result_list:
+                    result_queue.put(result)
+            def put_exception(e):
+                result_queue.put((chunk_list[0][0], e))
+            pool.apply_async(process_variant_chunk, (chunk_list,), callback=put_result_list, error_callback=put_exception)
+
+    # return a new empty chunk
+    return []
+
+#-------------------------------------------------------------------------------
+
+def process_variant_queue(thread_id, input_queue, result_queue, process_chunk_function, process_chunk_arg_list):
+    '''
+    Process the chunks of variants of the input queue and put their results in the result queue
+    until the end mark (None) is received (it is run by every worker thread).
+    '''
+
+    while True:
+
+        # get the next chunk of variants
+        chunk_list = input_queue.get()
+        if chunk_list is None:
+            break
+
+        # process the variants (an exception is sent to the main thread as result)
+        for result in process_chunk_function(thread_id, chunk_list, *process_chunk_arg_list):
+            result_queue.put(result)
+
+#-------------------------------------------------------------------------------
+
+def initialize_imputation_worker(process_chunk_function, process_chunk_arg_list, trace_status):
+    '''
+    Initialize a worker process of the executor process keeping the function that processes the chunks
+    and its arguments (with the preloaded genotype data) in the global imputation worker dictionary.
+    '''
+
+    # set the trace status of the process
+    genlib.Message.set_trace_status(trace_status)
+
+    # save the data of the worker process
+    imputation_worker_dict['process_chunk_function'] = process_chunk_function
+    imputation_worker_dict['process_chunk_arg_list'] = process_chunk_arg_list
+
+#-------------------------------------------------------------------------------
+
+def process_variant_chunk(chunk_list):
+    '''
+    Process a chunk of variants in a worker process and return the list of their results
+    (an exception is returned as result to be raised in the main process).
+    '''
+
+    return imputation_worker_dict['process_chunk_function'](os.getpid(), chunk_list, *imputation_worker_dict['process_chunk_arg_list'])
+
+#-------------------------------------------------------------------------------
+
+def write_variant_results(result_queue, reorder_buffer_dict, next_sequence_number, imputed_variant_counter, output_vcf_file_id, imputation_data_file_id, wait, counter_dict=None):
+    '''
+    Move the results of the result queue to the reorder buffer (when wait is True, it waits for one result at least)
+    and write the results of the consecutive variants from next_sequence_number. When counter_dict is not None,
+    the counters of the results (their dictionary "counter_dict") are added to it.
+    Return the next sequence number to write and the imputed variant counter.
+    '''
+
+    # move the results of the result queue to the reorder buffer
+    while True:
+        try:
+            (sequence_number, result_dict) = result_queue.get(block=wait)
+        except queue.Empty:
+            break
+        if isinstance(result_dict, BaseException):
+            raise result_dict
+        reorder_buffer_dict[sequence_number] = result_dict
+        wait = False
+
+    # write the results of the consecutive variants
+    while next_sequence_number in reorder_buffer_dict:
+
+        # get the result of the variant
+        result_dict = reorder_buffer_dict.pop(next_sequence_number)
+        next_sequence_number += 1
+
+        # write the variant record
+        output_vcf_file_id.write(result_dict['output_vcf_record'])
+
+        # if the variant is imputed
+        if result_dict['is_variant_imputed']:
+
+            # write the record in the output file with imputation data
+            imputation_data_file_id.write(result_dict['imputation_data_record'])
+
+            # add 1 to imputed variant counter if the variant is imputed
+            imputed_variant_counter += 1
+
+        # add the counters of the variant
+        if counter_dict is not None:
+            for counter, value in result_dict.get('counter_dict', {}).items():
+                counter_dict[counter] = counter_dict.get(counter, 0) + value
+
+    # return the next sequence number to write and the imputed variant counter
+    return next_sequence_number, imputed_variant_counter
+
+#-------------------------------------------------------------------------------
+
+def connect_genotype_database(genotype_database):
+    '''
+    Connect to the genotype database with the read-only profile. A genotype database built by an old version
+    is migrated to the current tables before (it is connected with the bulk-build profile while it is migrated).
+    '''
+
+    # connect to the genotype database with the read-only profile
+    conn = sqllib.connect_database(genotype_database, check_same_thread=False, profile='read-only')
+
+    # migrate the genotype database when it is built by an old version and connect to it again
+    if sqllib.check_old_genotype_database(conn):
+        sqllib.close_database(conn)
+        genlib.Message.print('info', f'Migrating the genotype database {genotype_database} built by an old version ...')
+        conn = sqllib.connect_database(genotype_database, profile='bulk-build')
+        sqllib.migrate_old_genotype_database(conn)
+        sqllib.close_database(conn)
+        genlib.Message.print('info', 'The genotype database is migrated.')
+        conn = sqllib.connect_database(genotype_database, check_same_thread=False, profile='read-only')
+
+    # check the genotype database has the table "vcf_variants"
+    if not sqllib.check_vcf_variants(conn):
+        raise genlib.ProgramException('', 'B005', genotype_database)
+
+    # return the connection
+    return conn
+
+#-------------------------------------------------------------------------------
+
+def load_genotype_data_dict(conn, genotype_database, memmap, minimum_r2, snps_num):
+    '''
+    Load the genotype data used to impute the variants: the SNP data (the sample genotypes are a NumPy int8 matrix,
+    memory mapped from a sidecar file of the genotype database when memmap is Y), the position of every SNP
+    in the SNP data and the imputation plan of minimum_r2 and snps_num.
+    '''
+
+    # get the SNP data with the sample genotypes from the genotype database
+    if memmap == 'N':
+        snp_matrix_dict = sqllib.get_vcf_snps_matrix_dict(conn)
+
+    # get the SNP data without the sample genotypes, which are memory mapped from the sidecar file
+    else:
+        snp_matrix_dict = sqllib.get_vcf_snps_matrix_dict(conn, with_sample_gt_matrix=False)
+        sidecar_file = f'{genotype_database}{genlib.Const.GT_MATRIX_SIDECAR_SUFFIX}'
+        sample_gt_matrix = None
+
+        # map the sidecar file when it is not older than the genotype database and it has a row per SNP
+        if os.path.isfile(sidecar_file) and os.path.getmtime(sidecar_file) >= os.path.getmtime(genotype_database):
+            sample_gt_matrix = np.load(sidecar_file, mmap_mode='r')
+            if sample_gt_matrix.ndim != 2 or sample_gt_matrix.shape[0] != len(snp_matrix_dict['variant_id_list']):
+                sample_gt_matrix = None
+
+        # otherwise, write the sidecar file (a temporal file is renamed to not leave incomplete files) and map it
+        if sample_gt_matrix is None:
+            genlib.Message.print('verbose', f'Writing the sidecar file {sidecar_file} ...\n')
+            temporal_file = f'{sidecar_file}.tmp'
+            try:
+                with open(temporal_file, mode='wb') as temporal_file_id:
+                    np.save(temporal_file_id, sqllib.get_vcf_snps_matrix_dict(conn)['sample_gt_matrix'])
+                os.replace(temporal_file, sidecar_file)
+            except Exception as e:
+                raise genlib.ProgramException(e, 'F003', sidecar_file)
+            sample_gt_matrix = np.load(sidecar_file, mmap_mode='r')
+
+        snp_matrix_dict['sample_gt_matrix'] = sample_gt_matrix
+
+    # build the dictionary of the position of every SNP in the SNP data
+    snp_index_dict = {snp_id: i for i, snp_id in enumerate(snp_matrix_dict['variant_id_list'])}
+
+    # get the imputation plan
+    plan_matrix = load_imputation_plan_matrix(conn, genotype_database, snp_matrix_dict, minimum_r2, snps_num)
+
+    # return the genotype data dictionary
+    return {'snp_matrix_dict': snp_matrix_dict, 'snp_index_dict': snp_index_dict, 'plan_matrix': plan_matrix}
+
+#-------------------------------------------------------------------------------
+
+def load_imputation_plan_matrix(conn, genotype_database, snp_matrix_dict, minimum_r2, snps_num):
+    '''
+    Load the imputation plan of minimum_r2 and snps_num: a NumPy int32 matrix with a row per SNP (following the SNP data)
+    with the positions of the SNPs selected to impute it sorted by r^2 in descending order (padded with -1).
+    The plan is computed from the linkage disequilibrium data with a single query and it is saved in a sidecar file
+    of the genotype database, so it is only computed again when the genotype database is newer. When the sidecar file
+    cannot be written (e.g. the directory of the genotype database is read-only), the plan is only kept in memory.
+    '''
+
+    # set the sidecar file of the plan
+    sidecar_file = f'{genotype_database}.mr2-{minimum_r2}.snps-{snps_num}{genlib.Const.IMPUTATION_PLAN_SIDECAR_SUFFIX}'
+    plan_matrix = None
+
+    # build the dictionary of the position of every variant key in the SNP data
+    snp_key_index_dict = {snp_key: i for i, snp_key in enumerate(snp_matrix_dict['variant_key_list'])}
+
+    # load the sidecar file when it is not older than the genotype database and it has a row per SNP
+    if os.path.isfile(sidecar_file) and os.path.getmtime(sidecar_file) >= os.path.getmtime(genotype_database):
+        plan_matrix = np.load(sidecar_file)
+        if plan_matrix.shape != (len(snp_key_index_dict), snps_num):
+            plan_matrix = None
+
+    # otherwise, compute the plan (the plan list has the variant keys and the rank of every selected SNP)
+    if plan_matrix is None:
+        genlib.Message.print('verbose', f'Computing the imputation plan of minimum_r2 {minimum_r2} and snps_num {snps_num} ...\n')
+        plan_matrix = np.full((len(snp_key_index_dict), snps_num), -1, dtype=np.int32)
+        for snp_key_1, snp_key_2, snp_rank in sqllib.get_vcf_linkage_disequilibrium_plan_list(conn, minimum_r2, snps_num):
+            plan_matrix[snp_key_index_dict[snp_key_1], snp_rank - 1] = snp_key_index_dict[snp_key_2]
+
+        # write the sidecar file (a temporal file is renamed to not leave incomplete files)
+        genlib.Message.print('verbose', f'Writing the sidecar file {sidecar_file} ...\n')
+        temporal_file = f'{sidecar_file}.tmp'
+        try:
+            with open(temporal_file, mode='wb') as temporal_file_id:
+                np.save(temporal_file_id, plan_matrix)
+            os.replace(temporal_file, sidecar_file)
+        except Exception as e:
+            genlib.Message.print('verbose', f'The sidecar file is not written ({e}); the plan is kept in memory.\n')
+            if os.path.isfile(temporal_file):
+                os.remove(temporal_file)
+
+    # return the plan
+    return plan_matrix
+
+#-------------------------------------------------------------------------------
+
+def get_variant_selected_snp_id_2_list(genotype_data_dict, variant_id):
+    '''
+    Get the list of the SNPs selected to impute a variant from the preloaded imputation plan.
+    '''
+
+    # get the plan row of the variant
+    plan_array = genotype_data_dict['plan_matrix'][genotype_data_dict['snp_index_dict'][variant_id]]
+
+    # return the identifications of the selected SNPs (the row is padded with -1)
+    variant_id_list = genotype_data_dict['snp_matrix_dict']['variant_id_list']
+    return [variant_id_list[i] for i in plan_array[plan_array >= 0].tolist()]
+
+#-------------------------------------------------------------------------------
+
+def get_variant_snp_data_dict(genotype_data_dict, snp_id):
+    '''
+    Get the data of a SNP from the preloaded genotype data.
+    '''
+
+    # get the position of the SNP in the SNP data
+    snp_matrix_dict = genotype_data_dict['snp_matrix_dict']
+    i = genotype_data_dict['snp_index_dict'][snp_id]
+
+    # build the SNP data dictionary
+    snp_data_dict = {}
+    snp_data_dict['variant_id'] = snp_matrix_dict['variant_id_list'][i]
+    snp_data_dict['ref'] = snp_matrix_dict['ref_list'][i]
+    snp_data_dict['alt'] = snp_matrix_dict['alt_list'][i]
+    snp_data_dict['sample_gt_array'] = snp_matrix_dict['sample_gt_matrix'][i]
+
+    # return the SNP data dictionary
+    return snp_data_dict
+
+#-------------------------------------------------------------------------------
+
+def get_alleles2symbol_dict():
+    '''
+    Get the dictionary of the IUPAC symbol of every pair of alleles.
+    '''
+
+    return {
+        'AA': 'A',
+        'CC': 'C',
+        'GG': 'G',
+        'TT': 'T',
+        'AC': 'M',
+        'AG': 'R',
+        'AT': 'W',
+        'CG': 'S',
+        'CT': 'Y',
+        'GT': 'K',
+        'NN': 'N'}
+
+#-------------------------------------------------------------------------------
+
+def get_symbol2alleles_dict():
+    '''
+    Get the dictionary of the pair of alleles of every IUPAC symbol.
+    '''
+
+    return {
+        'A': 'AA',
+        'C': 'CC',
+        'G': 'GG',
+        'T': 'TT',
+        'M': 'AC',
+        'R': 'AG',
+        'W': 'AT',
+        'S': 'CG',
+        'Y': 'CT',
+        'K': 'GT',
+        'N': 'NN'}
+
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    print(f'This source contains the functions shared by the imputation programs of {genlib.get_app_long_name()}.')
+    sys.exit(0)
+
+#-------------------------------------------------------------------------------
@@ -22,59 +22,117 @@ Licence: GNU General Public Licence Version 3.
 
 #-------------------------------------------------------------------------------
 
-import math
+import pathlib
+import queue
 import sqlite3
 import sys
+import threading
+
+import numpy as np
 
 import genlib
 
+
 #-------------------------------------------------------------------------------
 
-def connect_database(database_path, check_same_thread=True):
+def connect_database(database_path, check_same_thread=True, profile=None):
     '''
-    Connect to the database.
+    Connect to the database using a connection profile:
+        * None: SQLite defaults
+        * bulk-build: WAL journal, synchronous off, large cache and page size, and temporary data in memory
+          (an application crash does not corrupt the database, but an OS crash or a power failure may lose the last transactions)
+        * read-only: the database is opened with a mode=ro URI and it is memory mapped and query only
     '''
 
     # connet to the database
     try:
-        conn = sqlite3.connect(database_path, check_same_thread=check_same_thread)
+        if profile == 'read-only':
+            conn = sqlite3.connect(f'{pathlib.Path(database_path).resolve().as_uri()}?mode=ro', uri=True, check_same_thread=check_same_thread)
+        else:
+            conn = sqlite3.connect(database_path, check_same_thread=check_same_thread)
     except Exception as e:
         raise genlib.ProgramException(e, 'B001', database_path)
 
+    # set the pragmas of the connection profile
+    for pragma in get_connection_profile_pragma_list(profile):
+        sentence = f'PRAGMA {pragma};'
+        try:
+            conn.execute(sentence)
+        except Exception as e:
+            raise genlib.ProgramException(e, 'B002', sentence, conn)
+
     # return the connection
     return conn
 
 #-------------------------------------------------------------------------------
-# table "vcf_snps"
+
+def get_connection_profile_pragma_list(profile):
+    '''
+    Get the pragma list of a connection profile
+    (the page size is only applied when the database is created, before setting the WAL journal).
+    '''
+
+    # bulk-build profile
+    if profile == 'bulk-build':
+        pragma_list = [
+            f'page_size = {genlib.Const.SQLITE_BULK_PAGE_SIZE}',
+            'journal_mode = WAL',
+            'synchronous = OFF',
+            f'cache_size = -{genlib.Const.SQLITE_BULK_CACHE_SIZE_KIB}',
+            'temp_store = MEMORY'
+            ]
+
+    # read-only profile
+    elif profile == 'read-only':
+        pragma_list = [
+            f'mmap_size = {genlib.Const.SQLITE_READ_MMAP_SIZE}',
+            f'cache_size = -{genlib.Const.SQLITE_READ_CACHE_SIZE_KIB}',
+            'query_only = ON'
+            ]
+
+    # SQLite defaults
+    else:
+        pragma_list = []
+
+    # return the pragma list
+    return pragma_list
+
 #-------------------------------------------------------------------------------
 
-def drop_vcf_snps(conn):
+def close_database(conn):
     '''
-    Drop the table "vcf_snps" (if it exists)
+    Commit the pending changes and close the connection to the database. When the database has a WAL journal
+    (bulk-build profile), the journal is checkpointed and reset to the default one, so the database is a single file
+    that can be opened with the read-only profile.
     '''
 
-    sentence = '''
-               DROP TABLE IF EXISTS vcf_snps;
-               '''
+    # commit the pending changes
+    conn.commit()
+
+    # reset the WAL journal to the default one
+    sentence = 'PRAGMA journal_mode;'
     try:
-        conn.execute(sentence)
+        journal_mode = conn.execute(sentence).fetchone()[0]
+        if journal_mode.lower() == 'wal':
+            sentence = 'PRAGMA journal_mode = DELETE;'
+            conn.execute(sentence)
     except Exception as e:
         raise genlib.ProgramException(e, 'B002', sentence, conn)
 
+    # close the connection
+    conn.close()
+
+#-------------------------------------------------------------------------------
+# table "vcf_variants"
 #-------------------------------------------------------------------------------
 
-def create_vcf_snps(conn):
+def drop_vcf_variants(conn):
     '''
-    Create the table "vcf_snps".
+    Drop the table "vcf_variants" (if it exists)
     '''
 
     sentence = '''
-               CREATE TABLE vcf_snps (
-                   variant_id         TEXT NOT NULL,
-                   ref                TEXT NOT NULL,
-                   alt                TEXT NOT NULL,
-                   sample_gt_list     TEXT NOT NULL,
-                   sample_withmd_list TEXT);
+               DROP TABLE IF EXISTS vcf_variants;
                '''
     try:
         conn.execute(sentence)
@@ -83,14 +141,16 @@ def create_vcf_snps(conn):
 
 #-------------------------------------------------------------------------------
 
-def create_vcf_snps_index(conn):
+def create_vcf_variants(conn):
     '''
-    Create the unique index "vcf_snps_index" with the column "variant_id" on the table "vcf_snps"
+    Create the table "vcf_variants" (the dictionary of variant identifications: the other tables use the variant key).
+    Every processed variant has a row, although only the SNPs with more than one genotype have a row in the table "vcf_snps".
     '''
 
     sentence = '''
-               CREATE UNIQUE INDEX vcf_snps_index
-                   ON vcf_snps (variant_id);
+               CREATE TABLE vcf_variants (
+                   variant_key INTEGER PRIMARY KEY,
+                   variant_id  TEXT    NOT NULL);
                '''
     try:
         conn.execute(sentence)
@@ -99,16 +159,15 @@ def create_vcf_snps_index(conn):
 
 #-------------------------------------------------------------------------------
 
-def insert_vcf_snps_row(conn, row_dict):
+def create_vcf_variants_index(conn):
     '''
-    Insert a row into table "vcf_snps"
+    Create the unique index "vcf_variants_index" with the column "variant_id" on the table "vcf_variants"
     '''
 
-    sentence = f'''
-                INSERT INTO vcf_snps
-                    (variant_id, ref, alt, sample_gt_list, sample_withmd_list)
-                    VALUES ('{row_dict["variant_id"]}', '{row_dict["ref"]}', '{row_dict["alt"]}', '{row_dict["sample_gt_list"]}', '{row_dict["sample_withmd_list"]}')
-                '''
+    sentence = '''
+               CREATE UNIQUE INDEX IF NOT EXISTS vcf_variants_index
+                   ON vcf_variants (variant_id);
+               '''
     try:
         conn.execute(sentence)
     except Exception as e:
@@ -116,22 +175,39 @@ def insert_vcf_snps_row(conn, row_dict):
 
 #-------------------------------------------------------------------------------
 
-def check_vcf_snps(conn):
+def get_vcf_variants_column_name_list():
     '''
-    Check if table "vcf_snps" exists and if there are rows.
+    Get the list of column names of the table "vcf_variants" used to insert rows.
+    '''
+
+    return ['variant_key', 'variant_id']
+
+#-------------------------------------------------------------------------------
+
+def get_vcf_variants_bulk_writer(conn, transaction_size=genlib.Const.DEFAULT_TRANSACTION_SIZE):
+    '''
+    Get a bulk writer to insert rows into table "vcf_variants".
     '''
 
+    return BulkWriter(conn, 'vcf_variants', get_vcf_variants_column_name_list(), transaction_size)
+
+#-------------------------------------------------------------------------------
+
+def check_vcf_variants(conn):
+    '''
+    Check if table "vcf_variants" exists (the genotype databases built by old versions do not have it).
+    '''
 
     # initialize the control variable
     control = 0
 
-    # check if table "vcf_snps" exists
+    # check if table "vcf_variants" exists
     sentence = '''
                SELECT EXISTS
                    (SELECT 1
                        FROM sqlite_master
                        WHERE type = 'table'
-                         AND tbl_name = 'vcf_snps'
+                         AND tbl_name = 'vcf_variants'
                        LIMIT 1);
                '''
     try:
@@ -144,63 +220,14 @@ def check_vcf_snps(conn):
         control = int(row[0])
         break
 
-    # check if there are rows when the table "vcf_snps" exists
-    if control == 1:
-
-        # select the row number
-        sentence = '''
-                   SELECT EXISTS
-                       (SELECT 1
-                           FROM vcf_snps
-                           LIMIT 1);
-                   '''
-        try:
-            rows = conn.execute(sentence)
-        except Exception as e:
-            raise genlib.ProgramException(e, 'B002', sentence, conn)
-
-        for row in rows:
-            control = int(row[0])
-            break
-
     # return the control variable
     return control
 
 #-------------------------------------------------------------------------------
 
-def get_snp_data_dict(conn, snp_id):
-    '''
-    Get a dictionary of SNP data corresponding to the SNP identification.
-    '''
-
-    # initialize the dictionary
-    snps_data_dict = {}
-
-    # query
-    sentence = f'''
-                SELECT variant_id, ref, alt, sample_gt_list, sample_withmd_list
-                    FROM vcf_snps
-                    WHERE variant_id = '{snp_id}';
-                '''
-    try:
-        rows = conn.execute(sentence)
-    except Exception as e:
-        raise genlib.ProgramException(e, 'B002', sentence, conn)
-
-    # add row data to the dictionary
-    for row in rows:
-        snps_data_dict = {'variant_id': row[0], 'ref': row[1], 'alt': row[2], 'sample_gt_list': row[3], 'sample_withmd_list': row[4]}
-
-    # return the dictionary
-    return snps_data_dict
-
-#-------------------------------------------------------------------------------
-# query "get_snp_ids_list"
-#-------------------------------------------------------------------------------
-
-def get_snp_ids_list(conn):
+def get_vcf_variants_id_list(conn):
     '''
-    Get a list corresponding to all variant identifications.
+    Get a list corresponding to the identifications of every processed variant.
     '''
 
     # initialize the list
@@ -209,7 +236,7 @@ def get_snp_ids_list(conn):
     # query
     sentence = '''
                SELECT variant_id
-                   FROM vcf_snps;
+                   FROM vcf_variants;
                '''
     try:
         rows = conn.execute(sentence)
@@ -224,46 +251,44 @@ def get_snp_ids_list(conn):
     return variant_id_list
 
 #-------------------------------------------------------------------------------
-# query "get_snp_ids_wmd_list"
-#-------------------------------------------------------------------------------
 
-def get_snp_ids_wmd_list(conn):
+def get_vcf_variants_max_key(conn):
     '''
-    Get a list corresponding to the variant identifications with missing data.
+    Get the highest variant key of the table "vcf_variants" (0 when there are not rows).
     '''
 
-    # initialize the list
-    variant_id_list = []
+    # initialize the variant key
+    max_variant_key = 0
 
     # query
     sentence = '''
-               SELECT variant_id
-                   FROM vcf_snps
-                   WHERE length(sample_withmd_list) > 0;
+               SELECT IFNULL(MAX(variant_key), 0)
+                   FROM vcf_variants;
                '''
     try:
         rows = conn.execute(sentence)
     except Exception as e:
         raise genlib.ProgramException(e, 'B002', sentence, conn)
 
-    # add the variant identification to the list
+    # get the variant key
     for row in rows:
-        variant_id_list.append(row[0])
+        max_variant_key = int(row[0])
+        break
 
-    # return the list
-    return variant_id_list
+    # return the variant key
+    return max_variant_key
 
 #-------------------------------------------------------------------------------
-# table "vcf_linkage_disequilibrium"
+# table "vcf_snps"
 #-------------------------------------------------------------------------------
 
-def drop_vcf_linkage_disequilibrium(conn):
+def drop_vcf_snps(conn):
     '''
-    Drop the table "vcf_linkage_disequilibrium" (if it exists)
+    Drop the table "vcf_snps" (if it exists)
     '''
 
     sentence = '''
-               DROP TABLE IF EXISTS vcf_linkage_disequilibrium;
+               DROP TABLE IF EXISTS vcf_snps;
                '''
     try:
         conn.execute(sentence)
@@ -272,18 +297,19 @@ def drop_vcf_linkage_disequilibrium(conn):
 
 #-------------------------------------------------------------------------------
 
-def create_vcf_linkage_disequilibrium(conn):
+def create_vcf_snps(conn):
     '''
-    Create the table "vcf_linkage_disequilibrium".
+    Create the table "vcf_snps" (the variant key is the one of the table "vcf_variants").
     '''
 
     sentence = '''
-               CREATE TABLE vcf_linkage_disequilibrium (
-                   snp_id_1             TEXT NOT NULL,
-                   snp_id_2             TEXT NOT NULL,
-                   dhat                 REAL NOT NULL,
-                   r2                   REAL NOT NULL,
-                   sample_withmd_list_2 TEXT);
+               CREATE TABLE vcf_snps (
+                   variant_key        INTEGER PRIMARY KEY,
+                   ref                TEXT    NOT NULL,
+                   alt                TEXT    NOT NULL,
+                   sample_number      INTEGER NOT NULL,
+                   sample_gt_packed   BLOB    NOT NULL,
+                   sample_withmd_list TEXT);
                '''
     try:
         conn.execute(sentence)
@@ -292,54 +318,40 @@ def create_vcf_linkage_disequilibrium(conn):
 
 #-------------------------------------------------------------------------------
 
-def create_vcf_linkage_disequilibrium_index(conn):
+def get_vcf_snps_column_name_list():
     '''
-    Create the unique index "vcf_linkage_disequilibrium_index" with the columns "snp_id_1" and "snp_id_2" on the table "vcf_linkage_disequilibrium"
+    Get the list of column names of the table "vcf_snps" used to insert rows.
     '''
 
-    sentence = '''
-               CREATE UNIQUE INDEX vcf_linkage_disequilibrium_index
-                   ON vcf_linkage_disequilibrium (snp_id_1, snp_id_2);
-               '''
-    try:
-        conn.execute(sentence)
-    except Exception as e:
-        raise genlib.ProgramException(e, 'B002', sentence, conn)
+    return ['variant_key', 'ref', 'alt', 'sample_number', 'sample_gt_packed', 'sample_withmd_list']
 
 #-------------------------------------------------------------------------------
 
-def insert_vcf_linkage_disequilibrium_row(conn, row_dict):
+def get_vcf_snps_bulk_writer(conn, transaction_size=genlib.Const.DEFAULT_TRANSACTION_SIZE):
     '''
-    Insert a row into table "vcf_linkage_disequilibrium"
+    Get a bulk writer to insert rows into table "vcf_snps".
     '''
 
-    sentence = f'''
-                INSERT INTO vcf_linkage_disequilibrium
-                    (snp_id_1, snp_id_2, dhat, r2, sample_withmd_list_2)
-                    VALUES ('{row_dict["snp_id_1"]}', '{row_dict["snp_id_2"]}', {row_dict["dhat"]}, {row_dict["r2"]}, '{row_dict["sample_withmd_list_2"]}')
-                '''
-    try:
-        conn.execute(sentence)
-    except Exception as e:
-        raise genlib.ProgramException(e, 'B002', sentence, conn)
+    return BulkWriter(conn, 'vcf_snps', get_vcf_snps_column_name_list(), transaction_size)
 
 #-------------------------------------------------------------------------------
 
-def check_vcf_linkage_disequilibrium(conn):
+def check_vcf_snps(conn):
     '''
-    Check if table "vcf_linkage_disequilibrium" exists and if there are rows.
+    Check if table "vcf_snps" exists and if there are rows.
     '''
 
+
     # initialize the control variable
     control = 0
 
-    # check if table "vcf_linkage_disequilibrium" exists
+    # check if table "vcf_snps" exists
     sentence = '''
                SELECT EXISTS
                    (SELECT 1
                        FROM sqlite_master
                        WHERE type = 'table'
-                         AND tbl_name = 'vcf_linkage_disequilibrium'
+                         AND tbl_name = 'vcf_snps'
                        LIMIT 1);
                '''
     try:
@@ -352,13 +364,14 @@ def check_vcf_linkage_disequilibrium(conn):
         control = int(row[0])
         break
 
-    # check if there are rows when the table "vcf_linkage_disequilibrium" exists
+    # check if there are rows when the table "vcf_snps" exists
     if control == 1:
 
+        # select the row number
         sentence = '''
                    SELECT EXISTS
                        (SELECT 1
-                           FROM vcf_linkage_disequilibrium
+                           FROM vcf_snps
                            LIMIT 1);
                    '''
         try:
@@ -366,8 +379,6 @@ def check_vcf_linkage_disequilibrium(conn):
         except Exception as e:
             raise genlib.ProgramException(e, 'B002', sentence, conn)
 
-
-        # get the row number
         for row in rows:
             control = int(row[0])
             break
@@ -377,104 +388,177 @@ def check_vcf_linkage_disequilibrium(conn):
 
 #-------------------------------------------------------------------------------
 
-def get_vcf_linkage_disequilibrium_snp_id_1_list(conn):
+def get_vcf_snps_matrix_dict(conn, with_sample_gt_matrix=True):
     '''
-    Get a list of variant identifications with linkage disequilibrium data.
+    Get a dictionary with the data of all SNPs sorted by variant key; the sample genotypes are
+    returned as a NumPy matrix of pseudo binary numbers (SNPs x samples) whose rows follow the variant identification list
+    (when with_sample_gt_matrix is False, the sample genotypes are not got and the matrix is None).
     '''
 
-    # initialize the list
-    snp_id_1_list = []
+    # initialize the lists
+    variant_key_list = []
+    variant_id_list = []
+    ref_list = []
+    alt_list = []
+    sample_gt_array_list = []
+    sample_withmd_list_list = []
 
     # query
-    sentence = '''
-               SELECT DISTINCT snp_id_1
-                   FROM vcf_linkage_disequilibrium;
-               '''
+    if with_sample_gt_matrix:
+        sentence = '''
+                   SELECT vcf_variants.variant_id, vcf_snps.*
+                       FROM vcf_snps
+                       JOIN vcf_variants USING (variant_key)
+                       ORDER BY variant_key;
+                   '''
+    else:
+        sentence = '''
+                   SELECT vcf_variants.variant_id, vcf_snps.variant_key, vcf_snps.ref, vcf_snps.alt, vcf_snps.sample_withmd_list
+                       FROM vcf_snps
+                       JOIN vcf_variants USING (variant_key)
+                       ORDER BY variant_key;
+                   '''
     try:
         rows = conn.execute(sentence)
     except Exception as e:
         raise genlib.ProgramException(e, 'B002', sentence, conn)
 
-    # add row data to the dictionary
+    # get the column names
+    column_name_list = [column[0] for column in rows.description]
+
+    # add row data to the lists
     for row in rows:
-        snp_id_1_list.append(row[0])
+        row_dict = dict(zip(column_name_list, row))
+        variant_key_list.append(row_dict['variant_key'])
+        variant_id_list.append(row_dict['variant_id'])
+        ref_list.append(row_dict['ref'])
+        alt_list.append(row_dict['alt'])
+        if with_sample_gt_matrix:
+            sample_gt_array_list.append(unpack_sample_gt_packed(row_dict['sample_gt_packed'], row_dict['sample_number']))
+        sample_withmd_list_list.append(row_dict['sample_withmd_list'])
+
+    # build the matrix of sample genotypes
+    if not with_sample_gt_matrix:
+        sample_gt_matrix = None
+    elif sample_gt_array_list != []:
+        sample_gt_matrix = np.vstack(sample_gt_array_list)
+    else:
+        sample_gt_matrix = np.zeros((0, 0), dtype=np.int8)
 
-    # return the list
-    return snp_id_1_list
+    # return the dictionary
+    return {'variant_key_list': variant_key_list, 'variant_id_list': variant_id_list, 'ref_list': ref_list, 'alt_list': alt_list, 'sample_gt_matrix': sample_gt_matrix, 'sample_withmd_list_list': sample_withmd_list_list}
+
+#-------------------------------------------------------------------------------
+
+def pack_sample_gt_list(pseudobinary_sample_gt_list):
+    '''
+    Pack a list of sample genotypes using pseudo binary numbers (0b00, 0b01, 0b11 and 0b111) in 2 bits per sample
+    (4 samples per byte; the first sample is in the lowest bits).
+    '''
+
+    # convert the pseudo binary numbers to 2 bits codes (0b00 -> 0; 0b01 -> 1; 0b11 -> 2; 0b111 -> 3)
+    pseudobinary_to_code_array = np.array([0, 1, 0, 2, 0, 0, 0, 3], dtype=np.uint8)
+    code_array = pseudobinary_to_code_array[np.asarray(pseudobinary_sample_gt_list, dtype=np.int8)]
+
+    # add padding codes until the number of codes is a multiple of 4
+    code_array = np.concatenate((code_array, np.zeros(-len(code_array) % 4, dtype=np.uint8)))
+
+    # pack 4 codes per byte
+    code_matrix = code_array.reshape(-1, 4)
+    packed_array = code_matrix[:, 0] | (code_matrix[:, 1] << 2) | (code_matrix[:, 2] << 4) | (code_matrix[:, 3] << 6)
 
+    # return the packed sample genotypes
+    return packed_array.astype(np.uint8).tobytes()
+
+#-------------------------------------------------------------------------------
+
+def unpack_sample_gt_packed(sample_gt_packed, sample_number):
+    '''
+    Unpack sample genotypes packed by pack_sample_gt_list to a NumPy array of pseudo binary numbers.
+    '''
+
+    # get the 2 bits codes of each byte
+    packed_array = np.frombuffer(sample_gt_packed, dtype=np.uint8)
+    code_array = ((packed_array[:, np.newaxis] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3).reshape(-1)[:sample_number]
+
+    # convert the 2 bits codes to pseudo binary numbers (0 -> 0b00; 1 -> 0b01; 2 -> 0b11; 3 -> 0b111)
+    code_to_pseudobinary_array = np.array([0, 1, 3, 7], dtype=np.int8)
+
+    # return the pseudo binary numbers
+    return code_to_pseudobinary_array[code_array]
+
+#-------------------------------------------------------------------------------
+# query "get_snp_ids_list"
 #-------------------------------------------------------------------------------
 
-def get_vcf_linkage_disequilibrium_list(conn, snp_id_1):
+def get_snp_ids_list(conn):
     '''
-    Get a list of linkage disequilibrium data corresponding to a variant.
+    Get a list corresponding to all variant identifications.
     '''
 
     # initialize the list
-    linkage_disequilibrium_list = []
+    variant_id_list = []
 
     # query
-    sentence = f'''
-                SELECT snp_id_2, dhat, r2, sample_withmd_list_2
-                    FROM vcf_linkage_disequilibrium
-                    WHERE snp_id_1 = '{snp_id_1}';
-                '''
+    sentence = '''
+               SELECT vcf_variants.variant_id
+                   FROM vcf_snps
+                   JOIN vcf_variants USING (variant_key);
+               '''
     try:
         rows = conn.execute(sentence)
     except Exception as e:
         raise genlib.ProgramException(e, 'B002', sentence, conn)
 
-    # add row data to the dictionary
+    # add the variant identification to the list
     for row in rows:
-        linkage_disequilibrium_list.append([row[0], row[1], row[2], row[3]])
+        variant_id_list.append(row[0])
 
     # return the list
-    return linkage_disequilibrium_list
+    return variant_id_list
 
 #-------------------------------------------------------------------------------
+# query "get_snp_ids_wmd_list"
+#-------------------------------------------------------------------------------
 
-def get_vcf_linkage_disequilibrium_r2_measures(conn):
+def get_snp_ids_wmd_list(conn):
     '''
-    Get global measures of r2 from linkage disequilibrium data.
+    Get a list corresponding to the variant identifications with missing data.
     '''
 
-    # create the SQL aggregate function "STDEV" in the database
-    conn.create_aggregate("STDEV", 1, Stdev)
-
-    # initialize data
-    avg = 0
-    stdev = 0
+    # initialize the list
+    variant_id_list = []
 
     # query
     sentence = '''
-               SELECT AVG(r2), STDEV(r2)
-                   FROM vcf_linkage_disequilibrium
-                   where r2 >= 0;
+               SELECT vcf_variants.variant_id
+                   FROM vcf_snps
+                   JOIN vcf_variants USING (variant_key)
+                   WHERE length(vcf_snps.sample_withmd_list) > 0;
                '''
     try:
         rows = conn.execute(sentence)
     except Exception as e:
         raise genlib.ProgramException(e, 'B002', sentence, conn)
 
-    # get the row number
+    # add the variant identification to the list
     for row in rows:
-        avg = float(row[0])
-        stdev = float(row[1])
-        break
+        variant_id_list.append(row[0])
 
     # return the list
-    return avg, stdev
+    return variant_id_list
 
 #-------------------------------------------------------------------------------
-# table "vcf_kinship"
+# table "vcf_linkage_disequilibrium"
 #-------------------------------------------------------------------------------
 
-def drop_vcf_kinship(conn):
+def drop_vcf_linkage_disequilibrium(conn):
     '''
-    Drop the table "vcf_kinship" (if it exists)
+    Drop the table "vcf_linkage_disequilibrium" (if it exists)
     '''
 
     sentence = '''
-               DROP TABLE IF EXISTS vcf_kinship;
+               DROP TABLE IF EXISTS vcf_linkage_disequilibrium;
                '''
     try:
         conn.execute(sentence)
@@ -483,18 +567,22 @@ def drop_vcf_kinship(conn):
 
 #-------------------------------------------------------------------------------
 
-def create_vcf_kinship(conn):
+def create_vcf_linkage_disequilibrium(conn):
     '''
-    Create the table "vcf_kinship".
+    Create the table "vcf_linkage_disequilibrium" (the SNPs are identified by the variant keys of the table "vcf_variants").
+    The table is clustered by its primary key, so the SNPs of every variant are stored together sorted by r2 in descending order.
+    A pair of SNPs with missing data is only stored once, with the SNP of the lowest variant key as snp_key_1
+    (the view "vcf_linkage_disequilibrium_view" has both directions).
     '''
 
     sentence = '''
-               CREATE TABLE vcf_kinship (
-                   individual_i INTEGER NOT NULL,
-                   individual_j INTEGER NOT NULL,
-                   rbeta        REAL    NOT NULL,
-                   rw           REAL    NOT NULL,
-                   ru           REAL    NOT NULL);
+               CREATE TABLE vcf_linkage_disequilibrium (
+                   snp_key_1 INTEGER NOT NULL,
+                   snp_key_2 INTEGER NOT NULL,
+                   dhat      REAL    NOT NULL,
+                   r2        REAL    NOT NULL,
+                   PRIMARY KEY (snp_key_1, r2 DESC, snp_key_2))
+                   WITHOUT ROWID;
                '''
     try:
         conn.execute(sentence)
@@ -503,54 +591,56 @@ def create_vcf_kinship(conn):
 
 #-------------------------------------------------------------------------------
 
-def create_vcf_kinship_index(conn):
+def get_vcf_linkage_disequilibrium_column_name_list():
     '''
-    Create the unique index "vcf_kinship_index" with the columns "individual_i" and "individual_j" on the table "vcf_kinship"
+    Get the list of column names of the table "vcf_linkage_disequilibrium" used to insert rows.
     '''
 
-    sentence = '''
-               CREATE UNIQUE INDEX vcf_kinship_index
-                   ON vcf_kinship (individual_i, individual_j);
-               '''
-    try:
-        conn.execute(sentence)
-    except Exception as e:
-        raise genlib.ProgramException(e, 'B002', sentence, conn)
+    return ['snp_key_1', 'snp_key_2', 'dhat', 'r2']
 
 #-------------------------------------------------------------------------------
 
-def insert_vcf_kinship_row(conn, row_dict):
+def get_vcf_linkage_disequilibrium_bulk_writer(conn, transaction_size=genlib.Const.DEFAULT_TRANSACTION_SIZE):
     '''
-    Insert a row into table "vcf_kinship"
+    Get a bulk writer to insert rows into table "vcf_linkage_disequilibrium"
+    with checkpoints in the table "vcf_linkage_disequilibrium_progress".
     '''
 
-    sentence = f'''
-                INSERT INTO vcf_kinship
-                    (individual_i, individual_j, rbeta, rw, ru)
-                    VALUES ({row_dict["individual_i"]}, {row_dict["individual_j"]}, {row_dict["rbeta"]}, {row_dict["rw"]}, {row_dict["ru"]})
-                '''
+    return BulkWriter(conn, 'vcf_linkage_disequilibrium', get_vcf_linkage_disequilibrium_column_name_list(), transaction_size, 'vcf_linkage_disequilibrium_progress', ['snp_key_1'])
+
+#-------------------------------------------------------------------------------
+
+def delete_vcf_linkage_disequilibrium_rows(conn, snp_key_1_list):
+    '''
+    Delete the rows of the table "vcf_linkage_disequilibrium" corresponding to a list of variant keys.
+    '''
+
+    sentence = '''
+               DELETE FROM vcf_linkage_disequilibrium
+                   WHERE snp_key_1 = ?;
+               '''
     try:
-        conn.execute(sentence)
+        conn.executemany(sentence, [(snp_key_1,) for snp_key_1 in snp_key_1_list])
     except Exception as e:
         raise genlib.ProgramException(e, 'B002', sentence, conn)
 
 #-------------------------------------------------------------------------------
 
-def check_vcf_kinship(conn):
+def check_vcf_linkage_disequilibrium(conn):
     '''
-    Check if table "vcf_kinship" exists and if there are rows.
+    Check if table "vcf_linkage_disequilibrium" exists and if there are rows.
     '''
 
     # initialize the control variable
     control = 0
 
-    # check if table "vcf_kinship" exists
+    # check if table "vcf_linkage_disequilibrium" exists
     sentence = '''
                SELECT EXISTS
                    (SELECT 1
                        FROM sqlite_master
                        WHERE type = 'table'
-                         AND tbl_name = 'vcf_kinship'
+                         AND tbl_name = 'vcf_linkage_disequilibrium'
                        LIMIT 1);
                '''
     try:
@@ -563,14 +653,13 @@ def check_vcf_kinship(conn):
         control = int(row[0])
         break
 
-    # check if there are rows when the table "vcf_kinship" exists
+    # check if there are rows when the table "vcf_linkage_disequilibrium" exists
     if control == 1:
 
-        # select the row number
         sentence = '''
                    SELECT EXISTS
                        (SELECT 1
-                           FROM vcf_kinship
+                           FROM vcf_linkage_disequilibrium
                            LIMIT 1);
                    '''
         try:
@@ -578,6 +667,7 @@ def check_vcf_kinship(conn):
         except Exception as e:
             raise genlib.ProgramException(e, 'B002', sentence, conn)
 
+
         # get the row number
         for row in rows:
             control = int(row[0])
@@ -588,68 +678,908 @@ def check_vcf_kinship(conn):
 
 #-------------------------------------------------------------------------------
 
-def get_vcf_kinship_dict(conn):
+def get_vcf_linkage_disequilibrium_plan_list(conn, minimum_r2, snps_num):
     '''
-    Get a dictionary corresponding to kinship data.
+    Get the imputation plan list: for every variant, the snps_num SNPs without missing data with the highest r2 values
+    whose value is greater than or equal to minimum_r2, ranked by r2 in descending order (the ties are ranked by the
+    variant identification got from the table "vcf_variants"). The list has the variant keys and the rank of every SNP
+    [snp_key_1, snp_key_2, snp_rank] (from 1). The table is read in the order of its primary key (the pairs stored once
+    are not needed because both SNPs have missing data), and the SNPs with missing data are got in a single scan of the table "vcf_snps".
     '''
 
-    # initialize the dictionary
-    kinship_dict = genlib.NestedDefaultDict()
+    # initialize the list
+    plan_list = []
 
     # query
     sentence = '''
-               SELECT individual_i, individual_j, rbeta, rw, ru
-                   FROM vcf_kinship;
+               SELECT snp_key_1, snp_key_2, snp_rank
+                   FROM (SELECT vcf_linkage_disequilibrium.snp_key_1, vcf_linkage_disequilibrium.snp_key_2, ROW_NUMBER() OVER (PARTITION BY vcf_linkage_disequilibrium.snp_key_1 ORDER BY vcf_linkage_disequilibrium.r2 DESC, variants_2.variant_id) AS snp_rank
+                             FROM vcf_linkage_disequilibrium
+                             JOIN vcf_variants AS variants_2 ON variants_2.variant_key = vcf_linkage_disequilibrium.snp_key_2
+                             WHERE vcf_linkage_disequilibrium.r2 >= ?
+                               AND vcf_linkage_disequilibrium.snp_key_2 NOT IN (SELECT variant_key
+                                                                                    FROM vcf_snps
+                                                                                    WHERE length(sample_withmd_list) > 0))
+                   WHERE snp_rank <= ?;
                '''
     try:
-        rows = conn.execute(sentence)
+        rows = conn.execute(sentence, (minimum_r2, snps_num))
     except Exception as e:
         raise genlib.ProgramException(e, 'B002', sentence, conn)
 
-    # add row data to the dictionary
+    # add row data to the list
     for row in rows:
-        kinship_dict[row[0]][row[1]] = {'rbeta': row[2], 'rw': row[3], 'ru': row[4]}
+        plan_list.append([row[0], row[1], row[2]])
 
-    return kinship_dict
+    # return the list
+    return plan_list
 
 #-------------------------------------------------------------------------------
-# General classes
+# view "vcf_linkage_disequilibrium_view"
 #-------------------------------------------------------------------------------
 
-class Stdev:
+def drop_vcf_linkage_disequilibrium_view(conn):
     '''
-    This class defines the calculation of standard deviation
-    (SQLite does not have a function for standard deviation).
+    Drop the view "vcf_linkage_disequilibrium_view" (if it exists)
     '''
 
-    #---------------
+    sentence = '''
+               DROP VIEW IF EXISTS vcf_linkage_disequilibrium_view;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def create_vcf_linkage_disequilibrium_view(conn):
+    '''
+    Create the view "vcf_linkage_disequilibrium_view" with the linkage disequilibrium data of every SNP with missing data
+    in both directions of the pairs of SNPs with missing data, which are stored once in the table "vcf_linkage_disequilibrium",
+    and with the samples with missing data of the second SNP got from the table "vcf_snps".
+    The reversed pairs are not indexed by their second SNP, so the view is meant to read the whole data
+    (the imputation reads the table directly).
+    '''
+
+    sentence = '''
+               CREATE VIEW vcf_linkage_disequilibrium_view AS
+                   SELECT vcf_linkage_disequilibrium.snp_key_1, vcf_linkage_disequilibrium.snp_key_2, vcf_linkage_disequilibrium.dhat, vcf_linkage_disequilibrium.r2, snps_2.sample_withmd_list AS sample_withmd_list_2
+                       FROM vcf_linkage_disequilibrium
+                       JOIN vcf_snps AS snps_2 ON snps_2.variant_key = vcf_linkage_disequilibrium.snp_key_2
+                   UNION ALL
+                   SELECT vcf_linkage_disequilibrium.snp_key_2, vcf_linkage_disequilibrium.snp_key_1, vcf_linkage_disequilibrium.dhat, vcf_linkage_disequilibrium.r2, snps_1.sample_withmd_list
+                       FROM vcf_linkage_disequilibrium
+                       JOIN vcf_snps AS snps_1 ON snps_1.variant_key = vcf_linkage_disequilibrium.snp_key_1
+                       JOIN vcf_snps AS snps_2 ON snps_2.variant_key = vcf_linkage_disequilibrium.snp_key_2
+                       WHERE length(snps_2.sample_withmd_list) > 0;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+# table "vcf_linkage_disequilibrium_progress"
+#-------------------------------------------------------------------------------
+
+def drop_vcf_linkage_disequilibrium_progress(conn):
+    '''
+    Drop the table "vcf_linkage_disequilibrium_progress" (if it exists)
+    '''
+
+    sentence = '''
+               DROP TABLE IF EXISTS vcf_linkage_disequilibrium_progress;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def create_vcf_linkage_disequilibrium_progress(conn):
+    '''
+    Create the table "vcf_linkage_disequilibrium_progress".
+    '''
+
+    sentence = '''
+               CREATE TABLE vcf_linkage_disequilibrium_progress (
+                   snp_key_1 INTEGER NOT NULL PRIMARY KEY);
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def check_vcf_linkage_disequilibrium_progress(conn):
+    '''
+    Check if table "vcf_linkage_disequilibrium_progress" exists (it may not have rows).
+    '''
+
+    # initialize the control variable
+    control = 0
+
+    # check if table "vcf_linkage_disequilibrium_progress" exists
+    sentence = '''
+               SELECT EXISTS
+                   (SELECT 1
+                       FROM sqlite_master
+                       WHERE type = 'table'
+                         AND tbl_name = 'vcf_linkage_disequilibrium_progress'
+                       LIMIT 1);
+               '''
+    try:
+        rows = conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # get the row number
+    for row in rows:
+        control = int(row[0])
+        break
+
+    # return the control variable
+    return control
+
+#-------------------------------------------------------------------------------
+
+def get_vcf_linkage_disequilibrium_progress_list(conn):
+    '''
+    Get a list corresponding to the variant keys whose linkage disequilibrium is completely saved.
+    '''
+
+    # initialize the list
+    snp_key_1_list = []
+
+    # query
+    sentence = '''
+               SELECT snp_key_1
+                   FROM vcf_linkage_disequilibrium_progress;
+               '''
+    try:
+        rows = conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # add the variant key to the list
+    for row in rows:
+        snp_key_1_list.append(row[0])
+
+    # return the list
+    return snp_key_1_list
+
+#-------------------------------------------------------------------------------
+# table "vcf_linkage_disequilibrium_run"
+#-------------------------------------------------------------------------------
+
+def drop_vcf_linkage_disequilibrium_run(conn):
+    '''
+    Drop the table "vcf_linkage_disequilibrium_run" (if it exists)
+    '''
+
+    sentence = '''
+               DROP TABLE IF EXISTS vcf_linkage_disequilibrium_run;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def create_vcf_linkage_disequilibrium_run(conn):
+    '''
+    Create the table "vcf_linkage_disequilibrium_run" (it has a row with the mode of the run whose progress
+    is in the table "vcf_linkage_disequilibrium_progress" and the highest variant key saved before the run).
+    '''
+
+    sentence = '''
+               CREATE TABLE vcf_linkage_disequilibrium_run (
+                   append                TEXT    NOT NULL,
+                   saved_max_variant_key INTEGER NOT NULL);
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def insert_vcf_linkage_disequilibrium_run_row(conn, row_dict):
+    '''
+    Insert a row into table "vcf_linkage_disequilibrium_run"
+    '''
+
+    sentence = '''
+               INSERT INTO vcf_linkage_disequilibrium_run
+                   (append, saved_max_variant_key)
+                   VALUES (?, ?);
+               '''
+    try:
+        conn.execute(sentence, (row_dict['append'], row_dict['saved_max_variant_key']))
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def check_vcf_linkage_disequilibrium_run(conn):
+    '''
+    Check if table "vcf_linkage_disequilibrium_run" exists and if there are rows.
+    '''
+
+    # initialize the control variable
+    control = 0
+
+    # check if table "vcf_linkage_disequilibrium_run" exists
+    sentence = '''
+               SELECT EXISTS
+                   (SELECT 1
+                       FROM sqlite_master
+                       WHERE type = 'table'
+                         AND tbl_name = 'vcf_linkage_disequilibrium_run'
+                       LIMIT 1);
+               '''
+    try:
+        rows = conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # get the row number
+    for row in rows:
+        control = int(row[0])
+        break
+
+    # check if there are rows when the table "vcf_linkage_disequilibrium_run" exists
+    if control == 1:
+
+        # select the row number
+        sentence = '''
+                   SELECT EXISTS
+                       (SELECT 1
+                           FROM vcf_linkage_disequilibrium_run
+                           LIMIT 1);
+                   '''
+        try:
+            rows = conn.execute(sentence)
+        except Exception as e:
+            raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+        # get the row number
+        for row in rows:
+            control = int(row[0])
+            break
+
+    # return the control variable
+    return control
+
+#-------------------------------------------------------------------------------
+
+def get_vcf_linkage_disequilibrium_run_dict(conn):
+    '''
+    Get a dictionary corresponding to the row of the table "vcf_linkage_disequilibrium_run".
+    '''
+
+    # initialize the dictionary
+    run_dict = {}
+
+    # query
+    sentence = '''
+               SELECT append, saved_max_variant_key
+                   FROM vcf_linkage_disequilibrium_run;
+               '''
+    try:
+        rows = conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # add data to the dictionary
+    for row in rows:
+        run_dict = {'append': row[0], 'saved_max_variant_key': int(row[1])}
+        break
+
+    # return the dictionary
+    return run_dict
+
+#-------------------------------------------------------------------------------
+# table "vcf_kinship"
+#-------------------------------------------------------------------------------
+
+def drop_vcf_kinship(conn):
+    '''
+    Drop the table "vcf_kinship" (if it exists)
+    '''
+
+    sentence = '''
+               DROP TABLE IF EXISTS vcf_kinship;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def create_vcf_kinship(conn):
+    '''
+    Create the table "vcf_kinship".
+    '''
+
+    sentence = '''
+               CREATE TABLE vcf_kinship (
+                   individual_i INTEGER NOT NULL,
+                   individual_j INTEGER NOT NULL,
+                   rbeta        REAL    NOT NULL,
+                   rw           REAL    NOT NULL,
+                   ru           REAL    NOT NULL);
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def create_vcf_kinship_index(conn):
+    '''
+    Create the unique index "vcf_kinship_index" with the columns "individual_i" and "individual_j" on the table "vcf_kinship"
+    '''
+
+    sentence = '''
+               CREATE UNIQUE INDEX IF NOT EXISTS vcf_kinship_index
+                   ON vcf_kinship (individual_i, individual_j);
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def get_vcf_kinship_column_name_list():
+    '''
+    Get the list of column names of the table "vcf_kinship" used to insert rows.
+    '''
+
+    return ['individual_i', 'individual_j', 'rbeta', 'rw', 'ru']
+
+#-------------------------------------------------------------------------------
+
+def get_vcf_kinship_bulk_writer(conn, transaction_size=genlib.Const.DEFAULT_TRANSACTION_SIZE):
+    '''
+    Get a bulk writer to insert rows into table "vcf_kinship".
+    '''
+
+    return BulkWriter(conn, 'vcf_kinship', get_vcf_kinship_column_name_list(), transaction_size)
+
+#-------------------------------------------------------------------------------
+
+def check_vcf_kinship(conn):
+    '''
+    Check if table "vcf_kinship" exists and if there are rows.
+    '''
+
+    # initialize the control variable
+    control = 0
+
+    # check if table "vcf_kinship" exists
+    sentence = '''
+               SELECT EXISTS
+                   (SELECT 1
+                       FROM sqlite_master
+                       WHERE type = 'table'
+                         AND tbl_name = 'vcf_kinship'
+                       LIMIT 1);
+               '''
+    try:
+        rows = conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # get the row number
+    for row in rows:
+        control = int(row[0])
+        break
+
+    # check if there are rows when the table "vcf_kinship" exists
+    if control == 1:
+
+        # select the row number
+        sentence = '''
+                   SELECT EXISTS
+                       (SELECT 1
+                           FROM vcf_kinship
+                           LIMIT 1);
+                   '''
+        try:
+            rows = conn.execute(sentence)
+        except Exception as e:
+            raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+        # get the row number
+        for row in rows:
+            control = int(row[0])
+            break
+
+    # return the control variable
+    return control
+
+#-------------------------------------------------------------------------------
+
+def get_vcf_kinship_matrix(conn, r_estimator):
+    '''
+    Get a dense symmetric NumPy float32 matrix with the kinship values of an estimator (rbeta, rw or ru)
+    for every pair of individuals (NaN when the pair is not in the kinship data).
+    '''
+
+    # check the estimator (its name is a column name)
+    if r_estimator not in ['rbeta', 'rw', 'ru']:
+        raise genlib.ProgramException('', 'P001')
+
+    # get the number of individuals
+    sentence = '''
+               SELECT MAX(MAX(individual_i), MAX(individual_j))
+                   FROM vcf_kinship;
+               '''
+    try:
+        individuals_num = conn.execute(sentence).fetchone()[0]
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+    individuals_num = 0 if individuals_num is None else individuals_num + 1
+
+    # initialize the matrix
+    kinship_matrix = np.full((individuals_num, individuals_num), np.nan, dtype=np.float32)
+
+    # query
+    sentence = f'''
+               SELECT individual_i, individual_j, {r_estimator}
+                   FROM vcf_kinship;
+               '''
+    try:
+        cursor = conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # set the kinship values of every fetched block of rows in both halves of the matrix
+    while True:
+        try:
+            rows = cursor.fetchmany(genlib.Const.SQLITE_FETCH_SIZE)
+        except Exception as e:
+            raise genlib.ProgramException(e, 'B002', sentence, conn)
+        if rows == []:
+            break
+        individual_i_array = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        individual_j_array = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        r_array = np.fromiter((row[2] for row in rows), dtype=np.float32, count=len(rows))
+        kinship_matrix[individual_i_array, individual_j_array] = r_array
+        kinship_matrix[individual_j_array, individual_i_array] = r_array
+
+    return kinship_matrix
+
+#-------------------------------------------------------------------------------
+# table "vcf_kinship_summation"
+#-------------------------------------------------------------------------------
+
+def drop_vcf_kinship_summation(conn):
+    '''
+    Drop the table "vcf_kinship_summation" (if it exists)
+    '''
+
+    sentence = '''
+               DROP TABLE IF EXISTS vcf_kinship_summation;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def create_vcf_kinship_summation(conn):
+    '''
+    Create the table "vcf_kinship_summation".
+    '''
+
+    sentence = '''
+               CREATE TABLE vcf_kinship_summation (
+                   summation_name  TEXT NOT NULL PRIMARY KEY,
+                   summation_value BLOB NOT NULL);
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def save_vcf_kinship_summation_dict(conn, sample_list, kinship_summation_dict, summation_summation_mij):
+    '''
+    Save into the table "vcf_kinship_summation" the sample list, the kinship summations of each pair of samples
+    (float64 matrices) and the summation of mij items of the last variant, replacing the previous ones.
+    '''
+
+    # build the rows: the sample list is saved as text with the samples separated by tabs
+    row_list = [('sample_list', '\t'.join(sample_list).encode('utf-8'))]
+    row_list.append(('summation_summation_mij', np.array([summation_summation_mij], dtype=np.float64).tobytes()))
+    for summation, summation_matrix in kinship_summation_dict.items():
+        row_list.append((summation, np.ascontiguousarray(summation_matrix, dtype=np.float64).tobytes()))
+
+    # delete the previous rows
+    sentence = '''
+               DELETE FROM vcf_kinship_summation;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # insert the rows
+    sentence = '''
+               INSERT INTO vcf_kinship_summation
+                   (summation_name, summation_value)
+                   VALUES (?, ?);
+               '''
+    try:
+        conn.executemany(sentence, row_list)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+#-------------------------------------------------------------------------------
+
+def check_vcf_kinship_summation(conn):
+    '''
+    Check if table "vcf_kinship_summation" exists and if there are rows.
+    '''
+
+    # initialize the control variable
+    control = 0
+
+    # check if table "vcf_kinship_summation" exists
+    sentence = '''
+               SELECT EXISTS
+                   (SELECT 1
+                       FROM sqlite_master
+                       WHERE type = 'table'
+                         AND tbl_name = 'vcf_kinship_summation'
+                       LIMIT 1);
+               '''
+    try:
+        rows = conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # get the row number
+    for row in rows:
+        control = int(row[0])
+        break
+
+    # check if there are rows when the table "vcf_kinship_summation" exists
+    if control == 1:
+
+        # select the row number
+        sentence = '''
+                   SELECT EXISTS
+                       (SELECT 1
+                           FROM vcf_kinship_summation
+                           LIMIT 1);
+                   '''
+        try:
+            rows = conn.execute(sentence)
+        except Exception as e:
+            raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+        # get the row number
+        for row in rows:
+            control = int(row[0])
+            break
+
+    # return the control variable
+    return control
+
+#-------------------------------------------------------------------------------
+
+def get_vcf_kinship_summation_dict(conn):
+    '''
+    Get a dictionary with the sample list (key "sample_list"), the summation of mij items of the last variant
+    (key "summation_summation_mij") and the kinship summations of each pair of samples saved in the table "vcf_kinship_summation".
+    '''
+
+    # initialize the dictionary
+    kinship_summation_dict = {}
+
+    # query
+    sentence = '''
+               SELECT summation_name, summation_value
+                   FROM vcf_kinship_summation;
+               '''
+    try:
+        rows = conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # add row data to the dictionary
+    for row in rows:
+        if row[0] == 'sample_list':
+            kinship_summation_dict['sample_list'] = row[1].decode('utf-8').split('\t')
+        elif row[0] == 'summation_summation_mij':
+            kinship_summation_dict['summation_summation_mij'] = float(np.frombuffer(row[1], dtype=np.float64)[0])
+        else:
+            kinship_summation_dict[row[0]] = np.frombuffer(row[1], dtype=np.float64).copy()
+
+    # reshape the kinship summations as sample_number x sample_number matrices
+    sample_number = len(kinship_summation_dict['sample_list'])
+    for summation in kinship_summation_dict:
+        if summation not in ['sample_list', 'summation_summation_mij']:
+            kinship_summation_dict[summation] = kinship_summation_dict[summation].reshape(sample_number, sample_number)
+
+    # return the dictionary
+    return kinship_summation_dict
+
+#-------------------------------------------------------------------------------
+# genotype databases built by old versions
+#-------------------------------------------------------------------------------
+
+def check_old_genotype_database(conn):
+    '''
+    Check if the genotype database is built by an old version (the table "vcf_snps" has the column "variant_id"
+    and the sample genotypes in the column "sample_gt_list").
+    '''
+
+    # initialize the control variable
+    control = 0
+
+    # check if table "vcf_snps" has the column "variant_id"
+    sentence = '''
+               SELECT EXISTS
+                   (SELECT 1
+                       FROM pragma_table_info('vcf_snps')
+                       WHERE name = 'variant_id'
+                       LIMIT 1);
+               '''
+    try:
+        rows = conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # get the row number
+    for row in rows:
+        control = int(row[0])
+        break
+
+    # return the control variable
+    return control
+
+#-------------------------------------------------------------------------------
+
+def migrate_old_genotype_database(conn):
+    '''
+    Migrate a genotype database built by an old version to the current tables in a transaction:
+        * the table "vcf_variants" is built with the variant identifications of the old table "vcf_snps" (in its order)
+        * the sample genotypes of the table "vcf_snps" are packed and its rows are keyed by the variant keys
+        * the rows of the table "vcf_linkage_disequilibrium" are keyed by the variant keys and the pairs of SNPs
+          with missing data, which were saved in both directions, are only kept with the SNP with the lowest variant key first
+        * the view "vcf_linkage_disequilibrium_view" is created
+    The table "vcf_kinship" is not changed. The kinship summations were not saved by the old versions,
+    so the variants can not be appended to a migrated genotype database.
+    '''
+
+    # start the transaction
+    sentence = '''
+               BEGIN;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # drop the indexes of the old tables and rename them
+    for sentence in ['DROP INDEX IF EXISTS vcf_snps_index;', 'DROP INDEX IF EXISTS vcf_linkage_disequilibrium_index;', 'ALTER TABLE vcf_snps RENAME TO vcf_snps_old;', 'ALTER TABLE vcf_linkage_disequilibrium RENAME TO vcf_linkage_disequilibrium_old;']:
+        try:
+            conn.execute(sentence)
+        except Exception as e:
+            raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # create the table "vcf_variants" and insert the variant identifications of the old table "vcf_snps"
+    drop_vcf_variants(conn)
+    create_vcf_variants(conn)
+    sentence = '''
+               INSERT INTO vcf_variants
+                   (variant_key, variant_id)
+                   SELECT ROW_NUMBER() OVER (ORDER BY rowid), variant_id
+                       FROM vcf_snps_old
+                       ORDER BY rowid;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+    create_vcf_variants_index(conn)
+
+    # create the table "vcf_snps" and insert the rows of the old table with the sample genotypes packed
+    create_vcf_snps(conn)
+    sentence = '''
+               SELECT vcf_variants.variant_key, vcf_snps_old.ref, vcf_snps_old.alt, vcf_snps_old.sample_gt_list, vcf_snps_old.sample_withmd_list
+                   FROM vcf_snps_old
+                   JOIN vcf_variants USING (variant_id)
+                   ORDER BY vcf_variants.variant_key;
+               '''
+    try:
+        rows = conn.execute(sentence).fetchall()
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+    snp_row_list = []
+    for row in rows:
+        pseudobinary_sample_gt_list = genlib.split_literal_to_integer_list(row[3])
+        snp_row_list.append((row[0], row[1], row[2], len(pseudobinary_sample_gt_list), pack_sample_gt_list(pseudobinary_sample_gt_list), row[4]))
+    sentence = BulkWriter.build_insert_sentence('vcf_snps', get_vcf_snps_column_name_list())
+    try:
+        conn.executemany(sentence, snp_row_list)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # create the table "vcf_linkage_disequilibrium" and insert the rows of the old table keyed by the variant keys
+    # (a pair of SNPs with missing data is only inserted with the SNP with the lowest variant key first)
+    create_vcf_linkage_disequilibrium(conn)
+    sentence = '''
+               INSERT INTO vcf_linkage_disequilibrium
+                   (snp_key_1, snp_key_2, dhat, r2)
+                   SELECT variants_1.variant_key, variants_2.variant_key, vcf_linkage_disequilibrium_old.dhat, vcf_linkage_disequilibrium_old.r2
+                       FROM vcf_linkage_disequilibrium_old
+                       JOIN vcf_variants AS variants_1 ON variants_1.variant_id = vcf_linkage_disequilibrium_old.snp_id_1
+                       JOIN vcf_variants AS variants_2 ON variants_2.variant_id = vcf_linkage_disequilibrium_old.snp_id_2
+                       WHERE IFNULL(vcf_linkage_disequilibrium_old.sample_withmd_list_2, '') = ''
+                          OR variants_1.variant_key < variants_2.variant_key
+                       ORDER BY 1, 4 DESC, 2;
+               '''
+    try:
+        conn.execute(sentence)
+    except Exception as e:
+        raise genlib.ProgramException(e, 'B002', sentence, conn)
 
-    def __init__(self):
+    # drop the old tables
+    for sentence in ['DROP TABLE vcf_snps_old;', 'DROP TABLE vcf_linkage_disequilibrium_old;']:
+        try:
+            conn.execute(sentence)
+        except Exception as e:
+            raise genlib.ProgramException(e, 'B002', sentence, conn)
+
+    # create the view "vcf_linkage_disequilibrium_view"
+    drop_vcf_linkage_disequilibrium_view(conn)
+    create_vcf_linkage_disequilibrium_view(conn)
+
+    # end the transaction
+    conn.commit()
+
+#-------------------------------------------------------------------------------
+# General classes
+#-------------------------------------------------------------------------------
+
+class BulkWriter():
+    '''
+    This class inserts rows into a table using a parameterized sentence run by executemany.
+    The rows are grouped in batches of transaction_size rows that are sent through a queue
+    to a writer thread, which inserts and commits every batch in its own transaction.
+    When a checkpoint table is indicated, the batches are only sent after a checkpoint row
+    and the checkpoint rows are inserted in the same transaction than the rows of its batch,
+    so the committed checkpoint rows identify the data completely saved.
+    '''
+
+    #---------------
+
+    def __init__(self, conn, table_name, column_name_list, transaction_size=genlib.Const.DEFAULT_TRANSACTION_SIZE, checkpoint_table_name=None, checkpoint_column_name_list=None):
+
+        self.conn = conn
+        self.column_name_list = column_name_list
+        self.transaction_size = transaction_size
+        self.sentence = self.build_insert_sentence(table_name, column_name_list)
+        if checkpoint_table_name is None:
+            self.checkpoint_column_name_list = None
+            self.checkpoint_sentence = None
+        else:
+            self.checkpoint_column_name_list = checkpoint_column_name_list
+            self.checkpoint_sentence = self.build_insert_sentence(checkpoint_table_name, checkpoint_column_name_list)
+        self.row_list = []
+        self.checkpoint_row_list = []
+        self.exception = None
+        self.batch_queue = queue.Queue(maxsize=4)
+        self.writer_thread = threading.Thread(target=self.write_batches, daemon=True)
+        self.writer_thread.start()
+
+    #---------------
+
+    @staticmethod
+    def build_insert_sentence(table_name, column_name_list):
+        '''
+        Build the parameterized sentence to insert a row into a table.
+        '''
+
+        return f'''
+                INSERT INTO {table_name}
+                    ({', '.join(column_name_list)})
+                    VALUES ({', '.join(['?'] * len(column_name_list))});
+                '''
+
+    #---------------
+
+    def put(self, row_dict):
+        '''
+        Add a row to the current batch and send the batch to the writer thread when it is full
+        (when there is a checkpoint table, the batch is sent in the next checkpoint).
+        '''
+
+        self.row_list.append(tuple(row_dict[column_name] for column_name in self.column_name_list))
+        if self.checkpoint_sentence is None and len(self.row_list) >= self.transaction_size:
+            self.flush()
 
-        self.M = 0.0
-        self.S = 0.0
-        self.k = 1
+    #---------------
+
+    def checkpoint(self, checkpoint_row_dict):
+        '''
+        Add a checkpoint row to the current batch and send the batch to the writer thread when it is full.
+        '''
+
+        self.checkpoint_row_list.append(tuple(checkpoint_row_dict[column_name] for column_name in self.checkpoint_column_name_list))
+        if len(self.row_list) + len(self.checkpoint_row_list) >= self.transaction_size:
+            self.flush()
 
     #---------------
 
-    def step(self, value):
+    def flush(self):
+        '''
+        Send the current batch to the writer thread.
+        '''
+
+        self.check_exception()
+        if self.row_list != [] or self.checkpoint_row_list != []:
+            self.batch_queue.put((self.row_list, self.checkpoint_row_list))
+            self.row_list = []
+            self.checkpoint_row_list = []
 
-        if value is None:
-            return
+    #---------------
+
+    def close(self):
+        '''
+        Send the last batch to the writer thread and wait until every batch is committed.
+        '''
 
-        tM = self.M
-        self.M += (value - tM) / self.k
-        self.S += (value - tM) * (value - self.M)
-        self.k += 1
+        self.flush()
+        self.batch_queue.put(None)
+        self.writer_thread.join()
+        self.check_exception()
 
     #---------------
 
-    def finalize(self):
+    def write_batches(self):
+        '''
+        Insert and commit the batches of the queue until the end mark (None) is received
+        (after an exception, the batches are discarded to not block the producer).
+        '''
+
+        while True:
+            batch = self.batch_queue.get()
+            if batch is None:
+                break
+            (row_list, checkpoint_row_list) = batch
+            if self.exception is None:
+                try:
+                    self.conn.executemany(self.sentence, row_list)
+                    if checkpoint_row_list != []:
+                        self.conn.executemany(self.checkpoint_sentence, checkpoint_row_list)
+                    self.conn.commit()
+                except Exception as e:
+                    self.exception = e
+
+    #---------------
 
-        if self.k < 3:
-            return None
+    def check_exception(self):
+        '''
+        Raise the exception of the writer thread in the caller thread.
+        '''
 
-        return math.sqrt(self.S / (self.k-2))
+        if self.exception is not None:
+            raise genlib.ProgramException(self.exception, 'B002', self.sentence, self.conn)
 
     #---------------
 